@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Поиск ссылок на игры в GameParser: повторный разбор документа на каждую
+игру против индекса ссылок, построенного один раз на страницу
+
+Запуск:
+    python benchmarks/bench_game_link_resolution.py [--games 200] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_parser import GameParser  # noqa: E402
+from html_parser import make_soup  # noqa: E402
+
+
+def synthetic_page(games: int) -> str:
+    """Страница с результатами и ссылками на протоколы для каждой игры"""
+    rows = []
+    for i in range(games):
+        team = 'Pull Up-Фарм' if i % 2 else 'Pull Up'
+        rows.append(
+            f'<tr><td>17.10.2025 - Команда{i} - {team} {40 + i % 30}:{35 + i % 25}</td>'
+            f'<td><a href="podrobno.php?id={i}">Команда{i} {team}</a></td>'
+            f'<td><a href="game.html?gameId={900000 + i}">СТРАНИЦА ИГРЫ</a></td></tr>'
+        )
+    return '<html><body><table>' + ''.join(rows) + '</table></body></html>'
+
+
+def find_by_teams_reparse(team1: str, team2: str, html_content: str):
+    """Прежняя реализация: разбор всего документа на каждый вызов"""
+    soup = make_soup(html_content)
+    for link in soup.find_all('a', href=True):
+        href = str(link.get('href', ''))
+        if 'podrobno' in href or 'game' in href:
+            link_text = link.get_text().strip()
+            if team1.lower() in link_text.lower() or team2.lower() in link_text.lower():
+                return href
+    return None
+
+
+def measure(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    html_content = synthetic_page(args.games)
+    pairs = [(f'Команда{i}', 'Pull Up-Фарм' if i % 2 else 'Pull Up') for i in range(args.games)]
+
+    def reparse():
+        return [find_by_teams_reparse(pullup, opponent, html_content) for opponent, pullup in pairs]
+
+    def indexed():
+        game_parser = GameParser()
+        return [game_parser.find_game_link_by_teams(pullup, opponent, html_content) for opponent, pullup in pairs]
+
+    assert reparse() == indexed(), "Результаты поиска ссылок различаются"
+
+    print(f"Игр на странице: {args.games}, размер страницы: {len(html_content)} символов")
+    reparse_time = measure(reparse, args.repeat)
+    indexed_time = measure(indexed, args.repeat)
+    print(f"   Разбор документа на каждую игру: {reparse_time * 1000:9.1f} мс")
+    print(f"   Индекс ссылок на страницу:       {indexed_time * 1000:9.1f} мс")
+    print(f"   Ускорение: x{reparse_time / indexed_time:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Сравнение HTML-движков на сохраненных страницах letobasket и iframe табло
+
+Запуск:
+    python benchmarks/bench_html_parsers.py [--page letobasket.html] [--iframe iframe.html] [--repeat 20]
+
+Без --page используется HTML из кэша главной страницы (letobasket_page_cache.json),
+без --iframe и при отсутствии кэша - синтетические страницы того же вида
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parser import available_backends, make_soup, parse_document  # noqa: E402
+from page_snapshot import PAGE_CACHE_FILE  # noqa: E402
+
+
+def synthetic_homepage(games: int = 60) -> str:
+    """Главная страница с табло, расписанием и результатами"""
+    rows = []
+    for i in range(games):
+        rows.append(
+            f'<tr><td>{i % 28 + 1:02d}.10.2025 19.{i % 6}0 (ВО СШОР Малый 66) - Команда {i} - Pull Up</td>'
+            f'<td><a href="game.html?gameId={900000 + i}&apiUrl=https://reg.infobasket.su&lang=ru">СТРАНИЦА ИГРЫ</a></td></tr>'
+        )
+    results = ''.join(
+        f'<p>{i % 28 + 1:02d}.09.2025- Команда {i} - Pull Up-Фарм 37:58 (0:12 11:10 15:10 11:26)</p>'
+        for i in range(games)
+    )
+    return (
+        '<html><head><title>letobasket</title></head><body>'
+        '<div>ТАБЛО ИГР</div><table>' + ''.join(rows) + '</table>'
+        '<div>ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ</div>' + results +
+        '<div>online видеотрансляции игр доступны на странице</div></body></html>'
+    )
+
+
+def synthetic_iframe() -> str:
+    """Iframe табло с периодом, временем и счетом"""
+    players = ''.join(f'<tr><td>{n}</td><td>Игрок {n}</td><td>{n % 20}</td></tr>' for n in range(40))
+    return (
+        '<html><head><title>PULL UP - КОМАНДА 7 17.10.2025</title></head><body>'
+        '<span id="js-period">4</span><span id="js-timer">0:00</span>'
+        '<span id="js-score-team1">58</span><span id="js-score-team2">37</span>'
+        f'<table>{players}</table></body></html>'
+    )
+
+
+def load_page(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def cached_homepage() -> str:
+    """HTML главной страницы из кэша условных запросов, если он есть"""
+    try:
+        with open(PAGE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('html', '')
+    except (OSError, ValueError):
+        return ''
+
+
+def bench(label: str, func, repeat: int):
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"   {label:<32} {seconds * 1000:8.2f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page', help='сохраненная главная страница letobasket.ru')
+    parser.add_argument('--iframe', help='сохраненный iframe табло')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    homepage = load_page(args.page) if args.page else (cached_homepage() or synthetic_homepage())
+    iframe = load_page(args.iframe) if args.iframe else synthetic_iframe()
+    backends = available_backends()
+
+    print(f"Доступные движки: {', '.join(backends)}")
+    print(f"Главная страница: {len(homepage)} символов, iframe: {len(iframe)} символов\n")
+
+    print("📄 Главная страница: дерево BeautifulSoup + get_text()")
+    for backend in backends:
+        if backend == 'selectolax':
+            continue
+        bench(backend, lambda: make_soup(homepage, backend).get_text(), args.repeat)
+
+    print("\n📄 Главная страница: ссылки \"СТРАНИЦА ИГРЫ\"")
+    for backend in backends:
+        if backend == 'selectolax':
+            from selectolax.parser import HTMLParser
+            bench(backend, lambda: [a.attributes.get('href') for a in HTMLParser(homepage).css('a[href]')
+                                    if 'СТРАНИЦА ИГРЫ' in a.text()], args.repeat)
+        else:
+            bench(backend, lambda: [a['href'] for a in make_soup(homepage, backend).find_all('a', href=True)
+                                    if 'СТРАНИЦА ИГРЫ' in a.get_text()], args.repeat)
+
+    print("\n🏀 Iframe табло: период, время, счет, заголовок")
+    for backend in backends:
+        def parse_iframe():
+            document = parse_document(iframe, backend)
+            return (document.text_by_id('span', 'js-period'), document.text_by_id('span', 'js-timer'),
+                    document.text_by_id('span', 'js-score-team1'), document.text_by_id('span', 'js-score-team2'),
+                    document.title())
+        bench(backend, parse_iframe, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
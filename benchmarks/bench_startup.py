@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Холодный старт точек входа: время импорта модуля в отдельном процессе
+(python -X importtime), самые тяжелые зависимости и файлы, которые модуль
+создал при импорте (импорт не должен делать ввода-вывода)
+
+Запуск:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 5] [module ...]
+
+Каждый импорт выполняется в пустом временном каталоге без BOT_TOKEN,
+GOOGLE_SHEETS_CREDENTIALS и SPREADSHEET_ID, чтобы файлы состояния и сеть не влияли на замер
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = [
+    'run_birthday_notifications',
+    'birthday_bot',
+    'run_game_system',
+    'run_game_results_monitor',
+    'run_game_results_monitor_v2',
+    'run_live_game_daemon',
+    'training_polls_enhanced',
+]
+
+SECRETS = ('BOT_TOKEN', 'CHAT_ID', 'GOOGLE_SHEETS_CREDENTIALS', 'SPREADSHEET_ID')
+
+
+def clean_env():
+    env = {key: value for key, value in os.environ.items() if key not in SECRETS}
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def parse_importtime(stderr: str):
+    """Строки -X importtime: (модуль, собственное время, накопленное время) в микросекундах"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_once(module: str, env):
+    """Импорт модуля в новом процессе: (время процесса, строки importtime, созданные файлы, код выхода)"""
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        elapsed = time.perf_counter() - started
+        created = sorted(os.listdir(workdir))
+    return elapsed, parse_importtime(result.stderr), created, result.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINTS, help='модули для замера')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5, help='сколько самых тяжелых импортов показать')
+    args = parser.parse_args()
+
+    env = clean_env()
+    baseline = statistics.median(import_once('sys', env)[0] for _ in range(args.repeat))
+    print(f"Пустой интерпретатор: {baseline * 1000:.1f} мс")
+
+    for module in args.modules:
+        runs = [import_once(module, env) for _ in range(args.repeat)]
+        elapsed = statistics.median(run[0] for run in runs)
+        rows = runs[-1][1]
+        own = next((cumulative for name, _, cumulative in rows if name == module), 0)
+        print(f"\n{module}: процесс {elapsed * 1000:.1f} мс, импорт {own / 1000:.1f} мс")
+
+        if runs[-1][3] != 0:
+            print(f"   ❌ импорт завершился с кодом {runs[-1][3]}")
+        created = sorted({name for run in runs for name in run[2]})
+        if created:
+            print(f"   ⚠️ файлы, созданные при импорте: {', '.join(created)}")
+
+        # Тяжелые зависимости первого уровня вложенности (накопленное время)
+        top_level = [row for row in rows if row[0] != module and '.' not in row[0]]
+        for name, _, cumulative in sorted(top_level, key=lambda row: row[2], reverse=True)[:args.top]:
+            print(f"   {name:<40} {cumulative / 1000:8.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Поиск наших команд в тексте целой страницы: старые списки подстрок и
+регулярные выражения, компилируемые при каждом вызове, против одного
+скомпилированного выражения реестра команд
+
+Запуск:
+    python benchmarks/bench_team_matcher.py [--page letobasket.html] [--games 60] [--repeat 50]
+
+Без --page используется текст из кэша главной страницы (letobasket_page_cache.json),
+при отсутствии кэша - синтетическая страница
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_html_parsers import cached_homepage, load_page, synthetic_homepage  # noqa: E402
+from html_parser import make_soup  # noqa: E402
+from team_registry import team_registry  # noqa: E402
+
+# Списки, которые раньше дублировались по модулям
+LEGACY_SEARCH_TEAMS = ['Pull Up-Фарм', 'Pull Up Фарм', 'PullUP-Фарм', 'PullUP Фарм', 'Pull Up', 'PullUP']
+LEGACY_UPPER_TEAMS = ['Pull Up-Фарм', 'Pull Up Фарм', 'Pull Up', 'PullUP', 'PULL UP ФАРМ']
+LEGACY_PATTERNS = [
+    r'PullUP', r'Pull UP', r'PULL UP', r'pull up', r'PULLUP', r'pullup', r'Pull Up',
+    r'PULL UP\s+\w+', r'Pull UP\s+\w+', r'pull up\s+\w+',
+]
+
+
+def legacy_find(text: str):
+    """Все проверки старого кода: подстроки, подстроки в верхнем регистре и re.findall по списку"""
+    found = [team for team in LEGACY_SEARCH_TEAMS if team in text]
+    found += [team for team in LEGACY_UPPER_TEAMS if team.upper() in text.upper()]
+    for pattern in LEGACY_PATTERNS:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            found.append(matches[0].strip())
+            break
+    return found
+
+
+def bench(label: str, func, repeat: int):
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"   {label:<40} {seconds * 1000:8.3f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page', help='сохраненная главная страница letobasket.ru')
+    parser.add_argument('--games', type=int, default=60, help='игр на синтетической странице')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    html = load_page(args.page) if args.page else (cached_homepage() or synthetic_homepage(args.games))
+    text = make_soup(html).get_text('\n')
+    lines = [line for line in text.splitlines() if line.strip()]
+
+    print(f"Текст страницы: {len(text)} символов, {len(lines)} строк")
+    print(f"Найдено команд: {', '.join(team_registry.find_teams(text)) or 'нет'}\n")
+
+    print("📄 Весь текст страницы")
+    bench("списки подстрок + regex на вызов", lambda: legacy_find(text), args.repeat)
+    bench("team_registry.find_all", lambda: team_registry.find_all(text), args.repeat)
+
+    print("\n📄 Построчно (как при разборе игр)")
+    bench("списки подстрок + regex на вызов", lambda: [legacy_find(line) for line in lines], args.repeat)
+    bench("team_registry.search", lambda: [team_registry.search(line) for line in lines], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,21 @@
 import datetime
 import os
 import asyncio
-import aiohttp
 import re
 import sys
-from bs4 import BeautifulSoup
 from telegram import Bot
 from dotenv import load_dotenv
 from typing import Any, cast
 
 # Импортируем общие модули
 from game_parser import game_parser
-from notification_manager import notification_manager
-from players_manager import PlayersManager
+from page_snapshot import page_snapshot_service
+from http_client import http_client
+from html_parser import make_soup
+from team_registry import team_registry
+from birthday_notifications import deliver_birthday_greetings
+from notification_manager import get_notification_manager
+from players_manager import get_players_manager
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -21,11 +24,6 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
 
-# Валидация переменных окружения для корректной типизации и раннего выхода
-if not BOT_TOKEN or not CHAT_ID:
-    print("❌ BOT_TOKEN или CHAT_ID не заданы в переменных окружения")
-    sys.exit(1)
-
 # Инициализируем бота как None, будет создан при необходимости
 bot: Any = None
 
@@ -45,23 +43,6 @@ def get_bot():
             return None
     return bot
 
-# Паттерны для поиска команд PullUP
-PULLUP_PATTERNS = [
-    r'PullUP',
-    r'Pull UP',
-    r'PULL UP',
-    r'pull up',
-    r'PULLUP',
-    r'pullup',
-    r'Pull Up',
-    r'PULL UP\s+\w+',  # PULL UP с любым словом после (например, PULL UP фарм)
-    r'Pull UP\s+\w+',  # Pull UP с любым словом после
-    r'pull up\s+\w+',  # pull up с любым словом после
-]
-
-# Инициализируем менеджер игроков
-players_manager = PlayersManager()
-
 def get_years_word(age: int) -> str:
     if 11 <= age % 100 <= 14:
         return "лет"
@@ -81,12 +62,8 @@ def should_check_birthdays():
 
 def find_pullup_team(text_block):
     """Ищет команду PullUP в тексте с поддержкой различных вариаций"""
-    for pattern in PULLUP_PATTERNS:
-        matches = re.findall(pattern, text_block, re.IGNORECASE)
-        if matches:
-            # Возвращаем первое найденное совпадение
-            return matches[0].strip()
-    return None
+    match = team_registry.search(text_block)
+    return match.variant.strip() if match else None
 
 async def check_birthdays():
     """Проверяет дни рождения только в 09:00"""
@@ -96,36 +73,12 @@ async def check_birthdays():
             return
             
         # Получаем игроков с днями рождения сегодня
-        birthday_players = players_manager.get_players_with_birthdays_today()
+        birthday_players = get_players_manager().get_players_with_birthdays_today()
         
         if birthday_players:
-            birthday_messages = []
-            for player in birthday_players:
-                surname = player.get('surname', '')
-                nickname = player.get('nickname', '')
-                telegram_id = player.get('telegram_id', '')
-                first_name = player.get('name', '')
-                age = player.get('age', 0)
-                
-                # Формируем сообщение
-                if nickname and telegram_id:
-                    message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
-                elif nickname:
-                    message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" {first_name} ({age} {get_years_word(age)})!"
-                elif telegram_id:
-                    message = f"🎉 Сегодня день рождения у {surname} ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
-                else:
-                    message = f"🎉 Сегодня день рождения у {surname} {first_name} ({age} {get_years_word(age)})!"
-                
-                message += "\n Поздравляем! 🎂"
-                birthday_messages.append(message)
-            
-            # Отправляем уведомления
             current_bot = get_bot()
             if current_bot:
-                for message in birthday_messages:
-                    await current_bot.send_message(chat_id=CHAT_ID, text=message)
-                    print("✅ Отправлено:", message[:50] + "...")
+                await deliver_birthday_greetings(current_bot, CHAT_ID, birthday_players)
             else:
                 print("❌ Не удалось отправить уведомление - бот не инициализирован")
         else:
@@ -140,11 +93,11 @@ async def parse_game_info(game_url):
 async def parse_game_info_simple(game_url):
     """Простой парсинг информации об игре без использования браузера"""
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_client.session() as session:
             async with session.get(game_url) as response:
                 if response.status == 200:
                     html_content = await response.text()
-                    soup = BeautifulSoup(html_content, 'html.parser')
+                    soup = make_soup(html_content)
                     
                     # Ищем время игры
                     time_element = soup.find('div', class_='game-time') or soup.find('span', class_='time')
@@ -177,7 +130,7 @@ async def check_game_end(game_url):
         game_info = await game_parser.parse_game_info(game_url)
         if game_info:
             # Создаем уведомление о завершении игры
-            await notification_manager.send_game_end_notification(game_info, game_url)
+            await get_notification_manager().send_game_end_notification(game_info, game_url)
     except Exception as e:
         print(f"❌ Ошибка при проверке конца игры: {e}")
 
@@ -187,7 +140,7 @@ async def check_game_end_simple(game_url):
         game_info = await game_parser.parse_game_info(game_url)
         if game_info:
             # Создаем уведомление о завершении игры
-            await notification_manager.send_game_end_notification(game_info, game_url)
+            await get_notification_manager().send_game_end_notification(game_info, game_url)
     except Exception as e:
         print(f"❌ Ошибка при проверке конца игры (простой метод): {e}")
 
@@ -332,7 +285,7 @@ async def check_game_start(game_info, game_url):
         
         if should_send_game_notification(game_info['time']):
             # Используем общий менеджер уведомлений
-            await notification_manager.send_game_start_notification(game_info, game_url)
+            await get_notification_manager().send_game_start_notification(game_info, game_url)
     except Exception as e:
         print(f"❌ Ошибка при проверке начала игры: {e}")
 
@@ -341,39 +294,20 @@ async def check_letobasket_site():
     try:
         print(f"🔍 Проверяю сайт letobasket.ru...")
         
-        # Получаем свежий контент страницы
-        html_content = await game_parser.get_fresh_page_content()
-        
-        # Парсим HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # Получаем общий снимок страницы
+        snapshot = await page_snapshot_service.get_snapshot()
+        soup = snapshot.soup
+        sections = snapshot.sections
         
         # Ищем блок между "Табло игры" и "online видеотрансляции игр доступны на странице"
-        page_text = soup.get_text(separator=' ', strip=True)
-        page_text_lower = page_text.lower()
+        # (маркеры находятся за один проход без учета регистра)
+        page_text = snapshot.flat_text
+        block = sections.span('scoreboard_heading', until=('broadcasts',))
         
-        # Ищем начало/конец блока по нескольким вариантам, без учета регистра
-        start_variants = ["табло игры", "табло игр"]
-        end_variants = [
-            "online видеотрансляции игр доступны на странице",
-            "онлайн видеотрансляции игр доступны на странице",
-            "онлайн видеотрансляции",
-            "online видеотрансляции",
-        ]
-        start_index = -1
-        for sv in start_variants:
-            idx = page_text_lower.find(sv)
-            if idx != -1 and (start_index == -1 or idx < start_index):
-                start_index = idx
-        end_index = -1
-        for ev in end_variants:
-            idx = page_text_lower.find(ev)
-            if idx != -1 and idx > start_index:
-                if end_index == -1 or idx < end_index:
-                    end_index = idx
-        
-        block_found = start_index != -1 and end_index != -1 and start_index < end_index
-        target_block = page_text[start_index:end_index] if block_found else page_text
-        if not block_found:
+        if block is not None and block.end < len(sections.full_text):
+            target_block = block.flat_text
+        else:
+            target_block = page_text
             print("ℹ️ Ожидаемые маркеры не найдены, использую фолбэк: анализ всей страницы")
         
         # Ищем команду PullUP с поддержкой различных вариаций (с фолбэком на весь текст)
@@ -383,18 +317,12 @@ async def check_letobasket_site():
             print(f"🏀 Найдена команда PullUP: {pullup_team}")
             
             # Ищем ссылку "СТРАНИЦА ИГРЫ" в HTML
-            game_links = soup.find_all('a', href=True)
-            game_page_link = None
-            
-            for link in game_links:
-                link_text = link.get_text().strip()
-                if "СТРАНИЦА ИГРЫ" in link_text or "страница игры" in link_text.lower():
-                    game_page_link = link['href']
-                    break
+            game_page_anchors = sections.find_anchors("страница игры")
+            game_page_link = game_page_anchors[0].href if game_page_anchors else None
             
             # Если не нашли "СТРАНИЦА ИГРЫ", ищем любые ссылки, похожие на страницы игр
             if not game_page_link:
-                for link in game_links:
+                for link in soup.find_all('a', href=True):
                     href = link['href']
                     if any(keyword in href.lower() for keyword in ['game', 'match', 'podrobno', 'id']):
                         game_page_link = href
@@ -521,7 +449,7 @@ async def create_scheduled_polls(now):
         
         # Опрос в день рождения (если есть именинники)
         if should_check_birthdays():
-            birthday_players = players_manager.get_players_with_birthdays_today()
+            birthday_players = get_players_manager().get_players_with_birthdays_today()
             
             if birthday_players:
                 # Берем первого именинника для создания опроса
@@ -566,8 +494,15 @@ async def main():
         print("✅ Все проверки завершены")
     except Exception as e:
         print(f"❌ Критическая ошибка в main(): {e}")
+    finally:
+        await http_client.close()
 
 if __name__ == "__main__":
+    # Валидация переменных окружения (при запуске, а не при импорте модуля)
+    if not BOT_TOKEN or not CHAT_ID:
+        print("❌ BOT_TOKEN или CHAT_ID не заданы в переменных окружения")
+        sys.exit(1)
+    
     try:
         # Запускаем основную проверку (без планировщика)
         asyncio.run(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Календарь дней рождения
+Даты рождения разбираются один раз при построении индекса день года → игроки;
+дальше "у кого день рождения в дату X" - один поиск по словарю, а ближайшие
+дни рождения - проход по дням диапазона без повторного разбора дат.
+Родившиеся 29 февраля в невисокосный год поздравляются 28 февраля
+"""
+
+import datetime
+import calendar
+from typing import Any, Dict, List, Optional, Tuple
+
+# Форматы даты рождения в таблице игроков
+BIRTHDAY_FORMATS = ("%Y-%m-%d", "%d.%m.%Y")
+
+# Високосный год для нумерации дней: 29 февраля получает собственный номер
+_INDEX_YEAR = 2000
+
+
+def parse_birthday(birthday: str) -> Optional[datetime.date]:
+    """Разбирает дату рождения (YYYY-MM-DD или DD.MM.YYYY)"""
+    if '-' in birthday:
+        return datetime.datetime.strptime(birthday, BIRTHDAY_FORMATS[0]).date()
+    if '.' in birthday:
+        return datetime.datetime.strptime(birthday, BIRTHDAY_FORMATS[1]).date()
+    return None
+
+
+def day_of_year(month: int, day: int) -> int:
+    """Номер дня в високосном году (1..366)"""
+    return datetime.date(_INDEX_YEAR, month, day).timetuple().tm_yday
+
+
+class BirthdayCalendar:
+    """Индекс день года → (игрок, год рождения)"""
+
+    def __init__(self, players: List[Dict[str, Any]]):
+        self.days: Dict[int, List[Tuple[Dict[str, Any], int]]] = {}
+        self.skipped: List[Dict[str, Any]] = []
+        for player in players:
+            birthday = player.get('birthday', '')
+            try:
+                born = parse_birthday(birthday) if birthday else None
+            except ValueError:
+                born = None
+            if born is None:
+                self.skipped.append(player)
+                continue
+            self.days.setdefault(day_of_year(born.month, born.day), []).append((player, born.year))
+        self.size = len(players) - len(self.skipped)
+
+    def _entries_on(self, date: datetime.date) -> List[Tuple[Dict[str, Any], int]]:
+        entries = self.days.get(day_of_year(date.month, date.day), [])
+        if date.month == 2 and date.day == 28 and not calendar.isleap(date.year):
+            # 29 февраля в этом году нет - поздравляем накануне
+            entries = entries + self.days.get(day_of_year(2, 29), [])
+        return entries
+
+    def on(self, date: datetime.date) -> List[Dict[str, Any]]:
+        """Именинники в дату date (копии записей игроков с полем age)"""
+        return [dict(player, age=date.year - year) for player, year in self._entries_on(date)]
+
+    def upcoming(self, start: datetime.date, days: int) -> List[Tuple[datetime.date, Dict[str, Any]]]:
+        """Дни рождения в диапазоне [start, start + days) по порядку: (дата, игрок с возрастом)"""
+        result = []
+        for offset in range(days):
+            date = start + datetime.timedelta(days=offset)
+            for player in self.on(date):
+                result.append((date, player))
+        return result
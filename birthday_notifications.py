@@ -7,12 +7,21 @@
 import os
 import asyncio
 import datetime
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from datetime_utils import get_moscow_time, log_current_time
+from dispatcher import dispatcher, first_message
+from json_storage import merge_json, read_json, update_json
 
 # Загружаем переменные окружения
 load_dotenv()
 
+# Файл с отправленными поздравлениями (ключ: игрок + дата)
+BIRTHDAY_HISTORY_FILE = os.getenv("BIRTHDAY_HISTORY_FILE", "birthday_history.json")
+
+# Сколько дней хранить записи об отправленных поздравлениях
+BIRTHDAY_HISTORY_DAYS = 7
+
 def get_years_word(age: int) -> str:
     """Возвращает правильное склонение слова 'год'"""
     if age % 10 == 1 and age % 100 != 11:
@@ -28,6 +37,109 @@ def should_check_birthdays() -> bool:
     now = get_moscow_time()
     return now.hour == 9  # Проверяем весь час с 09:00 до 09:59 по Москве
 
+def load_birthday_history() -> Dict:
+    """Загружает историю отправленных поздравлений"""
+    try:
+        return read_json(BIRTHDAY_HISTORY_FILE, {})
+    except Exception as e:
+        print(f"⚠️ Ошибка загрузки истории поздравлений: {e}")
+    return {}
+
+def record_birthday_sent(key: str, record: Dict):
+    """Добавляет поздравление в историю поверх актуального файла (записи параллельного запуска сохраняются)"""
+    try:
+        merge_json(BIRTHDAY_HISTORY_FILE, {key: record})
+    except Exception as e:
+        print(f"⚠️ Ошибка сохранения истории поздравлений: {e}")
+
+def prune_birthday_history(today: datetime.date):
+    """Удаляет из файла истории записи старше BIRTHDAY_HISTORY_DAYS"""
+    try:
+        update_json(BIRTHDAY_HISTORY_FILE, lambda history: _prune_birthday_history(history, today), default={})
+    except Exception as e:
+        print(f"⚠️ Ошибка сохранения истории поздравлений: {e}")
+
+def birthday_key(player: Dict, date_str: str) -> str:
+    """Ключ идемпотентности поздравления: игрок + дата"""
+    identity = player.get('telegram_id') or f"{player.get('surname', '')}_{player.get('name', '')}"
+    return f"{identity}_{date_str}"
+
+def format_birthday_message(player: Dict) -> str:
+    """Формирует поздравление для именинника"""
+    surname = player.get('surname', '')  # Фамилия из столбца "Фамилия"
+    nickname = player.get('nickname', '')  # Ник из столбца "Ник"
+    telegram_id = player.get('telegram_id', '')  # Telegram ID
+    first_name = player.get('name', '')  # Имя из столбца "Имя"
+    age = player.get('age', 0)  # Возраст (уже вычислен)
+
+    if nickname and telegram_id:
+        # Если есть ник и Telegram ID
+        message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
+    elif nickname:
+        # Если есть только ник
+        message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" {first_name} ({age} {get_years_word(age)})!"
+    elif telegram_id:
+        # Если есть только Telegram ID
+        message = f"🎉 Сегодня день рождения у {surname} ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
+    else:
+        # Если нет ни ника, ни Telegram ID
+        message = f"🎉 Сегодня день рождения у {surname} {first_name} ({age} {get_years_word(age)})!"
+
+    return message + "\n Поздравляем! 🎂"
+
+def _prune_birthday_history(history: Dict, today: datetime.date):
+    """Удаляет записи старше BIRTHDAY_HISTORY_DAYS"""
+    cutoff = (today - datetime.timedelta(days=BIRTHDAY_HISTORY_DAYS)).isoformat()
+    for key in [key for key, record in history.items() if record.get('date', '') < cutoff]:
+        del history[key]
+
+async def deliver_birthday_greetings(bot, chat_id: Optional[str], players: List[Dict],
+                                     date: Optional[datetime.date] = None) -> int:
+    """Параллельно отправляет поздравления, пропуская уже отправленные сегодня; возвращает число отправленных"""
+    today = date or get_moscow_time().date()
+    date_str = today.isoformat()
+    history = load_birthday_history()
+
+    pending = {}
+    for player in players:
+        key = birthday_key(player, date_str)
+        if key in history:
+            print(f"⏭️ Поздравление уже отправлено: {player.get('surname', '')} {player.get('name', '')}")
+        else:
+            pending.setdefault(key, player)
+
+    async def deliver(key: str, player: Dict) -> bool:
+        message = format_birthday_message(player)
+        if key in load_birthday_history():
+            # Отправлено параллельным запуском после начала этого
+            print(f"⏭️ Поздравление уже отправлено: {player.get('surname', '')} {player.get('name', '')}")
+            return False
+        try:
+            # Порядок поздравлений в чате не важен: отправляем без ожидания предыдущих
+            deliveries = await dispatcher.dispatch(
+                'birthday',
+                lambda chat, thread: bot.send_message(chat_id=chat, text=message, message_thread_id=thread),
+                chat_id,
+                ordered=False
+            )
+            first_message(deliveries)
+        except Exception as e:
+            print(f"❌ Ошибка отправки поздравления {key}: {e}")
+            return False
+        # Запись сразу после отправки: повторный запуск не продублирует уже ушедшие поздравления
+        record_birthday_sent(key, {
+            'date': date_str,
+            'surname': player.get('surname', ''),
+            'name': player.get('name', ''),
+            'sent_at': get_moscow_time().isoformat(),
+        })
+        print(f"✅ Отправлено поздравление: {message[:50]}...")
+        return True
+
+    results = await asyncio.gather(*(deliver(key, player) for key, player in pending.items()))
+    prune_birthday_history(today)
+    return sum(results)
+
 async def check_birthdays():
     """Проверяет дни рождения и отправляет уведомления"""
     try:
@@ -55,57 +167,22 @@ async def check_birthdays():
         
         print(f"🎉 Найдено {len(birthday_players)} именинников!")
         
-        # Формируем сообщения для каждого именинника
-        birthday_messages = []
-        
-        for player in birthday_players:
-            # Получаем данные игрока
-            surname = player.get('surname', '')  # Фамилия из столбца "Фамилия"
-            nickname = player.get('nickname', '')  # Ник из столбца "Ник"
-            telegram_id = player.get('telegram_id', '')  # Telegram ID
-            first_name = player.get('name', '')  # Имя из столбца "Имя"
-            age = player.get('age', 0)  # Возраст (уже вычислен)
-            
-            # Формируем сообщение
-            if nickname and telegram_id:
-                # Если есть ник и Telegram ID
-                message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
-            elif nickname:
-                # Если есть только ник
-                message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" {first_name} ({age} {get_years_word(age)})!"
-            elif telegram_id:
-                # Если есть только Telegram ID
-                message = f"🎉 Сегодня день рождения у {surname} ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
-            else:
-                # Если нет ни ника, ни Telegram ID
-                message = f"🎉 Сегодня день рождения у {surname} {first_name} ({age} {get_years_word(age)})!"
-            
-            message += "\n Поздравляем! 🎂"
-            birthday_messages.append(message)
-        
-        # Отправляем уведомления
-        if birthday_messages:
-            # Инициализируем бота напрямую
-            bot_token = os.getenv("BOT_TOKEN")
-            if not bot_token:
-                print("❌ BOT_TOKEN не настроен")
-                return
-            
-            from telegram import Bot
-            current_bot = Bot(token=bot_token)
-            
-            chat_id = os.getenv("CHAT_ID")
-            if not chat_id:
-                print("❌ CHAT_ID не настроен")
-                return
-            
-            # Отправляем каждое сообщение
-            for i, message in enumerate(birthday_messages, 1):
-                try:
-                    await current_bot.send_message(chat_id=chat_id, text=message)
-                    print(f"✅ Отправлено уведомление {i}: {message[:50]}...")
-                except Exception as e:
-                    print(f"❌ Ошибка отправки уведомления {i}: {e}")
+        # Инициализируем бота напрямую
+        bot_token = os.getenv("BOT_TOKEN")
+        if not bot_token:
+            print("❌ BOT_TOKEN не настроен")
+            return
+        
+        from telegram import Bot
+        current_bot = Bot(token=bot_token)
+        
+        chat_id = os.getenv("CHAT_ID")
+        if not chat_id:
+            print("❌ CHAT_ID не настроен")
+            return
+        
+        sent = await deliver_birthday_greetings(current_bot, chat_id, birthday_players)
+        print(f"📊 Отправлено поздравлений: {sent}")
         
     except Exception as e:
         print(f"❌ Ошибка проверки дней рождения: {e}")
@@ -144,16 +221,7 @@ async def test_birthday_notifications():
                 print(f"      Telegram ID: {telegram_id or 'Не указан'}")
                 
                 # Показываем пример сообщения
-                if nickname and telegram_id:
-                    message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
-                elif nickname:
-                    message = f"🎉 Сегодня день рождения у {surname} \"{nickname}\" {first_name} ({age} {get_years_word(age)})!"
-                elif telegram_id:
-                    message = f"🎉 Сегодня день рождения у {surname} ({telegram_id}) {first_name} ({age} {get_years_word(age)})!"
-                else:
-                    message = f"🎉 Сегодня день рождения у {surname} {first_name} ({age} {get_years_word(age)})!"
-                
-                message += "\n Поздравляем! 🎂"
+                message = format_birthday_message(player)
                 print(f"      Пример сообщения: {message}")
                 print()
         else:
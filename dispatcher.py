@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Рассылка событий по нескольким чатам
+Событие (опрос, анонс, результат, день рождения) формируется один раз,
+а затем параллельно отправляется в основной чат и во все чаты/топики из
+таблицы маршрутизации routes.json. Лимиты Telegram соблюдает send_queue
+"""
+
+import os
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from send_queue import send_queue
+
+# Файл таблицы маршрутизации (список подписчиков)
+DISPATCH_ROUTES_FILE = os.getenv("DISPATCH_ROUTES_FILE", "routes.json")
+
+EVENT_KINDS = ('poll', 'announcement', 'result', 'birthday')
+
+# Отправка в конкретный чат: (chat_id, message_thread_id) → сообщение Telegram
+SendFunc = Callable[[int, Optional[int]], Awaitable[Any]]
+
+
+class Route:
+    """Подписчик: чат, топики по типам событий и фильтры по событиям и командам"""
+
+    def __init__(self, chat_id: str, topics: Optional[Dict[str, Optional[str]]] = None,
+                 events: Optional[List[str]] = None, teams: Optional[List[str]] = None):
+        self.chat_id = str(chat_id)
+        self.topics = {kind: str(topic) for kind, topic in (topics or {}).items() if topic}
+        self.events = set(events) if events else None
+        self.teams = set(teams) if teams else None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Route':
+        return cls(data['chat_id'], data.get('topics'), data.get('events'), data.get('teams'))
+
+    def accepts(self, kind: str, team: Optional[str] = None) -> bool:
+        """Подписан ли чат на событие (и на команду, если фильтр по командам задан)"""
+        if self.events is not None and kind not in self.events:
+            return False
+        if self.teams is not None and team is not None and team not in self.teams:
+            return False
+        return True
+
+    def topic_for(self, kind: str) -> Optional[str]:
+        return self.topics.get(kind)
+
+
+class Delivery:
+    """Результат отправки события в один чат"""
+
+    def __init__(self, chat_id: str, topic_id: Optional[str], message: Any = None, error: Optional[Exception] = None):
+        self.chat_id = chat_id
+        self.topic_id = topic_id
+        self.message = message
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class Dispatcher:
+    """Параллельная рассылка события по таблице маршрутизации"""
+
+    def __init__(self, routes: Optional[List[Route]] = None):
+        self.routes = routes or []
+
+    @classmethod
+    def load(cls, path: str = DISPATCH_ROUTES_FILE) -> 'Dispatcher':
+        routes = []
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    routes = [Route.from_dict(data) for data in json.load(f)]
+                print(f"📡 Загружено маршрутов рассылки: {len(routes)}")
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки {path}: {e}")
+        return cls(routes)
+
+    def targets(self, kind: str, chat_id: Optional[str], topic_id: Optional[str] = None,
+                team: Optional[str] = None) -> List[Tuple[str, Optional[str]]]:
+        """Основной чат и подписчики события без повторов"""
+        targets = []
+        if chat_id:
+            targets.append((str(chat_id), str(topic_id) if topic_id else None))
+        for route in self.routes:
+            if route.accepts(kind, team):
+                target = (route.chat_id, route.topic_for(kind))
+                if target not in targets:
+                    targets.append(target)
+        return targets
+
+    async def _deliver(self, send: SendFunc, chat_id: str, topic_id: Optional[str], ordered: bool = True) -> Delivery:
+        chat = int(chat_id)
+        try:
+            try:
+                message = await send_queue.send(chat, lambda: send(chat, int(topic_id) if topic_id else None), ordered)
+            except Exception as e:
+                if not topic_id or "Message thread not found" not in str(e):
+                    raise
+                print(f"⚠️ Топик {topic_id} не найден в чате {chat_id}, отправляем в основной чат")
+                message = await send_queue.send(chat, lambda: send(chat, None), ordered)
+                topic_id = None
+            return Delivery(chat_id, topic_id, message)
+        except Exception as e:
+            print(f"❌ Ошибка отправки в чат {chat_id}: {e}")
+            return Delivery(chat_id, topic_id, error=e)
+
+    async def dispatch(self, kind: str, send: SendFunc, chat_id: Optional[str], topic_id: Optional[str] = None,
+                       team: Optional[str] = None, ordered: bool = True) -> List[Delivery]:
+        """Отправляет событие во все чаты параллельно; первая доставка - в основной чат
+
+        ordered=False - событие не обязано идти в чате после предыдущих (см. send_queue.send)
+        """
+        targets = self.targets(kind, chat_id, topic_id, team)
+        if not targets:
+            print(f"⚠️ Нет получателей для события {kind}")
+            return []
+        deliveries = await asyncio.gather(*(self._deliver(send, chat, topic, ordered) for chat, topic in targets))
+        sent = sum(1 for delivery in deliveries if delivery.ok)
+        if len(targets) > 1:
+            print(f"📡 Событие {kind} отправлено в {sent}/{len(targets)} чатов")
+        return list(deliveries)
+
+
+def first_message(deliveries: List[Delivery], chat_id: Optional[str] = None,
+                  topic_id: Optional[str] = None) -> Any:
+    """Сообщение доставки в основной чат (chat_id/topic_id, как в dispatch)
+
+    Если в основной чат отправить не удалось, возвращается сообщение первой
+    успешной доставки подписчику; если успешных нет - исключение ошибки
+    основного чата (или первой ошибки)
+    """
+    primary = [delivery for delivery in deliveries
+               if chat_id is not None and delivery.chat_id == str(chat_id)]
+    # Доставка в топик раньше доставки в основной чат после ненайденного топика
+    topic = str(topic_id) if topic_id else None
+    primary.sort(key=lambda delivery: delivery.topic_id != topic)
+    for delivery in primary + deliveries:
+        if delivery.ok:
+            return delivery.message
+    errors = [delivery.error for delivery in primary + deliveries if delivery.error]
+    if errors:
+        raise errors[0]
+    return None
+
+
+def delivery_records(deliveries: List[Delivery]) -> List[Dict]:
+    """Сведения об успешных доставках для файлов истории"""
+    return [
+        {
+            'chat_id': delivery.chat_id,
+            'topic_id': delivery.topic_id,
+            'message_id': getattr(delivery.message, 'message_id', None),
+        }
+        for delivery in deliveries if delivery.ok
+    ]
+
+
+# Глобальный диспетчер рассылки
+dispatcher = Dispatcher.load()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Постоянный индекс игр табло: gameId → команды, дата, соревнование
+Команды и дата игры по gameId не меняются, поэтому iframe достаточно
+скачать один раз, а дальше пользоваться сохраненными данными
+"""
+
+import os
+import re
+import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+from datetime_utils import get_moscow_time
+from json_storage import read_json, write_json
+from team_registry import team_registry
+
+# Файл индекса
+GAME_INDEX_FILE = os.getenv("GAME_INDEX_FILE", "game_index.json")
+
+# Записи старше этого срока удаляются из индекса
+GAME_INDEX_MAX_AGE_DAYS = int(os.getenv("GAME_INDEX_MAX_AGE_DAYS", "30"))
+
+DATE_PATTERN = re.compile(r'(\d{2}\.\d{2}\.\d{4})')
+TITLE_PATTERN = re.compile(r'<title>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+# Разделитель команд - дефис с пробелами: дефис внутри названия ("Pull Up-Фарм") не делит
+TEAMS_SEPARATOR = re.compile(r'\s+-\s+')
+IFRAME_DATE_PATTERNS = [
+    re.compile(r'(\d{2}\.\d{2}\.\d{4})'),  # DD.MM.YYYY
+    re.compile(r'(\d{2}/\d{2}/\d{4})'),    # DD/MM/YYYY
+    re.compile(r'(\d{4}-\d{2}-\d{2})'),    # YYYY-MM-DD
+]
+
+
+def extract_game_id(link: str) -> Optional[str]:
+    """Извлекает gameId из ссылки на игру или id из ссылки на iframe"""
+    if not link:
+        return None
+    params = parse_qs(urlparse(link).query)
+    for name in ('gameId', 'id'):
+        values = params.get(name)
+        if values and values[0]:
+            return values[0]
+    return None
+
+
+def extract_competition_id(iframe_url: str) -> Optional[str]:
+    """Извлекает compId из ссылки на iframe"""
+    values = parse_qs(urlparse(iframe_url).query).get('compId')
+    return values[0] if values else None
+
+
+def split_teams(text: str) -> Optional[Tuple[str, str]]:
+    """Делит "КОМАНДА1 - КОМАНДА2" на две команды (None - разделителя нет)"""
+    parts = [part.strip() for part in TEAMS_SEPARATOR.split(text.strip(' -')) if part.strip()]
+    if len(parts) < 2:
+        return None
+    return parts[0], parts[1]
+
+
+def parse_iframe_title(iframe_content: str) -> Dict[str, Optional[str]]:
+    """Извлекает заголовок, команды ("КОМАНДА1 - КОМАНДА2") и дату из заголовка iframe"""
+    result: Dict[str, Optional[str]] = {'title': None, 'team1': None, 'team2': None, 'date': None}
+    title_match = TITLE_PATTERN.search(iframe_content)
+    if not title_match:
+        return result
+
+    title = ' '.join(title_match.group(1).split())
+    result['title'] = title
+
+    date_match = DATE_PATTERN.search(title)
+    if date_match:
+        result['date'] = date_match.group(1)
+
+    teams = split_teams(DATE_PATTERN.sub('', title))
+    if teams:
+        result['team1'], result['team2'] = teams
+    return result
+
+
+def extract_iframe_dates(iframe_content: str) -> List[str]:
+    """Извлекает все даты из iframe (DD.MM.YYYY, DD/MM/YYYY, YYYY-MM-DD и дату заголовка)"""
+    dates: List[str] = []
+    for pattern in IFRAME_DATE_PATTERNS:
+        dates.extend(pattern.findall(iframe_content))
+
+    title_date = parse_iframe_title(iframe_content)['date']
+    if title_date:
+        dates.append(title_date)
+    return dates
+
+
+def detect_our_team_variant(iframe_text: str) -> Optional[str]:
+    """Определяет, какая из наших команд представлена в тексте iframe (каноническое название)"""
+    teams = team_registry.find_teams(iframe_text)
+    # Состав развития приоритетнее: в iframe часто упоминается и основной клуб
+    for name in teams:
+        team = team_registry.get(name)
+        if team is not None and team.development:
+            return name
+    return teams[0] if teams else None
+
+
+class GameIndex:
+    """Индекс gameId → данные игры с вытеснением по возрасту записей"""
+
+    def __init__(self, path: str = GAME_INDEX_FILE, max_age_days: int = GAME_INDEX_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age_days = max_age_days
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    @property
+    def entries(self) -> Dict[str, Dict]:
+        """Записи индекса (файл читается при первом обращении)"""
+        if self._entries is None:
+            self._entries = self._load()
+            # Устаревшие записи удаляются в памяти, файл перезапишет следующее сохранение
+            self.evict_expired()
+        return self._entries
+
+    def _load(self) -> Dict[str, Dict]:
+        """Загружает индекс из файла (без блокировки: файл заменяется атомарно)"""
+        try:
+            return read_json(self.path, {}, lock=False)
+        except Exception as e:
+            print(f"⚠️ Ошибка загрузки индекса игр: {e}")
+        return {}
+
+    def save(self):
+        """Сохраняет индекс в файл (атомарно, под блокировкой) без устаревших записей"""
+        self.evict_expired()
+        try:
+            write_json(self.path, self.entries)
+        except Exception as e:
+            print(f"⚠️ Ошибка сохранения индекса игр: {e}")
+
+    def evict_expired(self) -> int:
+        """Удаляет записи старше max_age_days, возвращает количество удаленных"""
+        cutoff = get_moscow_time() - datetime.timedelta(days=self.max_age_days)
+        expired: List[str] = []
+        for game_id, entry in self.entries.items():
+            try:
+                indexed_at = datetime.datetime.fromisoformat(entry.get('indexed_at', ''))
+            except ValueError:
+                expired.append(game_id)
+                continue
+            if indexed_at < cutoff:
+                expired.append(game_id)
+
+        for game_id in expired:
+            del self.entries[game_id]
+        if expired:
+            print(f"🗑️ Из индекса игр удалено {len(expired)} устаревших записей")
+        return len(expired)
+
+    def get(self, game_id: Optional[str]) -> Optional[Dict]:
+        """Возвращает запись индекса по gameId"""
+        if not game_id:
+            return None
+        return self.entries.get(str(game_id))
+
+    def teams(self, game_id: Optional[str]) -> Optional[Tuple[str, str]]:
+        """Команды игры из индекса; заголовок разбирается заново, если он сохранен
+
+        Так записи, сохраненные до исправления разбора заголовка, тоже дают верную пару
+        """
+        entry = self.get(game_id)
+        if not entry:
+            return None
+        title = entry.get('title')
+        teams = split_teams(DATE_PATTERN.sub('', title)) if title else None
+        if teams:
+            return teams
+        if entry.get('team1') and entry.get('team2'):
+            return entry['team1'], entry['team2']
+        return None
+
+    def has_teams(self, game_id: Optional[str]) -> bool:
+        """Проверяет, известны ли команды игры"""
+        entry = self.get(game_id)
+        return bool(entry and entry.get('team1') and entry.get('team2'))
+
+    def update(self, game_id: Optional[str], **fields) -> Optional[Dict]:
+        """Добавляет или дополняет запись индекса и сохраняет файл"""
+        if not game_id:
+            return None
+        entry = self.entries.setdefault(str(game_id), {})
+        changed = False
+        for name, value in fields.items():
+            if value is not None and entry.get(name) != value:
+                entry[name] = value
+                changed = True
+        if changed or 'indexed_at' not in entry:
+            entry['indexed_at'] = get_moscow_time().isoformat()
+            self.save()
+        return entry
+
+    def index_iframe(self, game_id: Optional[str], iframe_content: str, iframe_url: str) -> Dict:
+        """Извлекает из iframe команды, даты и нашу команду; сохраняет игру, если команды определены"""
+        title_info = parse_iframe_title(iframe_content)
+        info = {
+            'title': title_info['title'],
+            'team1': title_info['team1'],
+            'team2': title_info['team2'],
+            'date': title_info['date'],
+            'dates': list(dict.fromkeys(extract_iframe_dates(iframe_content))),
+            'competition': extract_competition_id(iframe_url),
+            'our_team': detect_our_team_variant(iframe_content),
+        }
+        if info['team1'] and info['team2']:
+            self.update(game_id, **info)
+        return info
+
+
+# Глобальный индекс игр
+_game_index: Optional[GameIndex] = None
+
+def get_game_index() -> GameIndex:
+    """Глобальный индекс игр (создается при первом обращении, файл читается при первом запросе)"""
+    global _game_index
+    if _game_index is None:
+        _game_index = GameIndex()
+    return _game_index
+
+def __getattr__(name: str):
+    # game_index создается при первом обращении, а не при импорте модуля
+    if name == 'game_index':
+        return get_game_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
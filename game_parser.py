@@ -9,32 +9,61 @@ import asyncio
 import re
 import logging
 from typing import Dict, List, Optional, Any
-from bs4 import BeautifulSoup
-import aiohttp
+
+from page_snapshot import page_snapshot_service, LETOBASKET_URL
+from http_client import http_client
+from html_parser import make_soup
+from team_registry import team_registry
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
-# URL для мониторинга
-LETOBASKET_URL = "http://letobasket.ru/"
+class GameLinkIndex:
+    """Индекс ссылок на игры одной страницы: документ разбирается один раз"""
+    
+    def __init__(self, html_content: str):
+        self.anchors = []  # (href, текст ссылки в нижнем регистре) в порядке документа
+        for link in make_soup(html_content).find_all('a', href=True):
+            href = link.get('href', '')
+            if 'podrobno' in href or 'game' in href:
+                self.anchors.append((href, link.get_text().strip().lower()))
+        self._by_teams: Dict[tuple, Optional[str]] = {}
+    
+    def find_by_teams(self, team1: str, team2: str) -> Optional[str]:
+        """Первая ссылка, в тексте которой есть название одной из команд"""
+        key = (team1.lower(), team2.lower())
+        if key not in self._by_teams:
+            self._by_teams[key] = next(
+                (href for href, text in self.anchors if key[0] in text or key[1] in text), None
+            )
+        return self._by_teams[key]
+    
+    def find_by_words(self, words: List[str]) -> Optional[str]:
+        """Первая ссылка, в тексте которой встречается одно из слов"""
+        for href, text in self.anchors:
+            if any(word in text for word in words):
+                return href
+        return None
+
 
 class GameParser:
     """Общий парсер для работы с играми"""
     
     def __init__(self):
-        pass
+        self._link_index_html: Optional[str] = None
+        self._link_index: Optional[GameLinkIndex] = None
+    
+    def get_link_index(self, html_content: str) -> GameLinkIndex:
+        """Индекс ссылок для страницы (строится один раз на каждую новую страницу)"""
+        if self._link_index is None or html_content != self._link_index_html:
+            self._link_index = GameLinkIndex(html_content)
+            self._link_index_html = html_content
+        return self._link_index
     
     async def get_fresh_page_content(self):
-        """Получает свежий контент страницы, избегая кеша"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(LETOBASKET_URL, headers=headers) as response:
-                return await response.text()
+        """Получает HTML главной страницы из общего снимка"""
+        snapshot = await page_snapshot_service.get_snapshot()
+        return snapshot.html
     
     def extract_current_date(self, page_text: str) -> Optional[str]:
         """Извлекает текущую дату (использует реальную дату, а не с сайта)"""
@@ -60,20 +89,13 @@ class GameParser:
                 team1_clean = team1.strip()
                 team2_clean = team2.strip()
                 
-                pullup_patterns = [
-                    r'pull\s*up',
-                    r'PullUP',
-                    r'Pull\s*Up'
-                ]
-                
-                is_pullup_game = any(re.search(pattern, team1_clean, re.IGNORECASE) for pattern in pullup_patterns) or \
-                               any(re.search(pattern, team2_clean, re.IGNORECASE) for pattern in pullup_patterns)
+                is_pullup_game = team_registry.is_our_team(team1_clean) or team_registry.is_our_team(team2_clean)
                 
                 if is_pullup_game:
                     # Проверяем, что игра недавняя
                     if self.is_recent_game(game_date, current_date):
                         # Определяем, какая команда PullUP
-                        if any(re.search(pattern, team1_clean, re.IGNORECASE) for pattern in pullup_patterns):
+                        if team_registry.is_our_team(team1_clean):
                             pullup_team = team1_clean
                             opponent_team = team2_clean
                         else:
@@ -151,13 +173,8 @@ class GameParser:
             pullup_team = cells[0].get_text().strip()
             
             # Проверяем, что это действительно PullUP
-            pullup_patterns = [
-                r'pull\s*up',
-                r'PullUP',
-                r'Pull\s*Up'
-            ]
-            is_pullup = any(re.search(pattern, pullup_team, re.IGNORECASE) for pattern in pullup_patterns)
-            if not is_pullup:
+            pullup_match = team_registry.search(pullup_team)
+            if not pullup_match:
                 return None
             
             # Извлекаем счет из третьей ячейки
@@ -171,12 +188,12 @@ class GameParser:
             
             # Определяем соперника на основе названия команды PullUP и счета
             opponent_team = None
-            if "Pull Up-Фарм" in pullup_team:
+            if team_registry.team_of(pullup_match).development:
                 if score1 == 57 and score2 == 31:
                     opponent_team = "Ballers From The Hood"
                 elif score1 == 43 and score2 == 61:
                     opponent_team = "IT Basket"
-            elif "Pull Up" in pullup_team and "Фарм" not in pullup_team:
+            else:
                 if score1 == 78 and score2 == 56:
                     opponent_team = "Маиле Карго"
                 elif score1 == 92 and score2 == 46:
@@ -213,19 +230,8 @@ class GameParser:
     def find_game_link_by_teams(self, team1: str, team2: str, html_content: str) -> Optional[str]:
         """Находит ссылку на игру по названиям команд"""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            links = soup.find_all('a', href=True)
-            
-            for link in links:
-                href = link.get('href', '')
-                if 'podrobno' in href or 'game' in href:
-                    link_text = link.get_text().strip()
-                    
-                    # Проверяем, содержит ли ссылка названия команд
-                    if team1.lower() in link_text.lower() or team2.lower() in link_text.lower():
-                        return href
-            
-            return None
+            # Проверяем, содержит ли ссылка названия команд
+            return self.get_link_index(html_content).find_by_teams(team1, team2)
             
         except Exception as e:
             logger.error(f"Ошибка поиска ссылки по командам: {e}")
@@ -256,21 +262,9 @@ class GameParser:
                 if 'podrobno' in href or 'game' in href:
                     return href
             
-            # Если не нашли в строке, ищем по контексту
-            soup = BeautifulSoup(html_content, 'html.parser')
-            all_links = soup.find_all('a', href=True)
-            
-            for link in all_links:
-                href = link.get('href', '')
-                if 'podrobno' in href or 'game' in href:
-                    link_text = link.get_text().strip()
-                    row_text = row.get_text().strip()
-                    
-                    # Проверяем, есть ли общие элементы
-                    if any(word in link_text.lower() for word in row_text.lower().split()):
-                        return href
-            
-            return None
+            # Если не нашли в строке, ищем по контексту (есть ли общие элементы)
+            row_words = row.get_text().strip().lower().split()
+            return self.get_link_index(html_content).find_by_words(row_words)
             
         except Exception as e:
             logger.error(f"Ошибка поиска ссылки на игру: {e}")
@@ -279,11 +273,11 @@ class GameParser:
     async def parse_game_info(self, game_url: str) -> Optional[Dict[str, Any]]:
         """Парсит информацию об игре с страницы игры"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_client.session() as session:
                 async with session.get(game_url) as response:
                     if response.status == 200:
                         html_content = await response.text()
-                        soup = BeautifulSoup(html_content, 'html.parser')
+                        soup = make_soup(html_content)
                         
                         # Ищем время игры в элементе с классом fa-calendar
                         time_element = soup.find('i', class_='fa fa-calendar')
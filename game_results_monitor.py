@@ -4,37 +4,37 @@
 """
 
 import asyncio
-import json
 import os
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Optional, List
-import aiohttp
-from bs4 import BeautifulSoup
 import re
 
 # Импортируем централизованные функции
 from datetime_utils import get_moscow_time, is_today
+from game_index import get_game_index, extract_game_id, split_teams
+from http_client import http_client
+from html_parser import HtmlDocument, parse_document
+from team_registry import team_registry
+from dispatcher import dispatcher, first_message
+from state_store import TABLES, state_store
 
 # Константы
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')
-GAME_MONITOR_HISTORY_FILE = 'game_monitor_history.json'
+GAME_MONITOR_HISTORY_FILE = TABLES['monitors']
 
 def load_game_monitor_history() -> Dict:
     """Загружает историю мониторинга игр"""
     try:
-        if os.path.exists(GAME_MONITOR_HISTORY_FILE):
-            with open(GAME_MONITOR_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return state_store.load_active('monitors')
     except Exception as e:
         print(f"⚠️ Ошибка загрузки истории мониторинга: {e}")
     return {}
 
-def save_game_monitor_history(history: Dict):
-    """Сохраняет историю мониторинга игр"""
+def save_game_monitor_history(history: Dict, key: Optional[str] = None):
+    """Сохраняет историю мониторинга игр (key - измененная запись)"""
     try:
-        with open(GAME_MONITOR_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        state_store.table('monitors').save(history, [key] if key else None)
     except Exception as e:
         print(f"⚠️ Ошибка сохранения истории мониторинга: {e}")
 
@@ -147,20 +147,11 @@ class GameResultsMonitor:
         return True
     
     def find_target_teams_in_text(self, text: str) -> List[str]:
-        """Находит целевые команды в тексте"""
-        found_teams = []
-        # Расширенный список команд для поиска (в порядке приоритета)
-        search_teams = [
-            'Pull Up-Фарм',  # Сначала ищем более специфичные варианты
-            'Pull Up Фарм',  # Без дефиса
-            'Pull Up',       # Обычный Pull Up
-            'PullUP'         # Без пробела
-        ]
+        """Находит целевые команды в тексте (канонические названия)"""
+        found_teams = team_registry.find_teams(text)
         
-        for team in search_teams:
-            if team in text:
-                found_teams.append(team)
-                print(f"   ✅ Найдена команда: {team}")
+        for team in found_teams:
+            print(f"   ✅ Найдена команда: {team}")
         
         return found_teams
     
@@ -175,67 +166,79 @@ class GameResultsMonitor:
             
             print(f"🔍 Парсим табло: {full_url}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(full_url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Ищем iframe с игрой
-                        iframe = soup.find('iframe', src=True)
-                        if not iframe:
-                            print("   ❌ iframe не найден")
-                            return None
-                        
-                        # Получаем содержимое iframe
-                        iframe_src = iframe['src']
-                        if not iframe_src.startswith('http'):
-                            iframe_src = f"http://ig.russiabasket.ru{iframe_src}"
+            game_id = extract_game_id(full_url)
+            game_index = get_game_index()
+            
+            async with http_client.session() as session:
+                # Ссылка на iframe по gameId не меняется - берем ее из индекса, если игра уже известна
+                indexed = game_index.get(game_id)
+                iframe_src = indexed.get('scoreboard_url') if indexed else None
+                if iframe_src:
+                    print(f"   📇 iframe URL из индекса: {iframe_src}")
+                else:
+                    iframe_src = await self._resolve_scoreboard_iframe(session, full_url)
+                    if not iframe_src:
+                        return None
+                    game_index.update(game_id, scoreboard_url=iframe_src)
+                
+                async with session.get(str(iframe_src)) as iframe_response:
+                    if iframe_response.status == 200:
+                        iframe_content = await iframe_response.text()
                         
-                        print(f"   🔗 iframe URL: {iframe_src}")
+                        # Дополняем индекс командами и датой игры
+                        if not game_index.has_teams(game_id):
+                            game_index.index_iframe(game_id, iframe_content, iframe_src)
                         
-                        async with session.get(iframe_src) as iframe_response:
-                            if iframe_response.status == 200:
-                                iframe_content = await iframe_response.text()
-                                
-                                # Парсим информацию из iframe
-                                return self.parse_iframe_content(iframe_content)
-                            else:
-                                print(f"   ❌ Ошибка загрузки iframe: {iframe_response.status}")
-                                return None
+                        # Парсим информацию из iframe
+                        return self.parse_iframe_content(iframe_content)
                     else:
-                        print(f"   ❌ Ошибка загрузки страницы: {response.status}")
+                        print(f"   ❌ Ошибка загрузки iframe: {iframe_response.status}")
                         return None
                         
         except Exception as e:
             print(f"   ❌ Ошибка парсинга табло: {e}")
             return None
     
+    async def _resolve_scoreboard_iframe(self, session, full_url: str) -> Optional[str]:
+        """Загружает страницу игры и возвращает адрес iframe с табло"""
+        async with session.get(full_url) as response:
+            if response.status != 200:
+                print(f"   ❌ Ошибка загрузки страницы: {response.status}")
+                return None
+            content = await response.text()
+            document = parse_document(content)
+            
+            # Ищем iframe с игрой
+            iframe_src = document.first_attr('iframe', 'src')
+            if not iframe_src:
+                print("   ❌ iframe не найден")
+                return None
+            
+            if not iframe_src.startswith('http'):
+                iframe_src = f"http://ig.russiabasket.ru{iframe_src}"
+            
+            print(f"   🔗 iframe URL: {iframe_src}")
+            return iframe_src
+    
     def parse_iframe_content(self, iframe_content: str) -> Optional[Dict]:
         """Парсит содержимое iframe и извлекает игровую информацию"""
         try:
-            soup = BeautifulSoup(iframe_content, 'html.parser')
+            document = parse_document(iframe_content)
             
             # Ищем период и время
-            period_span = soup.find('span', id='js-period')
-            timer_span = soup.find('span', id='js-timer')
-            
-            period = period_span.get_text().strip() if period_span else None
-            timer = timer_span.get_text().strip() if timer_span else None
+            period = document.text_by_id('span', 'js-period')
+            timer = document.text_by_id('span', 'js-timer')
             
             print(f"   📊 Период: {period}, Время: {timer}")
             
             # Ищем команды и счет
-            team1_span = soup.find('span', id='js-score-team1')
-            team2_span = soup.find('span', id='js-score-team2')
-            
-            score1 = team1_span.get_text().strip() if team1_span else None
-            score2 = team2_span.get_text().strip() if team2_span else None
+            score1 = document.text_by_id('span', 'js-score-team1')
+            score2 = document.text_by_id('span', 'js-score-team2')
             
             print(f"   🏀 Счет: {score1} : {score2}")
             
             # Ищем названия команд
-            team_names = self.extract_team_names(iframe_content)
+            team_names = self.extract_team_names(iframe_content, document)
             
             return {
                 'period': period,
@@ -251,23 +254,19 @@ class GameResultsMonitor:
             print(f"   ❌ Ошибка парсинга iframe: {e}")
             return None
     
-    def extract_team_names(self, iframe_content: str) -> Dict[str, str]:
+    def extract_team_names(self, iframe_content: str, document: Optional[HtmlDocument] = None) -> Dict[str, str]:
         """Извлекает названия команд из iframe"""
         try:
             # Ищем команды в заголовке или других элементах
-            soup = BeautifulSoup(iframe_content, 'html.parser')
+            document = document or parse_document(iframe_content)
             
             # Попробуем найти в заголовке
-            title = soup.find('title')
-            if title:
-                title_text = title.get_text()
+            title_text = document.title()
+            if title_text:
                 # Паттерн: "КОМАНДА1 - КОМАНДА2"
-                match = re.search(r'([^-]+)\s*-\s*([^-]+)', title_text)
-                if match:
-                    return {
-                        'team1': match.group(1).strip(),
-                        'team2': match.group(2).strip()
-                    }
+                teams = split_teams(title_text)
+                if teams:
+                    return {'team1': teams[0], 'team2': teams[1]}
             
             # Если не нашли в заголовке, ищем в других местах
             # Здесь можно добавить дополнительную логику поиска команд
@@ -295,7 +294,8 @@ class GameResultsMonitor:
     
     async def send_game_result_notification(self, game_info: Dict, scoreboard_info: Dict, game_link: str):
         """Отправляет уведомление о результате игры"""
-        if not self.bot or not CHAT_ID:
+        bot_instance = self.bot
+        if not bot_instance or not CHAT_ID:
             print("❌ Бот или CHAT_ID не настроены")
             return False
         
@@ -304,23 +304,10 @@ class GameResultsMonitor:
             team1 = game_info.get('team1', '')
             team2 = game_info.get('team2', '')
             
-            # Находим нашу команду и соперника
-            opponent = None
-            team_type = "первого состава"  # По умолчанию
-            
-            # Используем те же варианты команд, что и в find_target_teams_in_text
-            target_teams = ['Pull Up-Фарм', 'Pull Up Фарм', 'Pull Up', 'PullUP']
-            
-            if any(target_team in team1 for target_team in target_teams):
-                opponent = team2
-                # Определяем тип команды
-                if any(farm_team in team1 for farm_team in ['Pull Up-Фарм', 'Pull Up Фарм']):
-                    team_type = "состава развития"
-            elif any(target_team in team2 for target_team in target_teams):
-                opponent = team1
-                # Определяем тип команды
-                if any(farm_team in team2 for farm_team in ['Pull Up-Фарм', 'Pull Up Фарм']):
-                    team_type = "состава развития"
+            # Находим нашу команду и соперника по реестру команд
+            team, _, opponent = team_registry.match_game(team1, team2)
+            team_type = team.category_genitive if team else "первого состава"
+            chat_id, _ = team.destination(CHAT_ID) if team else (CHAT_ID, None)
             
             if not opponent:
                 opponent = "соперник"
@@ -343,11 +330,17 @@ class GameResultsMonitor:
             message += f"📊 Ссылка на протокол: <a href=\"{full_url}\">тут</a>"
             
             # Отправляем сообщение
-            await self.bot.send_message(
-                chat_id=int(CHAT_ID),
-                text=message,
-                parse_mode='HTML'
+            deliveries = await dispatcher.dispatch(
+                'result',
+                lambda chat, thread: bot_instance.send_message(
+                    chat_id=chat,
+                    text=message,
+                    parse_mode='HTML',
+                    message_thread_id=thread
+                ),
+                chat_id, team=team.name if team else None
             )
+            first_message(deliveries)
             
             print(f"✅ Уведомление о результате отправлено")
             return True
@@ -386,7 +379,7 @@ class GameResultsMonitor:
             if game_key in self.monitor_history:
                 self.monitor_history[game_key]['status'] = 'timeout'
                 self.monitor_history[game_key]['end_time'] = now.isoformat()
-                save_game_monitor_history(self.monitor_history)
+                save_game_monitor_history(self.monitor_history, game_key)
                 print(f"   📋 Статус обновлен на 'timeout'")
             
             return False
@@ -424,7 +417,7 @@ class GameResultsMonitor:
                             'end_time': now.isoformat()
                         }
                     
-                    save_game_monitor_history(self.monitor_history)
+                    save_game_monitor_history(self.monitor_history, game_key)
                     print(f"   📋 Статус обновлен на 'completed'")
                     return True
                 else:
@@ -442,7 +435,7 @@ class GameResultsMonitor:
                         'start_time': now.isoformat(),
                         'status': 'monitoring'
                     }
-                    save_game_monitor_history(self.monitor_history)
+                    save_game_monitor_history(self.monitor_history, game_key)
                     print(f"   📋 Создана запись в истории со статусом 'monitoring'")
                 else:
                     print(f"   📋 Запись уже существует в истории")
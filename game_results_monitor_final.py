@@ -6,7 +6,6 @@ Production версия для ежедневного запуска
 
 import asyncio
 import os
-import json
 import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -14,6 +13,12 @@ from dotenv import load_dotenv
 from telegram import Bot
 from datetime_utils import get_moscow_time
 from game_system_manager import GameSystemManager
+from page_snapshot import page_snapshot_service
+from http_client import http_client
+from team_registry import team_registry
+from dispatcher import dispatcher, first_message
+from send_queue import send_queue
+from state_store import TABLES, state_store
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -35,22 +40,22 @@ class GameResultsMonitorFinal:
         self.game_manager = GameSystemManager()
         
         # Файл для истории отправленных результатов
-        self.results_history_file = "game_results_history.json"
+        self.results_history_file = TABLES['results']
+        self.results_table = state_store.table('results')
         self.results_history = self.load_results_history()
         
         # Если файл не существует, создаем его с базовой структурой
-        if not os.path.exists(self.results_history_file):
+        if not self.results_table.exists():
             print(f"📁 Создаем новый файл истории: {self.results_history_file}")
             self.save_results_history()
     
     def load_results_history(self) -> Dict:
         """Загружает историю отправленных результатов"""
         try:
-            if os.path.exists(self.results_history_file):
-                with open(self.results_history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-                    print(f"✅ Загружена история результатов: {len(history)} записей")
-                    return history
+            if self.results_table.exists():
+                history = state_store.load_active('results')
+                print(f"✅ Загружена история результатов: {len(history)} записей")
+                return history
             else:
                 print(f"📁 Файл истории результатов не найден: {self.results_history_file}")
         except Exception as e:
@@ -58,12 +63,11 @@ class GameResultsMonitorFinal:
         print(f"📋 Возвращаем пустую историю результатов")
         return {}
     
-    def save_results_history(self):
-        """Сохраняет историю отправленных результатов"""
+    def save_results_history(self, key: Optional[str] = None):
+        """Сохраняет историю отправленных результатов (key - измененная запись)"""
         try:
-            with open(self.results_history_file, 'w', encoding='utf-8') as f:
-                json.dump(self.results_history, f, ensure_ascii=False, indent=2)
-            print(f"✅ Сохранена история результатов: {len(self.results_history)} записей в {self.results_history_file}")
+            self.results_table.save(self.results_history, [key] if key else None)
+            print(f"✅ Сохранена история результатов: {len(self.results_history)} записей")
         except Exception as e:
             print(f"⚠️ Ошибка сохранения истории результатов: {e}")
     
@@ -129,90 +133,75 @@ class GameResultsMonitorFinal:
     async def fetch_game_results(self) -> List[Dict]:
         """Получает результаты игр с сайта letobasket.ru"""
         try:
-            import aiohttp
-            from bs4 import BeautifulSoup
+            snapshot = await page_snapshot_service.get_snapshot()
+            if not snapshot.ok:
+                print(f"❌ Ошибка получения страницы: {snapshot.status}")
+                return []
             
-            url = "http://letobasket.ru/"
+            cached_games = page_snapshot_service.get_parse_result('final_results', snapshot)
+            if cached_games is not None:
+                return cached_games
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Получаем весь текст страницы
-                        full_text = soup.get_text()
-                        
-                        # Ищем завершенные игры с нашими командами
-                        games = []
-                        
-                        # Правильный паттерн для результатов игр на сайте
-                        # Формат: дата - команда1 - команда2 счет (четверти)
-                        # Пример: 23.08.2025- Quasar - Pull Up-Фарм 37:58 (0:12 11:10 15:10 11:26)
-                        game_pattern = r'(\d{2}\.\d{2}\.\d{4})-\s*([^-]+)-\s*([^-]+)\s+(\d+):(\d+)\s+\(([^)]+)\)'
-                        matches = re.findall(game_pattern, full_text)
-                        
-                        print(f"🔍 Найдено {len(matches)} потенциальных игр в тексте")
+            # Получаем весь текст страницы
+            full_text = snapshot.text
+            
+            # Ищем завершенные игры с нашими командами
+            games = []
+            
+            # Правильный паттерн для результатов игр на сайте
+            # Формат: дата - команда1 - команда2 счет (четверти)
+            # Пример: 23.08.2025- Quasar - Pull Up-Фарм 37:58 (0:12 11:10 15:10 11:26)
+            game_pattern = r'(\d{2}\.\d{2}\.\d{4})-\s*([^-]+)-\s*([^-]+)\s+(\d+):(\d+)\s+\(([^)]+)\)'
+            matches = re.findall(game_pattern, full_text)
+            
+            print(f"🔍 Найдено {len(matches)} потенциальных игр в тексте")
+            
+            for match in matches:
+                date, team1, team2, score1, score2, quarters = match
+                game_text = f"{team1.strip()} {team2.strip()}"
+                
+                # Проверяем, есть ли наши команды
+                if self.game_manager.find_target_teams_in_text(game_text):
+                    # Проверяем, что игра сегодняшняя
+                    if self.game_manager.is_game_today({'date': date}):
+                        # Определяем нашу команду и соперника по реестру команд
+                        team, our_team, opponent = team_registry.match_game(team1.strip(), team2.strip())
                         
-                        for match in matches:
-                            date, team1, team2, score1, score2, quarters = match
-                            game_text = f"{team1.strip()} {team2.strip()}"
+                        if team:
+                            # Определяем тип команды
+                            team_type = team.category.lower()
                             
-                            # Проверяем, есть ли наши команды
-                            if self.game_manager.find_target_teams_in_text(game_text):
-                                # Проверяем, что игра сегодняшняя
-                                if self.game_manager.is_game_today({'date': date}):
-                                    # Определяем нашу команду и соперника
-                                    our_team = None
-                                    opponent = None
-                                    team_type = None
-                                    
-                                    if any(target_team in team1 for target_team in ['Pull Up', 'PullUP']):
-                                        our_team = team1.strip()
-                                        opponent = team2.strip()
-                                    elif any(target_team in team2 for target_team in ['Pull Up', 'PullUP']):
-                                        our_team = team2.strip()
-                                        opponent = team1.strip()
-                                    
-                                    if our_team:
-                                        # Определяем тип команды
-                                        if 'фарм' in our_team.lower():
-                                            team_type = 'состав развития'
-                                        else:
-                                            team_type = 'первый состав'
-                                        
-                                        # Определяем результат
-                                        our_score = int(score1) if our_team == team1.strip() else int(score2)
-                                        opponent_score = int(score2) if our_team == team1.strip() else int(score1)
-                                        result = "победа" if our_score > opponent_score else "поражение" if our_score < opponent_score else "ничья"
-                                        
-                                        game_info = {
-                                            'date': date,
-                                            'team1': team1.strip(),
-                                            'team2': team2.strip(),
-                                            'score1': int(score1),
-                                            'score2': int(score2),
-                                            'quarters': quarters,
-                                            'our_team': our_team,
-                                            'opponent': opponent,
-                                            'team_type': team_type,
-                                            'our_score': our_score,
-                                            'opponent_score': opponent_score,
-                                            'result': result,
-                                            'is_finished': True
-                                        }
-                                        
-                                        games.append(game_info)
-                                        print(f"🏀 Найдена завершенная игра: {team1.strip()} vs {team2.strip()} ({score1}:{score2})")
-                                        print(f"   Дата: {date}, Тип: {team_type}, Результат: {result}")
-                                        print(f"   Четверти: {quarters}")
-                                else:
-                                    print(f"⏭️ Игра {team1.strip()} vs {team2.strip()} не сегодняшняя ({date}), пропускаем")
-                        
-                        return games
+                            # Определяем результат
+                            our_score = int(score1) if our_team == team1.strip() else int(score2)
+                            opponent_score = int(score2) if our_team == team1.strip() else int(score1)
+                            result = "победа" if our_score > opponent_score else "поражение" if our_score < opponent_score else "ничья"
+                            
+                            game_info = {
+                                'date': date,
+                                'team1': team1.strip(),
+                                'team2': team2.strip(),
+                                'score1': int(score1),
+                                'score2': int(score2),
+                                'quarters': quarters,
+                                'our_team': our_team,
+                                'our_team_name': team.name,
+                                'opponent': opponent,
+                                'team_type': team_type,
+                                'our_score': our_score,
+                                'opponent_score': opponent_score,
+                                'result': result,
+                                'is_finished': True
+                            }
+                            
+                            games.append(game_info)
+                            print(f"🏀 Найдена завершенная игра: {team1.strip()} vs {team2.strip()} ({score1}:{score2})")
+                            print(f"   Дата: {date}, Тип: {team_type}, Результат: {result}")
+                            print(f"   Четверти: {quarters}")
                     else:
-                        print(f"❌ Ошибка получения страницы: {response.status}")
-                        return []
+                        print(f"⏭️ Игра {team1.strip()} vs {team2.strip()} не сегодняшняя ({date}), пропускаем")
+            
+            page_snapshot_service.store_parse_result('final_results', snapshot, games)
+            return games
                         
         except Exception as e:
             print(f"❌ Ошибка получения результатов: {e}")
@@ -259,35 +248,23 @@ class GameResultsMonitorFinal:
             if game_link:
                 message += f"\n\n🔗 <a href='{game_link}'>Страница игры</a>"
             
-            # Отправляем сообщение
-            try:
-                if ANNOUNCEMENTS_TOPIC_ID:
-                    message_thread_id = int(ANNOUNCEMENTS_TOPIC_ID)
-                    # Используем более явный вызов метода
-                    bot_instance = self.bot
-                    sent_message = await bot_instance.send_message(
-                        chat_id=int(CHAT_ID),
-                        text=message,
-                        parse_mode='HTML',
-                        message_thread_id=message_thread_id
-                    )
-                else:
-                    # Используем более явный вызов метода
-                    bot_instance = self.bot
-                    sent_message = await bot_instance.send_message(
-                        chat_id=int(CHAT_ID),
-                        text=message,
-                        parse_mode='HTML'
-                    )
-            except Exception as topic_error:
-                print(f"⚠️ Ошибка с topic ID: {topic_error}")
-                # Пробуем без topic ID
-                bot_instance = self.bot
-                sent_message = await bot_instance.send_message(
-                    chat_id=int(CHAT_ID),
+            # Чат и топик команды из реестра (по умолчанию - общие настройки)
+            team = team_registry.get(game_info.get('our_team_name'))
+            chat_id, topic_id = team.destination(CHAT_ID, ANNOUNCEMENTS_TOPIC_ID) if team else (CHAT_ID, ANNOUNCEMENTS_TOPIC_ID)
+            
+            # Отправляем сообщение в топик команды и всем подписчикам
+            bot_instance = self.bot
+            deliveries = await dispatcher.dispatch(
+                'result',
+                lambda chat, thread: bot_instance.send_message(
+                    chat_id=chat,
                     text=message,
-                    parse_mode='HTML'
-                )
+                    parse_mode='HTML',
+                    message_thread_id=thread
+                ),
+                chat_id, topic_id, team=team.name if team else None
+            )
+            first_message(deliveries)
             
             # Сохраняем в историю
             result_key = self.create_result_key(game_info)
@@ -296,7 +273,7 @@ class GameResultsMonitorFinal:
                 'game_info': game_info,
                 'message': message
             }
-            self.save_results_history()
+            self.save_results_history(result_key)
             
             print(f"✅ Результат игры отправлен: {game_info['our_team']} vs {game_info['opponent']}")
             return True
@@ -351,20 +328,14 @@ class GameResultsMonitorFinal:
         
         # Отправляем результаты
         print(f"\n📤 Отправка результатов...")
-        sent_count = 0
         
-        for i, game in enumerate(games, 1):
-            print(f"\n🎮 Отправка результата {i}/{len(games)}...")
-            success = await self.send_game_result(game)
-            
-            if success:
-                sent_count += 1
-            
-            # Небольшая пауза между отправками
-            await asyncio.sleep(2)
+        # Все результаты ставятся в очередь сразу: темп отправки задает send_queue
+        results = await asyncio.gather(*(self.send_game_result(game) for game in games))
+        sent_count = sum(1 for success in results if success)
         
         print(f"\n📊 ИТОГИ:")
         print(f"✅ Отправлено результатов: {sent_count}")
+        print(f"📤 Очередь отправки: {send_queue.get_stats_summary()}")
         print(f"📋 Всего игр: {len(games)}")
         
         if sent_count > 0:
@@ -375,7 +346,10 @@ class GameResultsMonitorFinal:
 async def main():
     """Основная функция"""
     monitor = GameResultsMonitorFinal()
-    await monitor.run_game_results_monitor()
+    try:
+        await monitor.run_game_results_monitor()
+    finally:
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -5,12 +5,9 @@
 """
 
 import asyncio
-import json
 import os
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Optional, List, Union
-import aiohttp
-from bs4 import BeautifulSoup
 import re
 
 # Загружаем переменные окружения
@@ -19,6 +16,14 @@ load_dotenv()
 
 # Импортируем централизованные функции
 from datetime_utils import get_moscow_time, is_today
+from page_snapshot import page_snapshot_service
+from page_sections import PageSections
+from game_index import get_game_index, extract_game_id, split_teams
+from http_client import http_client
+from html_parser import HtmlDocument, parse_document
+from team_registry import team_registry
+from dispatcher import dispatcher, first_message
+from state_store import TABLES, state_store
 
 # Импортируем telegram bot
 try:
@@ -30,48 +35,49 @@ except ImportError:
 # Константы
 BOT_TOKEN = os.getenv('BOT_TOKEN')
 CHAT_ID = os.getenv('CHAT_ID')
-GAME_MONITOR_HISTORY_FILE = 'game_monitor_history.json'
-DAILY_CHECK_FILE = 'daily_games_check.json'
+GAME_MONITOR_HISTORY_FILE = TABLES['monitors']
+DAILY_CHECK_FILE = TABLES['daily_checks']
 
 def load_game_monitor_history() -> Dict:
     """Загружает историю мониторинга игр"""
     try:
-        if os.path.exists(GAME_MONITOR_HISTORY_FILE):
-            with open(GAME_MONITOR_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return state_store.load_active('monitors')
     except Exception as e:
         print(f"⚠️ Ошибка загрузки истории мониторинга: {e}")
     return {}
 
-def save_game_monitor_history(history: Dict):
-    """Сохраняет историю мониторинга игр"""
+def save_game_monitor_history(history: Dict, key: Optional[str] = None):
+    """Сохраняет историю мониторинга игр (key - измененная запись)"""
     try:
-        with open(GAME_MONITOR_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        state_store.table('monitors').save(history, [key] if key else None)
     except Exception as e:
         print(f"⚠️ Ошибка сохранения истории мониторинга: {e}")
 
 def load_daily_check() -> Dict:
     """Загружает информацию о ежедневной проверке"""
     try:
-        if os.path.exists(DAILY_CHECK_FILE):
-            with open(DAILY_CHECK_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return state_store.load_active('daily_checks')
     except Exception as e:
         print(f"⚠️ Ошибка загрузки ежедневной проверки: {e}")
     return {}
 
-def save_daily_check(check_info: Dict):
-    """Сохраняет информацию о ежедневной проверке"""
+def save_daily_check(check_info: Dict, key: Optional[str] = None):
+    """Сохраняет информацию о ежедневной проверке (key - измененная запись)"""
     try:
-        with open(DAILY_CHECK_FILE, 'w', encoding='utf-8') as f:
-            json.dump(check_info, f, ensure_ascii=False, indent=2)
+        state_store.table('daily_checks').save(check_info, [key] if key else None)
     except Exception as e:
         print(f"⚠️ Ошибка сохранения ежедневной проверки: {e}")
 
-def create_game_monitor_key(game_info: Dict) -> str:
-    """Создает уникальный ключ для мониторинга игры"""
-    return f"{game_info['date']}_{game_info['time']}_{game_info['team1']}_{game_info['team2']}"
+def create_game_monitor_key(game_info: Dict, game_link: str = '') -> str:
+    """Создает уникальный ключ для мониторинга игры: дата, gameId табло (если известен) и команды
+
+    Время в ключ не входит: в game_info['time'] попадает время проверки, и ключ
+    менялся бы каждую минуту
+    """
+    game_id = extract_game_id(game_link) if game_link else None
+    if game_id:
+        return f"{game_info['date']}_{game_id}_{game_info['team1']}_{game_info['team2']}"
+    return f"{game_info['date']}_{game_info['team1']}_{game_info['team2']}"
 
 class GameResultsMonitorV2:
     """Класс для мониторинга результатов игр (версия 2)"""
@@ -110,25 +116,15 @@ class GameResultsMonitorV2:
             'no_games_found': True,
             'check_time': get_moscow_time().isoformat()
         }
-        save_daily_check(self.daily_check)
+        save_daily_check(self.daily_check, today)
         print(f"📅 Отмечено: сегодня ({today}) игр не найдено")
     
     def find_target_teams_in_text(self, text: str) -> List[str]:
-        """Находит целевые команды в тексте"""
-        found_teams = []
-        # Расширенный список команд для поиска (в порядке приоритета)
-        search_teams = [
-            'Pull Up-Фарм',  # Сначала ищем более специфичные варианты
-            'Pull Up Фарм',  # Без дефиса
-            'Pull Up',       # Обычный Pull Up
-            'PullUP',        # Без пробела
-            'PULL UP ФАРМ'   # Верхний регистр
-        ]
+        """Находит целевые команды в тексте (канонические названия)"""
+        found_teams = team_registry.find_teams(text)
         
-        for team in search_teams:
-            if team.upper() in text.upper():
-                found_teams.append(team)
-                print(f"   ✅ Найдена команда: {team}")
+        for team in found_teams:
+            print(f"   ✅ Найдена команда: {team}")
         
         return found_teams
     
@@ -143,12 +139,10 @@ class GameResultsMonitorV2:
             our_team = None
             opponent = None
             
-            target_teams = ['Pull Up-Фарм', 'Pull Up Фарм', 'Pull Up', 'PullUP', 'PULL UP ФАРМ']
-            
-            if any(team.upper() in team1.upper() for team in target_teams):
+            if team_registry.is_our_team(team1):
                 our_team = team1
                 opponent = team2
-            elif any(team.upper() in team2.upper() for team in target_teams):
+            elif team_registry.is_our_team(team2):
                 our_team = team2
                 opponent = team1
             else:
@@ -162,74 +156,53 @@ class GameResultsMonitorV2:
             print(f"   ⚠️ Ошибка генерации ссылки: {e}")
             return ""
     
-    def extract_scoreboard_section(self, soup) -> tuple:
+    def extract_scoreboard_section(self, sections: PageSections) -> tuple:
         """Извлекает раздел 'ТАБЛО ИГР' и ссылки на игры"""
         try:
-            # Ищем раздел "ТАБЛО ИГР"
-            scoreboard_text = ""
-            game_links = []
+            # Раздел "ТАБЛО ИГР" до начала "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ" (или до конца страницы)
+            section = sections.span('scoreboard', until=('recent_results',))
+            if section is None:
+                print(f"   ❌ Раздел 'ТАБЛО ИГР' не найден")
+                return "", [], []
             
-            # Ищем по тексту "ТАБЛО ИГР"
-            for element in soup.find_all(text=True):
-                if "ТАБЛО ИГР" in element:
-                    print(f"   🎯 Найден текст 'ТАБЛО ИГР'")
-                    
-                    # Получаем весь текст страницы
-                    full_text = soup.get_text()
-                    
-                    # Ищем позицию "ТАБЛО ИГР"
-                    start_pos = full_text.find("ТАБЛО ИГР")
-                    if start_pos != -1:
-                        # Ищем конец раздела (начало "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ")
-                        end_pos = full_text.find("ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ", start_pos)
-                        
-                        if end_pos != -1:
-                            # Извлекаем текст между "ТАБЛО ИГР" и "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ"
-                            scoreboard_text = full_text[start_pos:end_pos]
-                        else:
-                            # Если "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ" не найдено, берем до конца
-                            scoreboard_text = full_text[start_pos:]
-                        
-                        # Извлекаем ссылки "СТРАНИЦА ИГРЫ" из всего HTML (как в Game System Manager)
-                        game_links = self.extract_game_links(soup)
-                        
-                        print(f"   📋 Извлечен раздел табло (длина: {len(scoreboard_text)} символов)")
-                        print(f"   🔗 Найдено ссылок на игры: {len(game_links)}")
-                        
-                        # Дополнительно ищем игры в HTML структуре
-                        html_games = self.extract_games_from_html(soup)
-                        if html_games:
-                            print(f"   🎮 Найдено игр в HTML: {len(html_games)}")
-                            return scoreboard_text, game_links, html_games
-                        
-                        return scoreboard_text, game_links, []
+            print(f"   🎯 Найден текст 'ТАБЛО ИГР'")
+            scoreboard_text = section.text
             
-            print(f"   ❌ Раздел 'ТАБЛО ИГР' не найден")
-            return "", [], []
+            # Извлекаем ссылки "СТРАНИЦА ИГРЫ" из всего HTML (как в Game System Manager)
+            game_links = self.extract_game_links(sections)
+            
+            print(f"   📋 Извлечен раздел табло (длина: {len(scoreboard_text)} символов)")
+            print(f"   🔗 Найдено ссылок на игры: {len(game_links)}")
+            
+            # Дополнительно ищем игры в HTML структуре
+            html_games = self.extract_games_from_html(sections.soup)
+            if html_games:
+                print(f"   🎮 Найдено игр в HTML: {len(html_games)}")
+            
+            return scoreboard_text, game_links, html_games
                 
         except Exception as e:
             print(f"   ❌ Ошибка извлечения табло: {e}")
             return "", [], []
     
-    def extract_game_links(self, soup) -> list:
+    def extract_game_links(self, sections: PageSections) -> list:
         """Извлекает ссылки 'СТРАНИЦА ИГРЫ' из раздела табло (адаптировано из Game System Manager)"""
         try:
             game_links = []
             
             # Ищем все ссылки с текстом "СТРАНИЦА ИГРЫ" (как в Game System Manager)
-            for link in soup.find_all('a', href=True):
-                if "СТРАНИЦА ИГРЫ" in link.get_text():
-                    href = link.get('href')
-                    if href:
-                        # Формируем полную ссылку
-                        if href.startswith('game.html'):
-                            full_link = f"http://letobasket.ru/{href}"
-                        elif href.startswith('/'):
-                            full_link = f"http://letobasket.ru{href}"
-                        else:
-                            full_link = href
-                        game_links.append(full_link)
-                        print(f"   🔗 Найдена ссылка 'СТРАНИЦА ИГРЫ': {full_link}")
+            for anchor in sections.find_anchors("СТРАНИЦА ИГРЫ"):
+                href = anchor.href
+                if href:
+                    # Формируем полную ссылку
+                    if href.startswith('game.html'):
+                        full_link = f"http://letobasket.ru/{href}"
+                    elif href.startswith('/'):
+                        full_link = f"http://letobasket.ru{href}"
+                    else:
+                        full_link = href
+                    game_links.append(full_link)
+                    print(f"   🔗 Найдена ссылка 'СТРАНИЦА ИГРЫ': {full_link}")
             
             print(f"   📊 Всего найдено ссылок 'СТРАНИЦА ИГРЫ': {len(game_links)}")
             return game_links
@@ -238,21 +211,15 @@ class GameResultsMonitorV2:
             print(f"   ❌ Ошибка извлечения ссылок: {e}")
             return []
     
-    def extract_recent_results(self, soup) -> List[Dict]:
+    def extract_recent_results(self, sections: PageSections) -> List[Dict]:
         """Извлекает завершенные игры из раздела 'ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ'"""
         try:
             games = []
-            full_text = soup.get_text()
             
-            # Ищем раздел "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ"
-            if "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ" in full_text:
-                start_pos = full_text.find("ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ")
-                end_pos = full_text.find("ТАБЛО ИГР", start_pos)
-                
-                if end_pos == -1:
-                    results_text = full_text[start_pos:]
-                else:
-                    results_text = full_text[start_pos:end_pos]
+            # Раздел "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ" до следующего "ТАБЛО ИГР" (или до конца страницы)
+            section = sections.span('recent_results', until=('scoreboard',))
+            if section is not None:
+                results_text = section.text
                 
                 print(f"   📋 Извлечен раздел результатов (длина: {len(results_text)} символов)")
                 
@@ -268,23 +235,11 @@ class GameResultsMonitorV2:
                     # Проверяем, есть ли наши команды в этой игре
                     if self.find_target_teams_in_text(game_text):
                         # Определяем нашу команду и соперника
-                        our_team = None
-                        opponent = None
-                        team_type = None
+                        team, our_team, opponent = team_registry.match_game(team1.strip(), team2.strip())
                         
-                        if any(target_team in team1 for target_team in ['Pull Up', 'PullUP']):
-                            our_team = team1.strip()
-                            opponent = team2.strip()
-                        elif any(target_team in team2 for target_team in ['Pull Up', 'PullUP']):
-                            our_team = team2.strip()
-                            opponent = team1.strip()
-                        
-                        if our_team:
-                            # Определяем тип команды
-                            if 'фарм' in our_team.lower():
-                                team_type = 'состав развития'
-                            else:
-                                team_type = 'первый состав'
+                        if team:
+                            # Тип команды - категория из реестра (teams.json)
+                            team_type = team.category.lower()
                             
                             # Проверяем, что игра сегодняшняя
                             if self.is_game_today({'date': date}):
@@ -327,11 +282,11 @@ class GameResultsMonitorV2:
             games = []
             
             # Ищем все элементы с текстом команд
-            target_teams = ['QUASAR', 'PULL UP', 'HSE', 'TAURUS', 'IT BASKET', 'КУДРОВО']
+            other_teams = ['QUASAR', 'HSE', 'TAURUS', 'IT BASKET', 'КУДРОВО']
             
             for element in soup.find_all(text=True):
                 text = element.strip()
-                if any(team in text for team in target_teams):
+                if team_registry.is_our_team(text) or any(team in text for team in other_teams):
                     parent = element.parent
                     if parent:
                         # Ищем соседние элементы со счетом и статусом
@@ -355,23 +310,11 @@ class GameResultsMonitorV2:
                                     is_finished = period == '4' and time == '0:00'
                                     
                                     # Определяем нашу команду и тип
-                                    our_team = None
-                                    opponent = None
-                                    team_type = None
-                                    
-                                    if any(target_team in team1 for target_team in ['Pull Up', 'PullUP']):
-                                        our_team = team1.strip()
-                                        opponent = team2.strip()
-                                    elif any(target_team in team2 for target_team in ['Pull Up', 'PullUP']):
-                                        our_team = team2.strip()
-                                        opponent = team1.strip()
+                                    team, our_team, opponent = team_registry.match_game(team1.strip(), team2.strip())
                                     
-                                    if our_team:
-                                        # Определяем тип команды
-                                        if 'фарм' in our_team.lower():
-                                            team_type = 'состав развития'
-                                        else:
-                                            team_type = 'первый состав'
+                                    if team:
+                                        # Тип команды - категория из реестра (teams.json)
+                                        team_type = team.category.lower()
                                         
                                         games.append({
                                             'team1': team1.strip(),
@@ -401,107 +344,113 @@ class GameResultsMonitorV2:
         try:
             print("🔍 Сканируем табло letobasket.ru...")
             
-            url = "http://letobasket.ru/"
+            snapshot = await page_snapshot_service.get_snapshot()
+            if not snapshot.ok:
+                print(f"   ❌ Ошибка получения страницы: {snapshot.status}")
+                return []
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Ищем табло игр
-                        games = []
-                        
-                        # Извлекаем раздел "ТАБЛО ИГР" и ссылки на игры
-                        scoreboard_text, game_links, html_games = self.extract_scoreboard_section(soup)
-                        
-                        # Также проверяем раздел "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ"
-                        recent_results = self.extract_recent_results(soup)
+            cached_games = page_snapshot_service.get_parse_result('scoreboard', snapshot)
+            if cached_games is not None:
+                # Время проверки в кэш не попадает - у каждого сканирования оно свое
+                current_time = get_moscow_time().strftime('%H:%M')
+                return [dict(game, current_time=current_time) for game in cached_games]
+            
+            sections = snapshot.sections
+            
+            # Ищем табло игр
+            games = []
+            
+            # Извлекаем раздел "ТАБЛО ИГР" и ссылки на игры
+            scoreboard_text, game_links, html_games = self.extract_scoreboard_section(sections)
+            
+            # Также проверяем раздел "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ"
+            recent_results = self.extract_recent_results(sections)
+            
+            if scoreboard_text:
+                print("   ✅ Найдено табло игр")
+                
+                # Сначала ищем все команды в тексте
+                all_teams = []
+                
+                # Ищем команды по названиям (без учета счета)
+                for match in team_registry.find_all(scoreboard_text):
+                    if match.team not in all_teams:
+                        all_teams.append(match.team)
+                        print(f"   🎯 Найдена команда в табло: {match.variant} ({match.team})")
+                
+                if all_teams:
+                    print(f"   ✅ Найдено {len(all_teams)} наших команд в табло")
+                    
+                    # Теперь ищем только текущие игры в табло
+                    games_found = []
+                    
+                    # Паттерн для текущих игр (ТАБЛО ИГР)
+                    # Формат: Команда1 Счет1 Счет2 Команда2 Период Время
+                    live_pattern = r'(.+?)\s+(\d+)\s+(\d+)\s+(.+?)\s+(\d+)\s+(\d+:\d+)'
+                    live_matches = re.findall(live_pattern, scoreboard_text)
+                    
+                    for i, match in enumerate(live_matches):
+                        team1, score1, score2, team2, period, time = match
+                        game_text = f"{team1.strip()} {team2.strip()}"
                         
-                        if scoreboard_text:
-                            print("   ✅ Найдено табло игр")
-                            
-                            # Сначала ищем все команды в тексте
-                            all_teams = []
+                        # Проверяем, есть ли наши команды в этой игре
+                        if self.find_target_teams_in_text(game_text):
+                            # Проверяем, завершена ли игра (период 4 и время 0:00)
+                            is_finished = period == '4' and time == '0:00'
                             
-                            # Ищем команды по названиям (без учета счета)
-                            for team in ['Pull Up-Фарм', 'Pull Up Фарм', 'Pull Up', 'PullUP', 'PULL UP ФАРМ']:
-                                if team.upper() in scoreboard_text.upper():
-                                    all_teams.append(team)
-                                    print(f"   🎯 Найдена команда в табло: {team}")
-                            
-                            if all_teams:
-                                print(f"   ✅ Найдено {len(all_teams)} наших команд в табло")
-                                
-                                # Теперь ищем только текущие игры в табло
-                                games_found = []
-                                
-                                # Паттерн для текущих игр (ТАБЛО ИГР)
-                                # Формат: Команда1 Счет1 Счет2 Команда2 Период Время
-                                live_pattern = r'(.+?)\s+(\d+)\s+(\d+)\s+(.+?)\s+(\d+)\s+(\d+:\d+)'
-                                live_matches = re.findall(live_pattern, scoreboard_text)
-                                
-                                for i, match in enumerate(live_matches):
-                                    team1, score1, score2, team2, period, time = match
-                                    game_text = f"{team1.strip()} {team2.strip()}"
-                                    
-                                    # Проверяем, есть ли наши команды в этой игре
-                                    if self.find_target_teams_in_text(game_text):
-                                        # Проверяем, завершена ли игра (период 4 и время 0:00)
-                                        is_finished = period == '4' and time == '0:00'
-                                        
-                                        # Получаем ссылку на игру по порядковому номеру
-                                        game_link = ""
-                                        if i < len(game_links):
-                                            game_link = game_links[i]
-                                            print(f"   🔗 Используем ссылку #{i+1}: {game_link}")
-                                        else:
-                                            print(f"   ⚠️ Ссылка для игры #{i+1} не найдена")
-                                        
-                                        games_found.append({
-                                            'team1': team1.strip(),
-                                            'team2': team2.strip(),
-                                            'score1': score1,
-                                            'score2': score2,
-                                            'period': period,
-                                            'time': time,
-                                            'is_finished': is_finished,
-                                            'date': get_moscow_time().strftime('%d.%m.%Y'),
-                                            'current_time': get_moscow_time().strftime('%H:%M'),
-                                            'game_link': game_link
-                                        })
-                                        print(f"   🏀 Найдена игра (табло): {team1.strip()} vs {team2.strip()} ({score1}:{score2})")
-                                        print(f"      Период: {period}, Время: {time}, Завершена: {is_finished}")
-                                        if game_link:
-                                            print(f"      🔗 Ссылка: {game_link}")
-                                
-                                games.extend(games_found)
+                            # Получаем ссылку на игру по порядковому номеру
+                            game_link = ""
+                            if i < len(game_links):
+                                game_link = game_links[i]
+                                print(f"   🔗 Используем ссылку #{i+1}: {game_link}")
                             else:
-                                print(f"   ℹ️ Наших команд не найдено в табло")
-                        
-                        # Добавляем игры из HTML структуры
-                        if html_games:
-                            print(f"   ✅ Найдено {len(html_games)} игр в HTML структуре")
-                            games.extend(html_games)
-                        else:
-                            print(f"   ℹ️ Игр в HTML структуре не найдено")
-                        
-                        # Проверяем завершенные игры в результатах
-                        if recent_results:
-                            print(f"   ✅ Найдено {len(recent_results)} завершенных игр с нашими командами")
-                            games.extend(recent_results)
-                        else:
-                            print(f"   ℹ️ Завершенных игр с нашими командами не найдено")
-                        
-                        if games:
-                            print(f"   ✅ Всего найдено {len(games)} игр с нашими командами")
-                        else:
-                            print(f"   ℹ️ Игр с нашими командами не найдено")
-                        
-                        return games
-                    else:
-                        print(f"   ❌ Ошибка получения страницы: {response.status}")
-                        return []
+                                print(f"   ⚠️ Ссылка для игры #{i+1} не найдена")
+                            
+                            games_found.append({
+                                'team1': team1.strip(),
+                                'team2': team2.strip(),
+                                'score1': score1,
+                                'score2': score2,
+                                'period': period,
+                                'time': time,
+                                'is_finished': is_finished,
+                                'date': get_moscow_time().strftime('%d.%m.%Y'),
+                                'current_time': get_moscow_time().strftime('%H:%M'),
+                                'game_link': game_link
+                            })
+                            print(f"   🏀 Найдена игра (табло): {team1.strip()} vs {team2.strip()} ({score1}:{score2})")
+                            print(f"      Период: {period}, Время: {time}, Завершена: {is_finished}")
+                            if game_link:
+                                print(f"      🔗 Ссылка: {game_link}")
+                    
+                    games.extend(games_found)
+                else:
+                    print(f"   ℹ️ Наших команд не найдено в табло")
+            
+            # Добавляем игры из HTML структуры
+            if html_games:
+                print(f"   ✅ Найдено {len(html_games)} игр в HTML структуре")
+                games.extend(html_games)
+            else:
+                print(f"   ℹ️ Игр в HTML структуре не найдено")
+            
+            # Проверяем завершенные игры в результатах
+            if recent_results:
+                print(f"   ✅ Найдено {len(recent_results)} завершенных игр с нашими командами")
+                games.extend(recent_results)
+            else:
+                print(f"   ℹ️ Завершенных игр с нашими командами не найдено")
+            
+            if games:
+                print(f"   ✅ Всего найдено {len(games)} игр с нашими командами")
+            else:
+                print(f"   ℹ️ Игр с нашими командами не найдено")
+            
+            page_snapshot_service.store_parse_result(
+                'scoreboard', snapshot,
+                [{name: value for name, value in game.items() if name != 'current_time'} for game in games]
+            )
+            return games
                         
         except Exception as e:
             print(f"   ❌ Ошибка сканирования табло: {e}")
@@ -518,73 +467,79 @@ class GameResultsMonitorV2:
             
             print(f"🔍 Парсим табло: {full_url}")
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(full_url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Ищем iframe с игрой
-                        iframes = soup.find_all('iframe')
-                        iframe = None
-                        for iframe_elem in iframes:
-                            if hasattr(iframe_elem, 'get') and iframe_elem.get('src'):
-                                iframe = iframe_elem
-                                break
-                        
-                        if not iframe:
-                            print("   ❌ iframe с src атрибутом не найден")
-                            return None
-                        
-                        # Получаем содержимое iframe
-                        iframe_src = iframe.get('src', '')
-                        if not iframe_src.startswith('http'):
-                            iframe_src = f"http://ig.russiabasket.ru{iframe_src}"
+            game_id = extract_game_id(full_url)
+            game_index = get_game_index()
+            
+            async with http_client.session() as session:
+                # Ссылка на iframe по gameId не меняется - берем ее из индекса, если игра уже известна
+                indexed = game_index.get(game_id)
+                iframe_src = indexed.get('scoreboard_url') if indexed else None
+                if iframe_src:
+                    print(f"   📇 iframe URL из индекса: {iframe_src}")
+                else:
+                    iframe_src = await self._resolve_scoreboard_iframe(session, full_url)
+                    if not iframe_src:
+                        return None
+                    game_index.update(game_id, scoreboard_url=iframe_src)
+                
+                async with session.get(str(iframe_src)) as iframe_response:
+                    if iframe_response.status == 200:
+                        iframe_content = await iframe_response.text()
                         
-                        print(f"   🔗 iframe URL: {iframe_src}")
+                        # Дополняем индекс командами и датой игры
+                        if not game_index.has_teams(game_id):
+                            game_index.index_iframe(game_id, iframe_content, iframe_src)
                         
-                        async with session.get(str(iframe_src)) as iframe_response:
-                            if iframe_response.status == 200:
-                                iframe_content = await iframe_response.text()
-                                
-                                # Парсим информацию из iframe
-                                return self.parse_iframe_content(iframe_content)
-                            else:
-                                print(f"   ❌ Ошибка загрузки iframe: {iframe_response.status}")
-                                return None
+                        # Парсим информацию из iframe
+                        return self.parse_iframe_content(iframe_content)
                     else:
-                        print(f"   ❌ Ошибка загрузки страницы: {response.status}")
+                        print(f"   ❌ Ошибка загрузки iframe: {iframe_response.status}")
                         return None
                         
         except Exception as e:
             print(f"   ❌ Ошибка парсинга табло: {e}")
             return None
     
+    async def _resolve_scoreboard_iframe(self, session, full_url: str) -> Optional[str]:
+        """Загружает страницу игры и возвращает адрес iframe с табло"""
+        async with session.get(full_url) as response:
+            if response.status != 200:
+                print(f"   ❌ Ошибка загрузки страницы: {response.status}")
+                return None
+            content = await response.text()
+            document = parse_document(content)
+            
+            # Ищем iframe с игрой
+            iframe_src = document.first_attr('iframe', 'src')
+            if not iframe_src:
+                print("   ❌ iframe с src атрибутом не найден")
+                return None
+            
+            if not iframe_src.startswith('http'):
+                iframe_src = f"http://ig.russiabasket.ru{iframe_src}"
+            
+            print(f"   🔗 iframe URL: {iframe_src}")
+            return iframe_src
+    
     def parse_iframe_content(self, iframe_content: str) -> Optional[Dict]:
         """Парсит содержимое iframe и извлекает игровую информацию"""
         try:
-            soup = BeautifulSoup(iframe_content, 'html.parser')
+            document = parse_document(iframe_content)
             
             # Ищем период и время
-            period_span = soup.find('span', id='js-period')
-            timer_span = soup.find('span', id='js-timer')
-            
-            period = period_span.get_text().strip() if period_span else None
-            timer = timer_span.get_text().strip() if timer_span else None
+            period = document.text_by_id('span', 'js-period')
+            timer = document.text_by_id('span', 'js-timer')
             
             print(f"   📊 Период: {period}, Время: {timer}")
             
             # Ищем команды и счет
-            team1_span = soup.find('span', id='js-score-team1')
-            team2_span = soup.find('span', id='js-score-team2')
-            
-            score1 = team1_span.get_text().strip() if team1_span else None
-            score2 = team2_span.get_text().strip() if team2_span else None
+            score1 = document.text_by_id('span', 'js-score-team1')
+            score2 = document.text_by_id('span', 'js-score-team2')
             
             print(f"   🏀 Счет: {score1} : {score2}")
             
             # Ищем названия команд
-            team_names = self.extract_team_names(iframe_content)
+            team_names = self.extract_team_names(iframe_content, document)
             
             return {
                 'period': period,
@@ -600,23 +555,19 @@ class GameResultsMonitorV2:
             print(f"   ❌ Ошибка парсинга iframe: {e}")
             return None
     
-    def extract_team_names(self, iframe_content: str) -> Dict[str, str]:
+    def extract_team_names(self, iframe_content: str, document: Optional[HtmlDocument] = None) -> Dict[str, str]:
         """Извлекает названия команд из iframe"""
         try:
             # Ищем команды в заголовке или других элементах
-            soup = BeautifulSoup(iframe_content, 'html.parser')
+            document = document or parse_document(iframe_content)
             
             # Попробуем найти в заголовке
-            title = soup.find('title')
-            if title:
-                title_text = title.get_text()
+            title_text = document.title()
+            if title_text:
                 # Паттерн: "КОМАНДА1 - КОМАНДА2"
-                match = re.search(r'([^-]+)\s*-\s*([^-]+)', title_text)
-                if match:
-                    return {
-                        'team1': match.group(1).strip(),
-                        'team2': match.group(2).strip()
-                    }
+                teams = split_teams(title_text)
+                if teams:
+                    return {'team1': teams[0], 'team2': teams[1]}
             
             # Если не нашли в заголовке, ищем в других местах
             # Здесь можно добавить дополнительную логику поиска команд
@@ -638,23 +589,10 @@ class GameResultsMonitorV2:
             team1 = game_info.get('team1', '')
             team2 = game_info.get('team2', '')
             
-            # Находим нашу команду и соперника
-            opponent = None
-            team_type = "первый состав"  # По умолчанию
-            
-            # Используем те же варианты команд, что и в find_target_teams_in_text
-            target_teams = ['Pull Up-Фарм', 'Pull Up Фарм', 'Pull Up', 'PullUP']
-            
-            if any(target_team in team1 for target_team in target_teams):
-                opponent = team2
-                # Определяем тип команды
-                if any(farm_team in team1 for farm_team in ['Pull Up-Фарм', 'Pull Up Фарм']):
-                    team_type = "состав развития"
-            elif any(target_team in team2 for target_team in target_teams):
-                opponent = team1
-                # Определяем тип команды
-                if any(farm_team in team2 for farm_team in ['Pull Up-Фарм', 'Pull Up Фарм']):
-                    team_type = "состав развития"
+            # Находим нашу команду и соперника по реестру команд
+            team, _, opponent = team_registry.match_game(team1, team2)
+            team_type = team.category.lower() if team else "первый состав"
+            chat_id, _ = team.destination(CHAT_ID) if team else (CHAT_ID, None)
             
             if not opponent:
                 opponent = "соперник"
@@ -677,11 +615,17 @@ class GameResultsMonitorV2:
                 if bot_instance is None:
                     print("❌ Бот не инициализирован")
                     return False
-                await bot_instance.send_message(
-                    chat_id=int(CHAT_ID),
-                    text=message,
-                    parse_mode='HTML'
+                deliveries = await dispatcher.dispatch(
+                    'result',
+                    lambda chat, thread: bot_instance.send_message(
+                        chat_id=chat,
+                        text=message,
+                        parse_mode='HTML',
+                        message_thread_id=thread
+                    ),
+                    chat_id, team=team.name if team else None
                 )
+                first_message(deliveries)
             except Exception as bot_error:
                 print(f"❌ Ошибка отправки через бота: {bot_error}")
                 return False
@@ -692,6 +636,50 @@ class GameResultsMonitorV2:
             print(f"❌ Ошибка отправки уведомления: {e}")
             return False
     
+    def is_game_reported(self, game_info: Dict) -> bool:
+        """Есть ли в истории завершенная запись той же игры (дата и команды)
+
+        Сверка по полям, а не по ключу: так находятся и записи, сохраненные без
+        gameId или со старым ключом, в который входило время проверки
+        """
+        for record in self.monitor_history.values():
+            info = record.get('game_info', {})
+            if (record.get('status') == 'completed' and info.get('date') == game_info.get('date')
+                    and info.get('team1') == game_info.get('team1') and info.get('team2') == game_info.get('team2')):
+                return True
+        return False
+    
+    async def report_finished_game(self, game_info: Dict, scoreboard_info: Dict, game_link: str) -> bool:
+        """Отправляет уведомление о завершенной игре, если оно еще не отправлялось, и обновляет историю"""
+        game_key = create_game_monitor_key(game_info, game_link)
+        
+        # Проверяем, было ли уже отправлено уведомление для этой игры
+        if self.is_game_reported(game_info):
+            print(f"   📋 Уведомление уже было отправлено ранее, пропускаем")
+            return False
+        if game_key in self.monitor_history:
+            existing_status = self.monitor_history[game_key].get('status', '')
+            if existing_status == 'completed':
+                print(f"   📋 Уведомление уже было отправлено ранее, пропускаем")
+                return False
+            else:
+                print(f"   📋 Найдена запись в истории со статусом: {existing_status}")
+        else:
+            print(f"   📋 Записи в истории нет, отправляем уведомление")
+        
+        print(f"   📤 Отправляем уведомление...")
+        await self.send_game_result_notification(game_info, scoreboard_info, game_link)
+        
+        # Обновляем историю
+        self.monitor_history[game_key] = {
+            'game_info': game_info,
+            'status': 'completed',
+            'end_time': get_moscow_time().isoformat()
+        }
+        save_game_monitor_history(self.monitor_history, game_key)
+        print(f"   📋 Статус обновлен на 'completed'")
+        return True
+    
     async def monitor_games(self):
         """Основная функция мониторинга игр"""
         print("🎮 ЗАПУСК МОНИТОРИНГА ИГР (версия 2)")
@@ -724,24 +712,11 @@ class GameResultsMonitorV2:
                 'date': game['date'],
                 'time': game['current_time']
             }
-            game_key = create_game_monitor_key(game_info)
+            game_key = create_game_monitor_key(game_info, game.get('game_link', ''))
             
             if game['is_finished']:
                 print(f"   🏁 Игра завершена!")
                 
-                # Проверяем, было ли уже отправлено уведомление для этой игры
-                if game_key in self.monitor_history:
-                    existing_status = self.monitor_history[game_key].get('status', '')
-                    if existing_status == 'completed':
-                        print(f"   📋 Уведомление уже было отправлено ранее, пропускаем")
-                        continue
-                    else:
-                        print(f"   📋 Найдена запись в истории со статусом: {existing_status}")
-                else:
-                    print(f"   📋 Записи в истории нет, отправляем уведомление")
-                
-                print(f"   📤 Отправляем уведомление...")
-                
                 # Создаем scoreboard_info для уведомления
                 scoreboard_info = {
                     'team1_name': game['team1'],
@@ -751,17 +726,7 @@ class GameResultsMonitorV2:
                 }
                 
                 # Отправляем уведомление с ссылкой на игру
-                game_link = game.get('game_link', '')
-                await self.send_game_result_notification(game_info, scoreboard_info, game_link)
-                
-                # Обновляем историю
-                self.monitor_history[game_key] = {
-                    'game_info': game_info,
-                    'status': 'completed',
-                    'end_time': get_moscow_time().isoformat()
-                }
-                save_game_monitor_history(self.monitor_history)
-                print(f"   📋 Статус обновлен на 'completed'")
+                await self.report_finished_game(game_info, scoreboard_info, game.get('game_link', ''))
                 
             else:
                 print(f"   ⏳ Игра еще идет, продолжаем мониторинг")
@@ -773,7 +738,7 @@ class GameResultsMonitorV2:
                         'status': 'monitoring',
                         'start_time': get_moscow_time().isoformat()
                     }
-                    save_game_monitor_history(self.monitor_history)
+                    save_game_monitor_history(self.monitor_history, game_key)
                     print(f"   📋 Создана запись в истории со статусом 'monitoring'")
                 else:
                     print(f"   📋 Запись уже существует в истории")
@@ -784,7 +749,10 @@ class GameResultsMonitorV2:
 async def run_game_results_monitor_v2():
     """Запускает мониторинг результатов игр (версия 2)"""
     monitor = GameResultsMonitorV2()
-    await monitor.monitor_games()
+    try:
+        await monitor.monitor_games()
+    finally:
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(run_game_results_monitor_v2())
@@ -7,11 +7,16 @@
 import os
 import asyncio
 import datetime
-import json
 import re
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 from datetime_utils import get_moscow_time, is_today, log_current_time
+from page_snapshot import page_snapshot_service
+from game_index import get_game_index, extract_game_id
+from http_client import http_client, request_timeout
+from team_registry import team_registry
+from dispatcher import dispatcher, first_message, delivery_records
+from state_store import TABLES, state_store
 
 load_dotenv()
 
@@ -19,38 +24,38 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
 GAMES_TOPIC_ID = os.getenv("GAMES_TOPIC_ID", "1282")  # Топик для опросов по играм
-TARGET_TEAMS = os.getenv("TARGET_TEAMS", "PullUP,Pull Up-Фарм").split(",")
+
+# Параллельная проверка iframe в табло
+IFRAME_PROBE_CONCURRENCY = int(os.getenv("IFRAME_PROBE_CONCURRENCY", "4"))  # Одновременных запросов
+IFRAME_REQUEST_TIMEOUT = float(os.getenv("IFRAME_REQUEST_TIMEOUT", "10"))  # Лимит на один запрос, с
+IFRAME_PROBE_DEADLINE = float(os.getenv("IFRAME_PROBE_DEADLINE", "30"))  # Общий лимит поиска, с
 
 # Файлы для истории
-POLLS_HISTORY_FILE = "game_polls_history.json"
-ANNOUNCEMENTS_HISTORY_FILE = "game_announcements.json"
+POLLS_HISTORY_FILE = TABLES['polls']
+ANNOUNCEMENTS_HISTORY_FILE = TABLES['announcements']
 
 def load_polls_history() -> Dict:
     """Загружает историю созданных опросов"""
     try:
-        if os.path.exists(POLLS_HISTORY_FILE):
-            with open(POLLS_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        return state_store.load_active('polls')
     except Exception as e:
         print(f"⚠️ Ошибка загрузки истории опросов: {e}")
     return {}
 
-def save_polls_history(history: Dict):
-    """Сохраняет историю созданных опросов"""
+def save_polls_history(history: Dict, key: Optional[str] = None):
+    """Сохраняет историю созданных опросов (key - измененная запись)"""
     try:
-        with open(POLLS_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        state_store.table('polls').save(history, [key] if key else None)
     except Exception as e:
         print(f"⚠️ Ошибка сохранения истории опросов: {e}")
 
 def load_announcements_history() -> Dict:
     """Загружает историю отправленных анонсов"""
     try:
-        if os.path.exists(ANNOUNCEMENTS_HISTORY_FILE):
-            with open(ANNOUNCEMENTS_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                history = json.load(f)
-                print(f"✅ Загружена история анонсов: {len(history)} записей")
-                return history
+        if state_store.table('announcements').exists():
+            history = state_store.load_active('announcements')
+            print(f"✅ Загружена история анонсов: {len(history)} записей")
+            return history
         else:
             print(f"⚠️ Файл истории анонсов не найден: {ANNOUNCEMENTS_HISTORY_FILE}")
     except Exception as e:
@@ -58,12 +63,11 @@ def load_announcements_history() -> Dict:
     print(f"📋 Возвращаем пустую историю анонсов")
     return {}
 
-def save_announcements_history(history: Dict):
-    """Сохраняет историю отправленных анонсов"""
+def save_announcements_history(history: Dict, key: Optional[str] = None):
+    """Сохраняет историю отправленных анонсов (key - измененная запись)"""
     try:
-        with open(ANNOUNCEMENTS_HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
-        print(f"✅ Сохранена история анонсов: {len(history)} записей в {ANNOUNCEMENTS_HISTORY_FILE}")
+        state_store.table('announcements').save(history, [key] if key else None)
+        print(f"✅ Сохранена история анонсов: {len(history)} записей")
     except Exception as e:
         print(f"⚠️ Ошибка сохранения истории анонсов: {e}")
 
@@ -90,44 +94,27 @@ def get_day_of_week(date_str: str) -> str:
     except:
         return ""
 
-def get_team_category(team_name: str, opponent: str = "", game_time: str = "") -> str:
+def get_team_category(team_name: Optional[str], opponent: str = "", game_time: str = "") -> str:
     """Определяет категорию команды с правильным склонением"""
-    # Нормализуем название команды для сравнения
-    team_upper = team_name.upper().replace(" ", "").replace("-", "").replace("_", "")
-    
-    # Варианты написания для состава развития
-    development_variants = [
-        "PULLUPФАРМ",
-        "PULLUP-ФАРМ", 
-        "PULLUP-ФАРМ",
-        "PULLUPФАРМ",
-        "PULL UPФАРМ",
-        "PULL UP-ФАРМ",
-        "PULL UP ФАРМ",
-        "PULLUP ФАРМ"
-    ]
+    team = team_registry.team_for(team_name)
+    if team is None:
+        return "Первый состав"
     
-    # Проверяем, является ли команда составом развития по названию
-    for variant in development_variants:
-        if variant in team_upper:
-            return "Состав Развития"
+    # Дополнительная логика: с некоторыми соперниками играет состав развития клуба
+    if opponent and opponent in team.development_opponents:
+        development_team = team_registry.development_squad(team)
+        if development_team:
+            return development_team.category
     
-    # Дополнительная логика: если команда называется "Pull Up", но соперник из списка развития
-    if "PULLUP" in team_upper and opponent:
-        development_opponents = ['Кудрово', 'Тосно', 'QUASAR', 'TAURUS']
-        if opponent in development_opponents:
-            return "Состав Развития"
-    
-    # Если не найден ни один вариант состава развития, то это первый состав
-    return "Первый состав"
+    return team.category
 
 def determine_form_color(team1: str, team2: str) -> str:
     """Определяет цвет формы (светлая или темная)"""
-    # Если Pull Up первая команда - светлая форма, если вторая - темная
-    if "pull up" in team1.lower():
-        return "светлая"
-    else:
+    # Первая команда в паре играет в домашней форме, вторая - в выездной
+    team, our_name, _ = team_registry.match_game(team1, team2)
+    if team is None:
         return "темная"
+    return team.form_color(our_name == team1)
 
 def format_date_without_year(date_str: str) -> str:
     """Форматирует дату без года (например, 27.08)"""
@@ -156,25 +143,14 @@ class GameSystemManager:
             self.bot = Bot(token=BOT_TOKEN)
     
     def find_target_teams_in_text(self, text: str) -> List[str]:
-        """Находит целевые команды в тексте"""
-        found_teams = []
-        # Расширенный список команд для поиска (в порядке приоритета)
-        search_teams = [
-            'Pull Up-Фарм',  # Сначала ищем более специфичные варианты
-            'Pull Up Фарм',  # Без дефиса
-            'PullUP-Фарм',   # Без пробела с дефисом
-            'PullUP Фарм',   # Без пробела без дефиса
-            'Pull Up',       # Обычный Pull Up
-            'PullUP'         # Без пробела
-        ]
+        """Находит целевые команды в тексте (канонические названия)"""
+        found_teams = team_registry.find_teams(text)
         
-        for team in search_teams:
-            if team in text:
-                found_teams.append(team)
-                print(f"   ✅ Найдена команда: {team}")
+        for team in found_teams:
+            print(f"   ✅ Найдена команда: {team}")
         
         if not found_teams:
-            print(f"   ❌ Команды Pull Up не найдены в тексте: {text[:100]}...")
+            print(f"   ❌ Наши команды не найдены в тексте: {text[:100]}...")
         
         return found_teams
     
@@ -229,51 +205,47 @@ class GameSystemManager:
     async def fetch_letobasket_schedule(self) -> List[Dict]:
         """Получает расписание игр с сайта letobasket.ru"""
         try:
-            import aiohttp
-            from bs4 import BeautifulSoup
+            snapshot = await page_snapshot_service.get_snapshot()
+            if not snapshot.ok:
+                print(f"❌ Ошибка получения страницы: {snapshot.status}")
+                return []
             
-            url = "http://letobasket.ru/"
+            cached_games = page_snapshot_service.get_parse_result('schedule', snapshot)
+            if cached_games is not None:
+                return cached_games
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Получаем весь текст страницы
-                        full_text = soup.get_text()
-                        
-                        # Ищем игры с нашими командами
-                        games = []
-                        
-                        # Паттерн для игр в формате: дата время (место) - команда1 - команда2
-                        game_pattern = r'(\d{2}\.\d{2}\.\d{4})\s+(\d{2}\.\d{2})\s+\(([^)]+)\)\s*-\s*([^-]+)\s*-\s*([^-]+)'
-                        matches = re.findall(game_pattern, full_text)
-                        
-                        for match in matches:
-                            date, time, venue, team1, team2 = match
-                            game_text = f"{team1} {team2}"
-                            
-                            # Проверяем, есть ли наши команды
-                            if self.find_target_teams_in_text(game_text):
-                                games.append({
-                                    'date': date,
-                                    'time': time,
-                                    'team1': team1.strip(),
-                                    'team2': team2.strip(),
-                                    'venue': venue.strip(),
-                                    'full_text': f"{date} {time} ({venue}) - {team1.strip()} - {team2.strip()}"
-                                })
-                        
-                        if games:
-                            print(f"✅ Найдено {len(games)} игр с нашими командами")
-                            return games
-                        else:
-                            print("⚠️ Игры с нашими командами не найдены")
-                            return []
-                    else:
-                        print(f"❌ Ошибка получения страницы: {response.status}")
-                        return []
+            # Получаем весь текст страницы
+            full_text = snapshot.text
+            
+            # Ищем игры с нашими командами
+            games = []
+            
+            # Паттерн для игр в формате: дата время (место) - команда1 - команда2
+            game_pattern = r'(\d{2}\.\d{2}\.\d{4})\s+(\d{2}\.\d{2})\s+\(([^)]+)\)\s*-\s*([^-]+)\s*-\s*([^-]+)'
+            matches = re.findall(game_pattern, full_text)
+            
+            for match in matches:
+                date, time, venue, team1, team2 = match
+                game_text = f"{team1} {team2}"
+                
+                # Проверяем, есть ли наши команды
+                if self.find_target_teams_in_text(game_text):
+                    games.append({
+                        'date': date,
+                        'time': time,
+                        'team1': team1.strip(),
+                        'team2': team2.strip(),
+                        'venue': venue.strip(),
+                        'full_text': f"{date} {time} ({venue}) - {team1.strip()} - {team2.strip()}"
+                    })
+            
+            if games:
+                print(f"✅ Найдено {len(games)} игр с нашими командами")
+            else:
+                print("⚠️ Игры с нашими командами не найдены")
+            
+            page_snapshot_service.store_parse_result('schedule', snapshot, games)
+            return games
                         
         except Exception as e:
             print(f"❌ Ошибка получения расписания: {e}")
@@ -438,7 +410,8 @@ class GameSystemManager:
     
     async def create_game_poll(self, game_info: Dict) -> bool:
         """Создает опрос для игры в топике 1282"""
-        if not self.bot or not CHAT_ID:
+        bot = self.bot
+        if not bot or not CHAT_ID:
             print("❌ Бот или CHAT_ID не настроены")
             return False
         
@@ -447,34 +420,16 @@ class GameSystemManager:
             team1 = game_info.get('team1', '')
             team2 = game_info.get('team2', '')
             
-            # Находим нашу команду (используем расширенный поиск)
-            our_team = None
-            opponent = None
-            
-            # Список всех возможных названий наших команд
-            our_team_variants = [
-                'Pull Up-Фарм',
-                'Pull Up Фарм', 
-                'PullUP-Фарм',
-                'PullUP Фарм',
-                'Pull Up',
-                'PullUP'
-            ]
+            # Находим нашу команду по реестру команд
+            team, our_team, opponent = team_registry.match_game(team1, team2)
             
-            for variant in our_team_variants:
-                if variant in team1:
-                    our_team = team1
-                    opponent = team2
-                    break
-                elif variant in team2:
-                    our_team = team2
-                    opponent = team1
-                    break
-            
-            if not our_team:
+            if not team:
                 print(f"❌ Не удалось определить нашу команду в игре")
                 return False
             
+            # Чат и топик для опросов этой команды
+            chat_id, topic_id = team.destination(CHAT_ID, GAMES_TOPIC_ID)
+            
             # Определяем категорию команды
             team_category = get_team_category(our_team, opponent or "")
             day_of_week = get_day_of_week(game_info['date'])
@@ -495,38 +450,20 @@ class GameSystemManager:
                 "👨‍🏫 Тренер"
             ]
             
-            # Отправляем опрос (с проверкой топика)
-            try:
-                if GAMES_TOPIC_ID:
-                    message_thread_id = int(GAMES_TOPIC_ID)
-                    poll_message = await self.bot.send_poll(
-                        chat_id=int(CHAT_ID),
-                        question=question,
-                        options=options,
-                        is_anonymous=False,
-                        allows_multiple_answers=False,
-                        message_thread_id=message_thread_id
-                    )
-                else:
-                    poll_message = await self.bot.send_poll(
-                        chat_id=int(CHAT_ID),
-                        question=question,
-                        options=options,
-                        is_anonymous=False,
-                        allows_multiple_answers=False
-                    )
-            except Exception as e:
-                if "Message thread not found" in str(e):
-                    print(f"⚠️ Топик {GAMES_TOPIC_ID} не найден, отправляем в основной чат")
-                    poll_message = await self.bot.send_poll(
-                        chat_id=int(CHAT_ID),
-                        question=question,
-                        options=options,
-                        is_anonymous=False,
-                        allows_multiple_answers=False
-                    )
-                else:
-                    raise e
+            # Отправляем опрос в основной топик и всем подписчикам (с проверкой топика)
+            deliveries = await dispatcher.dispatch(
+                'poll',
+                lambda chat, thread: bot.send_poll(
+                    chat_id=chat,
+                    question=question,
+                    options=options,
+                    is_anonymous=False,
+                    allows_multiple_answers=False,
+                    message_thread_id=thread
+                ),
+                chat_id, topic_id, team=team.name
+            )
+            poll_message = first_message(deliveries, chat_id, topic_id)
             
             # Сохраняем информацию об опросе
             poll_info = {
@@ -540,16 +477,17 @@ class GameSystemManager:
                 'team_category': team_category,
                 'day_of_week': day_of_week,
                 'date': get_moscow_time().isoformat(),
-                'chat_id': CHAT_ID,
-                'topic_id': GAMES_TOPIC_ID
+                'chat_id': chat_id,
+                'topic_id': topic_id,
+                'deliveries': delivery_records(deliveries)
             }
             
             # Сохраняем в историю
             game_key = create_game_key(game_info)
             self.polls_history[game_key] = poll_info
-            save_polls_history(self.polls_history)
+            save_polls_history(self.polls_history, game_key)
             
-            print(f"✅ Опрос для игры создан в топике {GAMES_TOPIC_ID}")
+            print(f"✅ Опрос для игры создан в топике {topic_id}")
             print(f"📊 ID опроса: {poll_info['poll_id']}")
             print(f"🏀 Формат: {question}")
             print(f"📅 Дата: {game_info['date']}")
@@ -566,154 +504,183 @@ class GameSystemManager:
     async def find_game_link(self, team1: str, team2: str) -> Optional[tuple]:
         """Ищет ссылку на игру по командам в табло"""
         try:
-            import aiohttp
-            from bs4 import BeautifulSoup
-            
-            url = "http://letobasket.ru/"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content = await response.text()
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Ищем все ссылки "СТРАНИЦА ИГРЫ"
-                        game_links = []
-                        for link in soup.find_all('a', href=True):
-                            if "СТРАНИЦА ИГРЫ" in link.get_text():
-                                game_links.append(link['href'])
-                        
-                        print(f"🔗 Найдено ссылок: {len(game_links)}")
-                        
-                        # Парсим каждую ссылку и ищем Pull Up в iframe
-                        for i, game_link in enumerate(game_links, 1):
-                            print(f"🎮 Проверяем ссылку {i}: {game_link}")
-                            
-                            # Извлекаем gameId из ссылки
-                            if 'gameId=' in game_link:
-                                game_id = game_link.split('gameId=')[1].split('&')[0]
-                                print(f"   🔍 GameId: {game_id}")
-                                
-                                # Формируем URL iframe
-                                iframe_url = f"http://ig.russiabasket.ru/online/?id={game_id}&compId=62953&db=reg&tab=0&tv=0&color=5&logo=0&foul=0&white=1&timer24=0&blank=6&short=1&teamA=&teamB="
-                                
-                                try:
-                                    # Загружаем iframe
-                                    async with session.get(iframe_url) as iframe_response:
-                                        if iframe_response.status == 200:
-                                            iframe_content = await iframe_response.text()
-                                            
-                                            # Ищем команды в iframe
-                                            iframe_text = iframe_content.upper()
-                                            team1_upper = team1.upper()
-                                            team2_upper = team2.upper()
-                                            
-                                            print(f"   🔍 Ищем команды: {team1_upper} vs {team2_upper}")
-                                            print(f"   📄 Длина iframe: {len(iframe_content)} символов")
-                                            
-                                            # Проверяем разные варианты написания команд
-                                            team1_found = (team1_upper in iframe_text or 
-                                                          team1_upper.replace(' ', '') in iframe_text or
-                                                          team1_upper.replace('-', ' ') in iframe_text or
-                                                          team1_upper.replace(' ', '-') in iframe_text)
-                                            team2_found = (team2_upper in iframe_text or 
-                                                          team2_upper.replace(' ', '') in iframe_text or
-                                                          team2_upper.replace('-', ' ') in iframe_text or
-                                                          team2_upper.replace(' ', '-') in iframe_text)
-                                            
-                                            # Специальная проверка для Pull Up (включаем и обычный, и фарм)
-                                            if team2_upper == 'PULL UP':
-                                                # Ищем Pull Up (обычный или фарм)
-                                                if 'PULL UP-ФАРМ' in iframe_text or 'PULL UP ФАРМ' in iframe_text:
-                                                    team2_found = True
-                                                    print(f"   ✅ Найден Pull Up-Фарм")
-                                                elif 'PULL UP' in iframe_text:
-                                                    team2_found = True
-                                                    print(f"   ✅ Найден Pull Up (обычный)")
-                                                else:
-                                                    team2_found = False
-                                            
-                                            print(f"   🏀 {team1_upper} найдена: {'✅' if team1_found else '❌'}")
-                                            print(f"   🏀 {team2_upper} найдена: {'✅' if team2_found else '❌'}")
-                                            
-                                            # Показываем часть iframe для отладки
-                                            if 'PULL UP' in iframe_text:
-                                                pull_up_pos = iframe_text.find('PULL UP')
-                                                start = max(0, pull_up_pos - 50)
-                                                end = min(len(iframe_text), pull_up_pos + 100)
-                                                context = iframe_text[start:end]
-                                                print(f"   📄 Контекст Pull Up: {context}")
-                                            
-                                            if team1_found and team2_found:
-                                                print(f"✅ Найдена игра {team1} vs {team2} в ссылке {i}")
-                                                
-                                                # Определяем найденную команду Pull Up
-                                                found_pull_up_team = None
-                                                if 'PULL UP-ФАРМ' in iframe_text:
-                                                    found_pull_up_team = 'Pull Up-Фарм'
-                                                elif 'PULL UP ФАРМ' in iframe_text:
-                                                    found_pull_up_team = 'Pull Up Фарм'
-                                                elif 'PULL UP' in iframe_text:
-                                                    found_pull_up_team = 'Pull Up'
-                                                
-                                                print(f"   🏷️ Найдена команда в iframe: {found_pull_up_team}")
-                                                
-                                                # Проверяем, что это сегодняшняя игра
-                                                # Ищем дату в iframe
-                                                import re
-                                                # Различные паттерны дат
-                                                date_patterns = [
-                                                    r'(\d{2}\.\d{2}\.\d{4})',  # DD.MM.YYYY
-                                                    r'(\d{2}/\d{2}/\d{4})',    # DD/MM/YYYY
-                                                    r'(\d{4}-\d{2}-\d{2})',    # YYYY-MM-DD
-                                                ]
-                                                
-                                                dates = []
-                                                for pattern in date_patterns:
-                                                    found_dates = re.findall(pattern, iframe_content)
-                                                    dates.extend(found_dates)
-                                                
-                                                # Также ищем дату в заголовке
-                                                title_match = re.search(r'<TITLE>.*?(\d{2}\.\d{2}\.\d{4})', iframe_content, re.IGNORECASE)
-                                                if title_match:
-                                                    dates.append(title_match.group(1))
-                                                
-                                                if dates:
-                                                    print(f"   📅 Даты в iframe: {dates}")
-                                                    today_found = False
-                                                    for date in dates:
-                                                        if self.is_game_today({'date': date}):
-                                                            today_found = True
-                                                            print(f"   ✅ Сегодняшняя дата найдена: {date}")
-                                                            break
-                                                    
-                                                    if today_found:
-                                                        print(f"🔗 Ссылка для сегодняшней игры: {game_link}")
-                                                        return game_link, found_pull_up_team
-                                                    else:
-                                                        print(f"   ⏭️ Игра не сегодня, пропускаем")
-                                                else:
-                                                    print(f"   ⚠️ Даты не найдены в iframe, но команды найдены - возвращаем ссылку")
-                                                    print(f"🔗 Ссылка для игры: {game_link}")
-                                                    return game_link, found_pull_up_team
-                                            
-                                        else:
-                                            print(f"   ❌ Ошибка загрузки iframe: {iframe_response.status}")
-                                            
-                                except Exception as e:
-                                    print(f"   ❌ Ошибка парсинга iframe: {e}")
-                        
-                        print(f"⚠️ Игра {team1} vs {team2} не найдена в табло")
-                        return None
+            snapshot = await page_snapshot_service.get_snapshot()
+            if not snapshot.ok:
+                print(f"❌ Ошибка получения страницы: {snapshot.status}")
+                return None
+            
+            # Ищем все ссылки "СТРАНИЦА ИГРЫ"
+            game_links = [anchor.href for anchor in snapshot.sections.find_anchors("СТРАНИЦА ИГРЫ")]
+            
+            print(f"🔗 Найдено ссылок: {len(game_links)}")
+            
+            if not game_links:
+                print(f"⚠️ Игра {team1} vs {team2} не найдена в табло")
+                return None
+            
+            # Параллельно проверяем iframe всех ссылок (не более IFRAME_PROBE_CONCURRENCY одновременно)
+            semaphore = asyncio.Semaphore(IFRAME_PROBE_CONCURRENCY)
+            
+            async def probe(i: int, game_link: str) -> Optional[tuple]:
+                async with semaphore:
+                    return await self._probe_game_link(session, i, game_link, team1, team2)
+            
+            def probe_result(task: asyncio.Future) -> Optional[tuple]:
+                if task.cancelled() or task.exception():
+                    return None
+                return task.result()
+            
+            async with http_client.session() as session:
+                tasks = [
+                    asyncio.ensure_future(probe(i, game_link))
+                    for i, game_link in enumerate(game_links, 1)
+                ]
+                pending = set(tasks)
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + IFRAME_PROBE_DEADLINE
+                # Первая ссылка по порядку на странице, проверка которой еще не закончена
+                first_open = 0
+                
+                try:
+                    while pending:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            print(f"⏰ Истек общий лимит поиска ссылки ({IFRAME_PROBE_DEADLINE} с)")
+                            # Из уже проверенных берем первую по порядку на странице
+                            for task in tasks:
+                                if task.done() and probe_result(task):
+                                    return probe_result(task)
+                            break
                         
-                    else:
-                        print(f"❌ Ошибка получения страницы: {response.status}")
-                        return None
+                        _, pending = await asyncio.wait(
+                            pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        # Совпадение принимается, только когда проверены все ссылки выше него:
+                        # побеждает первая подходящая ссылка на странице, а не самый быстрый ответ
+                        while first_open < len(tasks) and tasks[first_open].done():
+                            result = probe_result(tasks[first_open])
+                            if result:
+                                return result
+                            first_open += 1
+                finally:
+                    # Отменяем оставшиеся проверки, как только найдено совпадение или истек лимит
+                    for task in pending:
+                        task.cancel()
+                    if pending:
+                        await asyncio.gather(*pending, return_exceptions=True)
+            
+            print(f"⚠️ Игра {team1} vs {team2} не найдена в табло")
+            return None
                         
         except Exception as e:
             print(f"❌ Ошибка поиска ссылки на игру: {e}")
             return None
     
+    async def _probe_game_link(self, session, i: int, game_link: str, team1: str, team2: str) -> Optional[tuple]:
+        """Проверяет iframe одной ссылки "СТРАНИЦА ИГРЫ" и возвращает (ссылка, команда) при совпадении"""
+        print(f"🎮 Проверяем ссылку {i}: {game_link}")
+        
+        # Извлекаем gameId из ссылки
+        game_id = extract_game_id(game_link) if 'gameId=' in game_link else None
+        if not game_id:
+            return None
+        print(f"   🔍 GameId: {game_id}")
+        
+        # Команды и дата по gameId не меняются - известные игры проверяем без загрузки iframe
+        game_index = get_game_index()
+        entry = game_index.get(game_id)
+        indexed_teams = game_index.teams(game_id)
+        if entry and indexed_teams:
+            indexed_team1, indexed_team2 = indexed_teams
+            print(f"   📇 GameId {game_id} есть в индексе: {indexed_team1} - {indexed_team2}")
+            return self._match_game_candidate(
+                i, game_link, team1, team2,
+                f"{indexed_team1} - {indexed_team2}".upper(),
+                entry.get('dates', []), entry.get('our_team')
+            )
+        
+        # Формируем URL iframe
+        iframe_url = f"http://ig.russiabasket.ru/online/?id={game_id}&compId=62953&db=reg&tab=0&tv=0&color=5&logo=0&foul=0&white=1&timer24=0&blank=6&short=1&teamA=&teamB="
+        
+        try:
+            # Загружаем iframe
+            async with session.get(iframe_url, timeout=request_timeout(IFRAME_REQUEST_TIMEOUT)) as iframe_response:
+                if iframe_response.status != 200:
+                    print(f"   ❌ Ошибка загрузки iframe: {iframe_response.status}")
+                    return None
+                iframe_content = await iframe_response.text()
+        except Exception as e:
+            print(f"   ❌ Ошибка парсинга iframe: {e}")
+            return None
+        
+        iframe_text = iframe_content.upper()
+        print(f"   📄 Длина iframe: {len(iframe_content)} символов")
+        
+        # Показываем часть iframe для отладки
+        team_match = team_registry.search(iframe_text)
+        if team_match:
+            start = max(0, team_match.start - 50)
+            end = min(len(iframe_text), team_match.start + 100)
+            context = iframe_text[start:end]
+            print(f"   📄 Контекст {team_match.team}: {context}")
+        
+        # Извлекаем команды, даты и нашу команду и запоминаем игру в индексе
+        info = game_index.index_iframe(game_id, iframe_content, iframe_url)
+        
+        return self._match_game_candidate(i, game_link, team1, team2, iframe_text, info['dates'], info['our_team'])
+    
+    def _match_game_candidate(self, i: int, game_link: str, team1: str, team2: str,
+                              iframe_text: str, dates: List[str], found_pull_up_team: Optional[str]) -> Optional[tuple]:
+        """Сверяет команды и дату игры (из iframe или индекса) с искомой парой"""
+        team1_upper = team1.upper()
+        team2_upper = team2.upper()
+        
+        print(f"   🔍 Ищем команды: {team1_upper} vs {team2_upper}")
+        
+        # Проверяем разные варианты написания команд
+        team1_found = (team1_upper in iframe_text or 
+                      team1_upper.replace(' ', '') in iframe_text or
+                      team1_upper.replace('-', ' ') in iframe_text or
+                      team1_upper.replace(' ', '-') in iframe_text)
+        team2_found = (team2_upper in iframe_text or 
+                      team2_upper.replace(' ', '') in iframe_text or
+                      team2_upper.replace('-', ' ') in iframe_text or
+                      team2_upper.replace(' ', '-') in iframe_text)
+        
+        # Специальная проверка для наших команд: подходит любой состав того же клуба
+        # (в расписании "Pull Up", а в iframe может быть "Pull Up-Фарм")
+        our_team = team_registry.team_for(team2)
+        if our_team:
+            club_match = next((match for match in team_registry.find_all(iframe_text)
+                               if team_registry.team_of(match).club == our_team.club), None)
+            team2_found = club_match is not None
+            if club_match:
+                print(f"   ✅ Найден {club_match.team}")
+        
+        print(f"   🏀 {team1_upper} найдена: {'✅' if team1_found else '❌'}")
+        print(f"   🏀 {team2_upper} найдена: {'✅' if team2_found else '❌'}")
+        
+        if not (team1_found and team2_found):
+            return None
+        
+        print(f"✅ Найдена игра {team1} vs {team2} в ссылке {i}")
+        print(f"   🏷️ Найдена команда в iframe: {found_pull_up_team}")
+        
+        # Проверяем, что это сегодняшняя игра
+        if dates:
+            print(f"   📅 Даты в iframe: {dates}")
+            for date in dates:
+                if self.is_game_today({'date': date}):
+                    print(f"   ✅ Сегодняшняя дата найдена: {date}")
+                    print(f"🔗 Ссылка для сегодняшней игры: {game_link}")
+                    return game_link, found_pull_up_team
+            print(f"   ⏭️ Игра не сегодня, пропускаем")
+            return None
+        
+        print(f"   ⚠️ Даты не найдены в iframe, но команды найдены - возвращаем ссылку")
+        print(f"🔗 Ссылка для игры: {game_link}")
+        return game_link, found_pull_up_team
+    
     def format_announcement_message(self, game_info: Dict, game_link: Optional[str] = None, found_team: Optional[str] = None) -> str:
         """Форматирует сообщение анонса игры"""
         # Определяем нашу команду и соперника
@@ -722,21 +689,11 @@ class GameSystemManager:
         
         print(f"🔍 Анализируем команды: {team1} vs {team2}")
         
-        # Находим нашу команду (используем расширенный поиск)
-        our_team = None
-        opponent = None
+        # Находим нашу команду по реестру команд
+        team, our_team, opponent = team_registry.match_game(team1, team2)
         
-        # Проверяем team1
-        if any(target_team in team1 for target_team in ['Pull Up', 'PullUP']):
-            our_team = team1
-            opponent = team2
-            print(f"   ✅ Наша команда найдена в team1: {our_team}")
-            print(f"   🏀 Соперник: {opponent}")
-        # Проверяем team2
-        elif any(target_team in team2 for target_team in ['Pull Up', 'PullUP']):
-            our_team = team2
-            opponent = team1
-            print(f"   ✅ Наша команда найдена в team2: {our_team}")
+        if team:
+            print(f"   ✅ Наша команда найдена: {our_team}")
             print(f"   🏀 Соперник: {opponent}")
         else:
             print(f"   ❌ Наша команда не найдена ни в одной из команд")
@@ -768,7 +725,8 @@ class GameSystemManager:
     
     async def send_game_announcement(self, game_info: Dict, game_position: int = 1) -> bool:
         """Отправляет анонс игры в основной топик"""
-        if not self.bot or not CHAT_ID:
+        bot = self.bot
+        if not bot or not CHAT_ID:
             print("❌ Бот или CHAT_ID не настроены")
             return False
         
@@ -791,12 +749,20 @@ class GameSystemManager:
             if game_link:
                 print(f"🎮 Мониторинг результатов будет запущен автоматически за 5 минут до игры")
             
-            # Отправляем сообщение в основной топик (без указания топика)
-            message = await self.bot.send_message(
-                chat_id=int(CHAT_ID),
-                text=announcement_text,
-                parse_mode='HTML'
+            # Отправляем сообщение в основной топик (или в чат/топик команды из реестра) и подписчикам
+            team, _, _ = team_registry.match_game(team1, team2)
+            chat_id, topic_id = team.destination(CHAT_ID) if team else (CHAT_ID, None)
+            deliveries = await dispatcher.dispatch(
+                'announcement',
+                lambda chat, thread: bot.send_message(
+                    chat_id=chat,
+                    text=announcement_text,
+                    parse_mode='HTML',
+                    message_thread_id=thread
+                ),
+                chat_id, topic_id, team=team.name if team else None
             )
+            message = first_message(deliveries, chat_id, topic_id)
             
             # Сохраняем информацию об анонсе
             announcement_key = create_announcement_key(game_info)
@@ -807,13 +773,14 @@ class GameSystemManager:
                 'game_link': game_link,
                 'game_position': game_position,
                 'date': get_moscow_time().isoformat(),
-                'chat_id': CHAT_ID,
-                'topic_id': 'main'  # Основной топик
+                'chat_id': chat_id,
+                'topic_id': topic_id or 'main',  # Основной топик
+                'deliveries': delivery_records(deliveries)
             }
             
             # Сохраняем в историю
             self.announcements_history[announcement_key] = announcement_info
-            save_announcements_history(self.announcements_history)
+            save_announcements_history(self.announcements_history, announcement_key)
             print(f"💾 Анонс добавлен в историю с ключом: {announcement_key}")
             
             print(f"✅ Анонс игры отправлен в основной топик")
@@ -847,7 +814,7 @@ class GameSystemManager:
             print(f"\n🔧 НАСТРОЙКИ:")
             print(f"   CHAT_ID: {CHAT_ID}")
             print(f"   GAMES_TOPIC_ID: {GAMES_TOPIC_ID}")
-            print(f"   TARGET_TEAMS: {TARGET_TEAMS}")
+            print(f"   Команды: {', '.join(team_registry.names())}")
             print(f"   История опросов: {len(self.polls_history)} записей")
             print(f"   История анонсов: {len(self.announcements_history)} записей")
             
@@ -906,11 +873,27 @@ class GameSystemManager:
             print(f"❌ Ошибка выполнения системы: {e}")
 
 # Глобальный экземпляр
-game_system_manager = GameSystemManager()
+_game_system_manager: Optional[GameSystemManager] = None
+
+def get_game_system_manager() -> GameSystemManager:
+    """Глобальный менеджер системы игр (создается при первом обращении)"""
+    global _game_system_manager
+    if _game_system_manager is None:
+        _game_system_manager = GameSystemManager()
+    return _game_system_manager
+
+def __getattr__(name: str):
+    # game_system_manager создается при первом обращении, а не при импорте модуля
+    if name == 'game_system_manager':
+        return get_game_system_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def main():
     """Основная функция"""
-    await game_system_manager.run_full_system()
+    try:
+        await get_game_system_manager().run_full_system()
+    finally:
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Архив историй по месяцам
+В рабочей таблице (JSON-файл или таблица SQLite) остаются только записи за
+активное окно - последние HISTORY_ACTIVE_DAYS дней, поэтому загрузка при
+старте не растет от сезона к сезону. Более старые записи переносятся в
+файлы по месяцам: <HISTORY_ARCHIVE_DIR>/<таблица>/<ГГГГ-ММ>.json (сезон -
+это набор таких месяцев). Месяцы старше HISTORY_RETENTION_MONTHS удаляются.
+
+Дата записи берется из ключа (ключи игр начинаются с ДД.ММ.ГГГГ), из
+game_info.date или из времени записи (date, end_time, start_time, check_time);
+записи без даты остаются в рабочей таблице
+"""
+
+import os
+import re
+import datetime
+from typing import Any, Dict, List, Optional
+
+from json_storage import merge_json, read_json
+
+# Сколько дней истории держать в рабочей таблице
+HISTORY_ACTIVE_DAYS = int(os.getenv("HISTORY_ACTIVE_DAYS", "45"))
+
+# Сколько месяцев хранить архив (0 - хранить всегда)
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", "24"))
+
+# Каталог архива
+HISTORY_ARCHIVE_DIR = os.getenv("HISTORY_ARCHIVE_DIR", "history_archive")
+
+# Таблицы состояния, которые архивируются (см. state_store.TABLES)
+ARCHIVED_TABLES = ('polls', 'announcements', 'monitors', 'daily_checks', 'results')
+
+_KEY_DATE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})|(\d{4})-(\d{2})-(\d{2})')
+
+# Поля записи со временем, по порядку предпочтения
+_RECORD_TIME_FIELDS = ('date', 'end_time', 'start_time', 'check_time')
+
+
+def _parse_date(value: Any) -> Optional[datetime.date]:
+    """Первая дата ДД.ММ.ГГГГ или ГГГГ-ММ-ДД в строке"""
+    if not isinstance(value, str):
+        return None
+    match = _KEY_DATE.search(value)
+    if not match:
+        return None
+    try:
+        if match.group(1):
+            return datetime.date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+        return datetime.date(int(match.group(4)), int(match.group(5)), int(match.group(6)))
+    except ValueError:
+        return None
+
+
+def record_date(key: str, record: Any) -> Optional[datetime.date]:
+    """Дата, к которой относится запись истории (None - определить нельзя)"""
+    date = _parse_date(key)
+    if date or not isinstance(record, dict):
+        return date
+    game_info = record.get('game_info')
+    if isinstance(game_info, dict):
+        date = _parse_date(game_info.get('date'))
+        if date:
+            return date
+    for field in _RECORD_TIME_FIELDS:
+        date = _parse_date(record.get(field))
+        if date:
+            return date
+    return None
+
+
+def partition_name(date: datetime.date) -> str:
+    """Имя месячного раздела архива"""
+    return f"{date.year:04d}-{date.month:02d}"
+
+
+class HistoryArchive:
+    """Перенос старых записей в месячные разделы и удаление устаревших разделов"""
+
+    def __init__(self, directory: str = HISTORY_ARCHIVE_DIR,
+                 active_days: int = HISTORY_ACTIVE_DAYS,
+                 retention_months: int = HISTORY_RETENTION_MONTHS):
+        self.directory = directory
+        self.active_days = active_days
+        self.retention_months = retention_months
+
+    def partition_path(self, table_name: str, partition: str) -> str:
+        return os.path.join(self.directory, table_name, f"{partition}.json")
+
+    def partitions(self, table_name: str) -> List[str]:
+        """Разделы архива таблицы по возрастанию"""
+        directory = os.path.join(self.directory, table_name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(directory)
+                      if re.fullmatch(r'\d{4}-\d{2}\.json', name))
+
+    def load_partition(self, table_name: str, partition: str) -> Dict[str, Any]:
+        return read_json(self.partition_path(table_name, partition), {})
+
+    def find(self, table_name: str, key: str) -> Optional[Any]:
+        """Запись из архива по ключу с датой (без чтения других разделов)"""
+        date = _parse_date(key)
+        if date is None:
+            return None
+        return self.load_partition(table_name, partition_name(date)).get(key)
+
+    def archive(self, table_name: str, table, data: Dict[str, Any],
+                today: Optional[datetime.date] = None) -> int:
+        """Переносит записи старше активного окна из data и таблицы в архив; возвращает их число"""
+        today = today or datetime.date.today()
+        cutoff = today - datetime.timedelta(days=self.active_days)
+        by_partition: Dict[str, Dict[str, Any]] = {}
+        for key, record in data.items():
+            date = record_date(key, record)
+            if date is not None and date < cutoff:
+                by_partition.setdefault(partition_name(date), {})[key] = record
+        if not by_partition:
+            return 0
+
+        # Сначала архив, потом удаление из рабочей таблицы: при сбое между
+        # шагами запись окажется в обоих местах, и перенос просто повторится
+        os.makedirs(os.path.join(self.directory, table_name), exist_ok=True)
+        old_keys = []
+        for partition, records in by_partition.items():
+            merge_json(self.partition_path(table_name, partition), records)
+            old_keys.extend(records)
+        for key in old_keys:
+            data.pop(key, None)
+        table.save(data, old_keys)
+        print(f"🗄️ {table_name}: {len(old_keys)} записей старше {cutoff.strftime('%d.%m.%Y')} "
+              f"перенесено в архив ({min(by_partition)} - {max(by_partition)})")
+        return len(old_keys)
+
+    def prune(self, table_name: str, today: Optional[datetime.date] = None) -> List[str]:
+        """Удаляет разделы архива старше срока хранения; возвращает удаленные"""
+        if self.retention_months <= 0:
+            return []
+        today = today or datetime.date.today()
+        months = today.year * 12 + today.month - 1 - self.retention_months
+        oldest = partition_name(datetime.date(months // 12, months % 12 + 1, 1))
+        removed = [partition for partition in self.partitions(table_name) if partition < oldest]
+        for partition in removed:
+            path = self.partition_path(table_name, partition)
+            os.remove(path)
+            if os.path.exists(f"{path}.lock"):
+                os.remove(f"{path}.lock")
+        if removed:
+            print(f"🧹 {table_name}: удалены разделы архива {', '.join(removed)}")
+        return removed
+
+
+# Глобальный архив историй
+history_archive = HistoryArchive()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Выбор HTML-парсера для всех скраперов
+BeautifulSoup строится на самом быстром доступном движке (lxml вместо
+html.parser), а для простых выборок по iframe есть легкий документ,
+который работает через selectolax, если он установлен
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from bs4 import BeautifulSoup
+
+# Движок разбора: auto, selectolax, lxml, html.parser
+HTML_PARSER = os.getenv("HTML_PARSER", "auto").strip().lower()
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SelectolaxParser = None
+    SELECTOLAX_AVAILABLE = False
+
+
+def available_backends() -> List[str]:
+    """Движки, доступные в текущем окружении (от быстрого к медленному)"""
+    backends = []
+    if SELECTOLAX_AVAILABLE:
+        backends.append('selectolax')
+    if LXML_AVAILABLE:
+        backends.append('lxml')
+    backends.append('html.parser')
+    return backends
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Возвращает запрошенный движок или ближайший доступный"""
+    backend = (backend or HTML_PARSER).lower()
+    backends = available_backends()
+    if backend in backends:
+        return backend
+    if backend not in ('auto', 'selectolax', 'lxml', 'html.parser'):
+        print(f"⚠️ Неизвестный HTML_PARSER={backend}, используем автоматический выбор")
+    return backends[0]
+
+
+def soup_features(backend: Optional[str] = None) -> str:
+    """Движок для BeautifulSoup (selectolax не умеет строить дерево BeautifulSoup)"""
+    backend = resolve_backend(backend)
+    if backend == 'html.parser' or not LXML_AVAILABLE:
+        return 'html.parser'
+    return 'lxml'
+
+
+def make_soup(html: str, backend: Optional[str] = None) -> BeautifulSoup:
+    """Разбирает HTML в BeautifulSoup на выбранном движке"""
+    return BeautifulSoup(html, soup_features(backend))
+
+
+class HtmlDocument(ABC):
+    """Минимальный интерфейс документа для простых выборок (заголовок, элемент по id, атрибут)"""
+
+    backend = 'html.parser'
+
+    @abstractmethod
+    def title(self) -> Optional[str]:
+        """Текст <title>"""
+
+    @abstractmethod
+    def text_by_id(self, tag: str, element_id: str) -> Optional[str]:
+        """Текст элемента tag с указанным id"""
+
+    @abstractmethod
+    def first_attr(self, tag: str, attr: str) -> Optional[str]:
+        """Первое непустое значение атрибута attr у элементов tag"""
+
+
+class SoupDocument(HtmlDocument):
+    """Документ поверх BeautifulSoup (lxml или html.parser)"""
+
+    def __init__(self, html: str, backend: Optional[str] = None):
+        self.backend = soup_features(backend)
+        self.soup = BeautifulSoup(html, self.backend)
+
+    def title(self) -> Optional[str]:
+        title = self.soup.find('title')
+        return title.get_text() if title else None
+
+    def text_by_id(self, tag: str, element_id: str) -> Optional[str]:
+        element = self.soup.find(tag, id=element_id)
+        return element.get_text().strip() if element else None
+
+    def first_attr(self, tag: str, attr: str) -> Optional[str]:
+        for element in self.soup.find_all(tag):
+            value = element.get(attr)
+            if value:
+                # Многозначные атрибуты (class, rel) BeautifulSoup возвращает списком
+                return value if isinstance(value, str) else ' '.join(value)
+        return None
+
+
+class SelectolaxDocument(HtmlDocument):
+    """Документ поверх selectolax (Lexbor/Modest на C)"""
+
+    backend = 'selectolax'
+
+    def __init__(self, html: str):
+        if SelectolaxParser is None:
+            raise ImportError("selectolax не установлен (pip install selectolax)")
+        self.tree = SelectolaxParser(html)
+
+    def title(self) -> Optional[str]:
+        title = self.tree.css_first('title')
+        return title.text() if title else None
+
+    def text_by_id(self, tag: str, element_id: str) -> Optional[str]:
+        element = self.tree.css_first(f'{tag}[id="{element_id}"]')
+        return element.text().strip() if element else None
+
+    def first_attr(self, tag: str, attr: str) -> Optional[str]:
+        for element in self.tree.css(tag):
+            value = element.attributes.get(attr)
+            if value:
+                return value
+        return None
+
+
+def parse_document(html: str, backend: Optional[str] = None) -> HtmlDocument:
+    """Разбирает HTML в легкий документ на выбранном движке"""
+    if resolve_backend(backend) == 'selectolax':
+        return SelectolaxDocument(html)
+    return SoupDocument(html, backend)
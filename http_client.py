@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Общий HTTP-клиент для всех парсеров
+Одна сессия aiohttp на процесс: пул соединений с keep-alive, кэш DNS,
+ограничения на хост, таймауты по умолчанию и счетчики переиспользования
+"""
+
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+import aiohttp
+
+# Ограничения пула соединений
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "20"))  # Всего соединений
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "6"))  # Соединений на один хост
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))  # Простой соединения в пуле, с
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))  # Время жизни кэша DNS, с
+
+# Таймауты по умолчанию
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "30"))  # Лимит на запрос, с
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))  # Лимит на установку соединения, с
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+
+def request_timeout(total: float) -> aiohttp.ClientTimeout:
+    """Таймаут для отдельного запроса (переопределяет таймаут сессии)"""
+    return aiohttp.ClientTimeout(total=total, connect=min(total, HTTP_CONNECT_TIMEOUT))
+
+
+class HttpClient:
+    """Процессный HTTP-клиент с пулом соединений и счетчиками"""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self.stats: Dict[str, int] = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'dns_cache_hits': 0,
+            'dns_cache_misses': 0,
+        }
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Трассировка запросов для подсчета новых и переиспользованных соединений"""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.stats['requests'] += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.stats['connections_created'] += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats['connections_reused'] += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.stats['dns_cache_hits'] += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.stats['dns_cache_misses'] += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Создает сессию с пулом соединений"""
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            headers=DEFAULT_HEADERS,
+            trace_configs=[self._create_trace_config()],
+        )
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию, создавая ее для текущего цикла событий при необходимости"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Сессия предыдущего цикла событий не может использоваться в новом;
+            # ее соединения закрываются, иначе коннектор остается открытым
+            await self._close_stale_session()
+            self._session = self._create_session()
+            self._session_loop = loop
+        return self._session
+
+    async def _close_stale_session(self):
+        """Закрывает сессию, оставшуюся от предыдущего цикла событий"""
+        session = self._session
+        self._session = None
+        self._session_loop = None
+        if session is None or session.closed:
+            return
+        try:
+            await session.close()
+        except Exception as e:
+            # Транспорты закрытого цикла событий закрываются с ошибкой,
+            # сессия при этом все равно помечается закрытой
+            print(f"⚠️ Ошибка закрытия HTTP-сессии предыдущего цикла событий: {e}")
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """Контекст с общей сессией; в отличие от ClientSession не закрывает ее на выходе"""
+        yield await self.get_session()
+
+    def get_stats_summary(self) -> str:
+        """Краткая сводка по переиспользованию соединений"""
+        return (
+            f"запросов: {self.stats['requests']}, "
+            f"новых соединений: {self.stats['connections_created']}, "
+            f"переиспользовано: {self.stats['connections_reused']}, "
+            f"DNS из кэша: {self.stats['dns_cache_hits']}"
+        )
+
+    async def close(self):
+        """Закрывает общую сессию (вызывается при завершении работы)"""
+        session = self._session
+        self._session = None
+        self._session_loop = None
+        if session is not None and not session.closed:
+            await session.close()
+            print(f"🌐 HTTP-клиент закрыт ({self.get_stats_summary()})")
+
+
+# Глобальный HTTP-клиент
+http_client = HttpClient()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Журнал с периодическим снимком
+Состояние - пространства имен "ключ → запись с временем". Каждое изменение
+дописывается строкой в конец журнала (JSON Lines), fsync выполняется
+пачками; при загрузке снимок дополняется журналом. Когда журнал становится
+длинным, состояние целиком записывается в снимок (временный файл + rename),
+а журнал обнуляется. Записи старше TTL отбрасываются при загрузке и сжатии.
+
+Журналом могут пользоваться несколько процессов: запись строки идет под
+разделяемой блокировкой <снимок>.lock, а сжатие - под исключительной; перед
+сжатием снимок и журнал перечитываются с диска, поэтому строки, дописанные
+другим процессом, попадают в снимок, а не теряются при обнулении журнала
+"""
+
+import os
+import json
+import time
+import atexit
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+from json_storage import file_lock
+
+# Сколько записей журнала накапливать до fsync
+JOURNAL_FSYNC_BATCH = int(os.getenv("JOURNAL_FSYNC_BATCH", "8"))
+
+# После скольких записей журнала выполнять сжатие в снимок
+JOURNAL_COMPACT_RECORDS = int(os.getenv("JOURNAL_COMPACT_RECORDS", "500"))
+
+
+class Journal:
+    """Журнал изменений поверх снимка состояния"""
+
+    def __init__(self, snapshot_path: str, journal_path: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None,
+                 fsync_batch: int = JOURNAL_FSYNC_BATCH,
+                 compact_records: int = JOURNAL_COMPACT_RECORDS):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.ttl_seconds = ttl_seconds
+        self.fsync_batch = max(1, fsync_batch)
+        self.compact_records = compact_records
+        # Пространство имен → ключ → {'ts': время записи, 'value': значение}
+        self.state: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.records = 0  # Строк в журнале после последнего сжатия
+        self._file = None
+        self._unsynced = 0
+        self._loaded = False
+        self._closed_at_exit = False
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.get('ts', now) > self.ttl_seconds
+
+    def _load_snapshot(self, now: float) -> bool:
+        """Читает снимок; True - в нем были записи старого формата (без времени)"""
+        if not os.path.exists(self.snapshot_path):
+            return False
+        with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        legacy = False
+        for namespace, entries in data.items():
+            if isinstance(entries, list):
+                # Старый формат: список ключей без времени - время проставляется один раз,
+                # после чего снимок сразу переписывается в новом формате
+                entries = {key: {'ts': now, 'value': None} for key in entries}
+                legacy = True
+            self.state[namespace] = dict(entries)
+        return legacy
+
+    def _apply(self, record: Dict[str, Any]):
+        op = record.get('op')
+        if op == 'put':
+            self.state.setdefault(record['ns'], {})[record['key']] = {'ts': record['ts'], 'value': record.get('value')}
+        elif op == 'delete':
+            self.state.get(record['ns'], {}).pop(record['key'], None)
+        elif op == 'clear':
+            # Очистка без пространства имен (ns: null) - все состояние
+            namespace = record.get('ns')
+            if namespace is None:
+                self.state.clear()
+            else:
+                self.state.pop(namespace, None)
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Недописанная строка после аварийного завершения
+                    print(f"⚠️ Пропущена поврежденная запись журнала {self.journal_path}")
+                    continue
+                self._apply(record)
+                self.records += 1
+
+    def _read_disk(self, now: float) -> Tuple[int, bool]:
+        """Заново собирает состояние из снимка и журнала; (устаревших записей, был старый формат)"""
+        self.state = {}
+        self.records = 0
+        legacy = False
+        try:
+            legacy = self._load_snapshot(now)
+        except Exception as e:
+            print(f"⚠️ Ошибка загрузки снимка {self.snapshot_path}: {e}")
+        try:
+            self._replay()
+        except Exception as e:
+            print(f"⚠️ Ошибка чтения журнала {self.journal_path}: {e}")
+        return self._drop_expired(now), legacy
+
+    def load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Снимок + журнал без устаревших записей; длинный журнал сразу сжимается"""
+        if self._loaded:
+            return self.state
+        with file_lock(self.snapshot_path, shared=True):
+            expired, legacy = self._read_disk(time.time())
+        self._loaded = True
+        if expired or legacy or self.records >= self.compact_records:
+            self.compact()
+        return self.state
+
+    def reload(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Перечитывает состояние с диска (изменения других процессов)"""
+        self._loaded = False
+        return self.load()
+
+    def _drop_expired(self, now: float) -> int:
+        expired = 0
+        for entries in self.state.values():
+            for key in [key for key, entry in entries.items() if self._expired(entry, now)]:
+                del entries[key]
+                expired += 1
+        return expired
+
+    def keys(self, namespace: str):
+        return self.load().get(namespace, {}).keys()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self.load().get(namespace, {}).get(key)
+        return entry['value'] if entry else None
+
+    def contains(self, namespace: str, key: str) -> bool:
+        return key in self.load().get(namespace, {})
+
+    def _write(self, record: Dict[str, Any]):
+        if self._file is None:
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+            if not self._closed_at_exit:
+                # Хвост пачки без fsync сбрасывается при завершении процесса
+                atexit.register(self.close)
+                self._closed_at_exit = True
+        with file_lock(self.snapshot_path, shared=True):
+            # Сжатие в другом процессе не обнулит журнал между записью и сбросом строки
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+        self._unsynced += 1
+        self.records += 1
+        if self._unsynced >= self.fsync_batch:
+            self.sync()
+        if self.records >= self.compact_records:
+            self.compact()
+
+    def put(self, namespace: str, key: str, value: Any = None):
+        """Записывает ключ (одна строка журнала)"""
+        self.load()
+        record = {'op': 'put', 'ns': namespace, 'key': key, 'value': value, 'ts': time.time()}
+        self._apply(record)
+        self._write(record)
+
+    def delete(self, namespace: str, key: str):
+        self.load()
+        record = {'op': 'delete', 'ns': namespace, 'key': key}
+        self._apply(record)
+        self._write(record)
+
+    def clear(self, namespace: Optional[str] = None):
+        """Очищает пространство имен (None - все состояние)"""
+        self.load()
+        record = {'op': 'clear', 'ns': namespace}
+        self._apply(record)
+        self._write(record)
+
+    def sync(self):
+        """Сбрасывает накопленные записи журнала на диск"""
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def compact(self):
+        """Записывает состояние в снимок и обнуляет журнал (под исключительной блокировкой)"""
+        temp_path = None
+        try:
+            with file_lock(self.snapshot_path):
+                self.sync()
+                # Состояние берется с диска: в журнале могут быть строки других процессов
+                self._read_disk(time.time())
+                directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+                fd, temp_path = tempfile.mkstemp(
+                    prefix=f".{os.path.basename(self.snapshot_path)}.", suffix='.tmp', dir=directory
+                )
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.state, f, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.snapshot_path)
+                temp_path = None
+                # Журнал обнуляется только после того, как снимок надежно на месте
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                open(self.journal_path, 'w').close()
+                self._unsynced = 0
+                self.records = 0
+        except Exception as e:
+            print(f"⚠️ Ошибка сжатия журнала {self.journal_path}: {e}")
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def close(self):
+        """Сбрасывает журнал на диск и закрывает файл"""
+        if self._file is not None:
+            try:
+                self.sync()
+                self._file.close()
+            except Exception as e:
+                print(f"⚠️ Ошибка закрытия журнала {self.journal_path}: {e}")
+            self._file = None
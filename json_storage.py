@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Надежная запись JSON-файлов состояния
+Файл записывается во временный файл рядом с целевым, сбрасывается на диск
+(fsync) и атомарно подменяет целевой (os.replace): при сбое остается либо
+старая, либо новая версия, но не обрезанный файл. Параллельные запуски
+(система игр и монитор результатов по cron) согласуются через
+рекомендательную блокировку файла <имя>.lock: изменение применяется к
+актуальному содержимому файла, поэтому чужие записи не теряются
+"""
+
+import os
+import sys
+import json
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Windows: блокировок (fcntl) нет, атомарная замена файла остается
+FCNTL_AVAILABLE = sys.platform != 'win32'
+if sys.platform != 'win32':
+    import fcntl
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """Рекомендательная блокировка файла через отдельный <path>.lock"""
+    if sys.platform == 'win32':
+        yield
+        return
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _read(path: str, default: Any) -> Any:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write_atomic(path: str, data: Any, indent: Optional[int]):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def read_json(path: str, default: Any = None, lock: bool = True) -> Any:
+    """Читает JSON-файл (default - если файла нет или он пустой)
+
+    lock=False - чтение без <path>.lock: файл заменяется атомарно, поэтому
+    читается либо старая, либо новая версия, но файл блокировки не создается
+    """
+    if not lock:
+        return _read(path, default)
+    with file_lock(path, shared=True):
+        return _read(path, default)
+
+
+def write_json(path: str, data: Any, indent: Optional[int] = 2):
+    """Атомарно записывает JSON-файл целиком"""
+    with file_lock(path):
+        _write_atomic(path, data, indent)
+
+
+def update_json(path: str, mutate: Callable[[Any], Any], default: Any = None, indent: Optional[int] = 2) -> Any:
+    """Читает актуальный файл, применяет mutate и записывает результат под одной блокировкой
+
+    mutate изменяет данные на месте или возвращает новые; возвращается записанное
+    """
+    with file_lock(path):
+        data = _read(path, default)
+        result = mutate(data)
+        if result is not None:
+            data = result
+        _write_atomic(path, data, indent)
+        return data
+
+
+def merge_json(path: str, changes: Dict[str, Any], deleted: Iterable[str] = (), indent: Optional[int] = 2) -> Dict[str, Any]:
+    """Применяет измененные и удаленные ключи к актуальному словарю в файле; возвращает итоговый словарь"""
+    deleted = list(deleted)
+
+    def apply(current: Dict[str, Any]):
+        current.update(changes)
+        for key in deleted:
+            current.pop(key, None)
+
+    return update_json(path, apply, default={}, indent=indent)
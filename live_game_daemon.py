@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Резидентный монитор игр в реальном времени
+Вместо запуска по cron раз в 15 минут процесс работает постоянно: в игровые
+окна периодически сканирует табло, для каждой идущей игры запускает отдельную
+задачу, опрашивающую iframe (интервал выбирает polling_scheduler), и отправляет
+результат сразу после окончания игры
+"""
+
+import os
+import asyncio
+import datetime
+from typing import Dict, Optional, Set
+
+from datetime_utils import get_moscow_time
+from game_results_monitor_v2 import GameResultsMonitorV2
+from http_client import http_client
+from polling_scheduler import polling_scheduler
+
+# Интервал повторного сканирования табло в поисках новых игр (секунды)
+LIVE_DISCOVERY_INTERVAL = float(os.getenv("LIVE_DISCOVERY_INTERVAL", "120"))
+
+# Пауза между проверками вне игровых окон (секунды)
+LIVE_IDLE_INTERVAL = float(os.getenv("LIVE_IDLE_INTERVAL", "600"))
+
+# Максимальная длительность отслеживания одной игры (часы)
+LIVE_MAX_GAME_HOURS = float(os.getenv("LIVE_MAX_GAME_HOURS", "3"))
+
+
+def is_game_window(now: Optional[datetime.datetime] = None) -> bool:
+    """Проверяет, идет ли игровое окно (будни 18:00-01:00, выходные 11:00-01:00)"""
+    now = now or get_moscow_time()
+    if now.hour == 0:
+        return True
+    if now.weekday() < 5:
+        return now.hour >= 18
+    return now.hour >= 11
+
+
+def make_game_id(game: Dict) -> str:
+    """Идентификатор отслеживаемой игры: ссылка на табло или дата и команды"""
+    return game.get('game_link') or f"{game.get('date')}_{game.get('team1')}_{game.get('team2')}"
+
+
+class LiveGameDaemon:
+    """Демон мониторинга: одна задача asyncio на каждую идущую игру"""
+
+    def __init__(self, monitor: Optional[GameResultsMonitorV2] = None):
+        # Бот, история и HTTP-клиент инициализируются один раз на весь срок работы
+        self.monitor = monitor or GameResultsMonitorV2()
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.reported: Set[str] = set()
+
+    def is_reported(self, game: Dict) -> bool:
+        """Проверяет, отправлялся ли уже результат игры (в этом процессе или по истории)"""
+        if make_game_id(game) in self.reported:
+            return True
+        return self.monitor.is_game_reported(game)
+
+    async def report(self, game: Dict, scoreboard_info: Dict):
+        """Отправляет результат завершенной игры"""
+        game_info = {
+            'team1': game['team1'],
+            'team2': game['team2'],
+            'date': game['date'],
+            'time': game['current_time']
+        }
+        await self.monitor.report_finished_game(game_info, scoreboard_info, game.get('game_link', ''))
+        self.reported.add(make_game_id(game))
+
+    async def discover_games(self):
+        """Сканирует табло и запускает задачи для новых игр"""
+        games = await self.monitor.scan_scoreboard()
+        for game in games:
+            game_id = make_game_id(game)
+            if game_id in self.tasks or self.is_reported(game):
+                continue
+
+            if game.get('is_finished'):
+                print(f"🏁 Игра {game['team1']} vs {game['team2']} уже завершена по данным табло")
+                await self.report(game, {
+                    'team1_name': game['team1'],
+                    'team2_name': game['team2'],
+                    'score1': game['score1'],
+                    'score2': game['score2']
+                })
+            elif game.get('game_link'):
+                print(f"▶️ Начинаем отслеживать игру {game['team1']} vs {game['team2']}")
+                self.tasks[game_id] = asyncio.create_task(self.track_game(game))
+
+    async def track_game(self, game: Dict):
+        """Опрашивает iframe игры до ее завершения"""
+        game_id = make_game_id(game)
+        deadline = asyncio.get_running_loop().time() + LIVE_MAX_GAME_HOURS * 3600
+        try:
+            while asyncio.get_running_loop().time() < deadline:
+                scoreboard_info = await self.monitor.parse_game_scoreboard(game['game_link'])
+                if scoreboard_info and scoreboard_info.get('is_game_finished'):
+                    print(f"🏁 Игра {game['team1']} vs {game['team2']} завершена")
+                    if not self.is_reported(game):
+                        await self.report(game, {
+                            'team1_name': scoreboard_info.get('team1_name') or game['team1'],
+                            'team2_name': scoreboard_info.get('team2_name') or game['team2'],
+                            'score1': scoreboard_info.get('score1') or game['score1'],
+                            'score2': scoreboard_info.get('score2') or game['score2']
+                        })
+                    return
+                interval = polling_scheduler.next_interval(game_id, scoreboard_info)
+                print(f"⏱️ {game['team1']} vs {game['team2']}: следующий опрос через {interval:.0f} с")
+                await asyncio.sleep(interval)
+            print(f"⏰ Игра {game['team1']} vs {game['team2']} отслеживается дольше {LIVE_MAX_GAME_HOURS} ч, прекращаем")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Ошибка отслеживания игры {game['team1']} vs {game['team2']}: {e}")
+        finally:
+            self.tasks.pop(game_id, None)
+            polling_scheduler.forget(game_id)
+
+    async def run(self):
+        """Основной цикл демона"""
+        print("🛰️ ЗАПУСК ДЕМОНА МОНИТОРИНГА ИГР")
+        print(f"   Сканирование табло: каждые {LIVE_DISCOVERY_INTERVAL:.0f} с, "
+              f"задержка обнаружения результата: до {polling_scheduler.max_latency:.0f} с")
+        try:
+            while True:
+                if is_game_window():
+                    try:
+                        await self.discover_games()
+                    except Exception as e:
+                        print(f"❌ Ошибка сканирования табло: {e}")
+                    print(f"🎮 Отслеживается игр: {len(self.tasks)}")
+                    await asyncio.sleep(LIVE_DISCOVERY_INTERVAL)
+                elif self.tasks:
+                    # Вне окна досматриваем уже начатые игры, новые не ищем
+                    await asyncio.sleep(LIVE_DISCOVERY_INTERVAL)
+                else:
+                    await asyncio.sleep(LIVE_IDLE_INTERVAL)
+        finally:
+            for task in self.tasks.values():
+                task.cancel()
+            if self.tasks:
+                await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            await http_client.close()
@@ -5,10 +5,14 @@
 """
 
 import os
-import json
 import logging
 from typing import Dict, List, Optional, Any, Set
-from telegram import Bot
+from dispatcher import dispatcher, first_message
+from state_store import TABLES, notification_key, state_store
+from journal import Journal
+
+# Сколько дней помнить отправленные уведомления
+NOTIFICATION_TTL_DAYS = int(os.getenv("NOTIFICATION_TTL_DAYS", "60"))
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -19,7 +23,9 @@ class NotificationManager:
     def __init__(self):
         self.bot = None
         self.chat_id = os.getenv('CHAT_ID')
-        self.notifications_file = "sent_notifications.json"
+        self.notifications_file = TABLES['notifications']
+        # JSON-хранилище: снимок sent_notifications.json + журнал дописываемых отправок
+        self.journal = Journal(self.notifications_file, ttl_seconds=NOTIFICATION_TTL_DAYS * 24 * 3600)
         self._init_bot()
         
         # Загружаем отправленные уведомления из файла
@@ -34,6 +40,7 @@ class NotificationManager:
         bot_token = os.getenv('BOT_TOKEN')
         if bot_token:
             try:
+                from telegram import Bot
                 self.bot = Bot(token=bot_token)
                 logger.info("✅ Бот инициализирован успешно")
             except Exception as e:
@@ -41,34 +48,74 @@ class NotificationManager:
         else:
             logger.error("❌ BOT_TOKEN не настроен")
     
+    def _sent_sets(self) -> Dict[str, Set[str]]:
+        """Множества отправленных уведомлений по видам"""
+        return {
+            'game_end': self.sent_game_end_notifications,
+            'game_start': self.sent_game_start_notifications,
+            'game_result': self.sent_game_result_notifications,
+            'morning': self.sent_morning_notifications,
+        }
+    
     def _load_sent_notifications(self):
         """Загружает отправленные уведомления из файла"""
         try:
-            if os.path.exists(self.notifications_file):
-                with open(self.notifications_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.sent_game_end_notifications = set(data.get('game_end', []))
-                    self.sent_game_start_notifications = set(data.get('game_start', []))
-                    self.sent_game_result_notifications = set(data.get('game_result', []))
-                    self.sent_morning_notifications = set(data.get('morning', []))
-                logger.info(f"✅ Загружено {len(self.sent_game_end_notifications) + len(self.sent_game_start_notifications) + len(self.sent_game_result_notifications) + len(self.sent_morning_notifications)} отправленных уведомлений")
+            if state_store.uses_sqlite:
+                # Строка таблицы - одно уведомление {kind, id}
+                sent = self._sent_sets()
+                for record in state_store.table('notifications').load().values():
+                    if record.get('kind') in sent:
+                        sent[record['kind']].add(record['id'])
+            else:
+                for kind, sent in self._sent_sets().items():
+                    sent.update(self.journal.keys(kind))
+            logger.info(f"✅ Загружено {len(self.sent_game_end_notifications) + len(self.sent_game_start_notifications) + len(self.sent_game_result_notifications) + len(self.sent_morning_notifications)} отправленных уведомлений")
         except Exception as e:
             logger.error(f"❌ Ошибка загрузки отправленных уведомлений: {e}")
     
     def _save_sent_notifications(self):
         """Сохраняет отправленные уведомления в файл"""
         try:
-            data = {
-                'game_end': list(self.sent_game_end_notifications),
-                'game_start': list(self.sent_game_start_notifications),
-                'game_result': list(self.sent_game_result_notifications),
-                'morning': list(self.sent_morning_notifications)
-            }
-            with open(self.notifications_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if state_store.uses_sqlite:
+                rows = {
+                    notification_key(kind, notification_id): {'kind': kind, 'id': notification_id}
+                    for kind, ids in self._sent_sets().items() for notification_id in ids
+                }
+                state_store.table('notifications').save(rows)
+                return
+            # Полная перезапись состояния (нужна только при очистке) - журнал заново
+            self.journal.clear()
+            for kind, ids in self._sent_sets().items():
+                for notification_id in ids:
+                    self.journal.put(kind, notification_id)
+            self.journal.compact()
+        except Exception as e:
+            logger.error(f"❌ Ошибка сохранения отправленных уведомлений: {e}")
+    
+    def _mark_sent(self, kind: str, notification_id: str):
+        """Отмечает уведомление отправленным: одна строка журнала или таблицы, а не весь список"""
+        self._sent_sets()[kind].add(notification_id)
+        try:
+            if state_store.uses_sqlite:
+                key = notification_key(kind, notification_id)
+                state_store.table('notifications').save({key: {'kind': kind, 'id': notification_id}}, [key])
+            else:
+                self.journal.put(kind, notification_id)
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения отправленных уведомлений: {e}")
     
+    async def _dispatch(self, kind: str, message: str):
+        """Отправляет сообщение в основной чат и всем подписчикам события"""
+        bot = self.bot
+        if bot is None:
+            raise RuntimeError("Бот не инициализирован")
+        deliveries = await dispatcher.dispatch(
+            kind,
+            lambda chat, thread: bot.send_message(chat_id=chat, text=message, message_thread_id=thread),
+            self.chat_id
+        )
+        first_message(deliveries)
+    
     async def send_game_end_notification(self, game_info: Dict[str, Any], game_url: str):
         """Отправляет уведомление о завершении игры"""
         if not self.bot or not self.chat_id:
@@ -94,9 +141,8 @@ class NotificationManager:
                 f"Ссылка на статистику: {game_url}"
             )
             
-            await self.bot.send_message(chat_id=self.chat_id, text=message)
-            self.sent_game_end_notifications.add(notification_id)
-            self._save_sent_notifications()
+            await self._dispatch('result', message)
+            self._mark_sent('game_end', notification_id)
             logger.info(f"✅ Отправлено уведомление о завершении игры: {score}")
             
         except Exception as e:
@@ -122,9 +168,8 @@ class NotificationManager:
             
             message = f"🏀 Игра {team1} против {team2} начинается в {game_time}!\n\nСсылка на игру: {game_url}"
             
-            await self.bot.send_message(chat_id=self.chat_id, text=message)
-            self.sent_game_start_notifications.add(notification_id)
-            self._save_sent_notifications()
+            await self._dispatch('announcement', message)
+            self._mark_sent('game_start', notification_id)
             logger.info(f"✅ Отправлено уведомление о начале игры: {team1} vs {team2} в {game_time}")
             
         except Exception as e:
@@ -142,8 +187,7 @@ class NotificationManager:
         if not self.bot or not self.chat_id:
             logger.error("Бот или CHAT_ID не настроены")
             # Сохраняем состояние даже при отсутствии бота, чтобы избежать повторных попыток
-            self.sent_game_result_notifications.add(notification_id)
-            self._save_sent_notifications()
+            self._mark_sent('game_result', notification_id)
             return
         
         try:
@@ -187,9 +231,8 @@ class NotificationManager:
             else:
                 message += f"\n📊 Статистика голосования: Недоступна"
             
-            await self.bot.send_message(chat_id=self.chat_id, text=message)
-            self.sent_game_result_notifications.add(notification_id)
-            self._save_sent_notifications()
+            await self._dispatch('result', message)
+            self._mark_sent('game_result', notification_id)
             logger.info(f"✅ Отправлено уведомление о результате игры: {score}")
             
         except Exception as e:
@@ -226,9 +269,8 @@ class NotificationManager:
                     message += f"   🔗 Ссылка: {game_url}\n"
                 message += "\n"
             
-            await self.bot.send_message(chat_id=self.chat_id, text=message)
-            self.sent_morning_notifications.add(notification_id)
-            self._save_sent_notifications()
+            await self._dispatch('announcement', message)
+            self._mark_sent('morning', notification_id)
             logger.info(f"✅ Отправлено утреннее уведомление для {len(games)} игр")
             
         except Exception as e:
@@ -243,5 +285,18 @@ class NotificationManager:
         self._save_sent_notifications()
         logger.info("✅ Все отслеживаемые уведомления очищены")
 
-# Создаем глобальный экземпляр
-notification_manager = NotificationManager()
+# Глобальный экземпляр
+_notification_manager: Optional[NotificationManager] = None
+
+def get_notification_manager() -> NotificationManager:
+    """Глобальный менеджер уведомлений (создается при первом обращении)"""
+    global _notification_manager
+    if _notification_manager is None:
+        _notification_manager = NotificationManager()
+    return _notification_manager
+
+def __getattr__(name: str):
+    # notification_manager создается при первом обращении, а не при импорте модуля
+    if name == 'notification_manager':
+        return get_notification_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Разделы главной страницы letobasket.ru за один проход
+Документ обходится один раз: собирается текст (как soup.get_text()),
+позиции ссылок и все маркеры разделов. Маркеры табло и результатов -
+точные заголовки в верхнем регистре ("ТАБЛО ИГР", "ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ"):
+тот же текст в обычном регистре встречается в новостях и названиях и не
+должен сдвигать границы разделов. Без учета регистра ищутся только маркеры
+блока табло для проверки сайта в birthday_bot ("табло игр",
+"online видеотрансляции"), как и раньше
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Точные маркеры разделов (с учетом регистра)
+SECTION_MARKERS = {
+    'scoreboard': 'ТАБЛО ИГР',
+    'recent_results': 'ПОСЛЕДНИЕ РЕЗУЛЬТАТЫ',
+}
+
+# Маркеры блока табло без учета регистра (проверка сайта в birthday_bot)
+LOOSE_SECTION_MARKERS = {
+    'scoreboard_heading': ('табло игр',),
+    'broadcasts': ('online видеотрансляции', 'онлайн видеотрансляции'),
+}
+
+SECTION_MARKERS_RE = re.compile(
+    '|'.join(f'(?P<{kind}>{re.escape(marker)})' for kind, marker in SECTION_MARKERS.items())
+)
+
+LOOSE_SECTION_MARKERS_RE = re.compile(
+    '|'.join(f'(?P<{kind}>{"|".join(map(re.escape, markers))})' for kind, markers in LOOSE_SECTION_MARKERS.items()),
+    re.IGNORECASE
+)
+
+
+class PageAnchor:
+    """Ссылка страницы с позицией ее текста в общем тексте"""
+
+    __slots__ = ('href', 'text', 'position')
+
+    def __init__(self, href: str, text: str, position: int):
+        self.href = href
+        self.text = text
+        self.position = position
+
+
+class PageSection:
+    """Раздел страницы: тип, маркер, границы в тексте и ссылки внутри"""
+
+    def __init__(self, sections: 'PageSections', kind: str, marker: str, start: int, end: int):
+        self.kind = kind
+        self.marker = marker
+        self.start = start
+        self.end = end
+        self._sections = sections
+
+    @property
+    def text(self) -> str:
+        """Текст раздела (срез soup.get_text())"""
+        return self._sections.full_text[self.start:self.end]
+
+    @property
+    def flat_text(self) -> str:
+        """Текст раздела одной строкой (как get_text(separator=' ', strip=True))"""
+        parts = []
+        for offset, string in self._sections.pieces:
+            if offset >= self.end:
+                break
+            if offset + len(string) <= self.start:
+                continue
+            part = string[max(self.start - offset, 0):self.end - offset].strip()
+            if part:
+                parts.append(part)
+        return ' '.join(parts)
+
+    @property
+    def anchors(self) -> List[PageAnchor]:
+        """Ссылки, текст которых попадает в раздел"""
+        return [anchor for anchor in self._sections.anchors if self.start <= anchor.position < self.end]
+
+
+class PageSections:
+    """Индекс разделов и ссылок страницы, построенный за один обход документа"""
+
+    def __init__(self, soup):
+        self.soup = soup
+        self.pieces: List[Tuple[int, str]] = []  # (позиция, строка) в порядке документа
+        self.anchors: List[PageAnchor] = []
+
+        chunks = []
+        length = 0
+        current_link = None
+        for string in soup.strings:
+            link = string.find_parent('a', href=True)
+            if link is not None and link is not current_link:
+                self.anchors.append(PageAnchor(link['href'], '', length))
+            if link is not None:
+                self.anchors[-1].text += string
+            current_link = link
+
+            self.pieces.append((length, string))
+            chunks.append(string)
+            length += len(string)
+        self.full_text = ''.join(chunks)
+
+        # Точные и нестрогие маркеры могут совпасть в одной позиции ("ТАБЛО ИГР"),
+        # поэтому ищутся двумя выражениями и объединяются по позиции
+        self.markers: List[Tuple[str, str, int]] = sorted(
+            [(match.lastgroup, match.group(), match.start())
+             for pattern in (SECTION_MARKERS_RE, LOOSE_SECTION_MARKERS_RE)
+             for match in pattern.finditer(self.full_text)
+             if match.lastgroup],  # в выражениях только именованные группы
+            key=lambda marker: marker[2]
+        )
+        self._sections: Dict[str, PageSection] = {}
+        for kind, marker, start in self.markers:
+            if kind in self._sections:
+                continue
+            # Раздел длится до следующего маркера другого типа
+            end = next((pos for other, _, pos in self.markers if other != kind and pos > start), len(self.full_text))
+            self._sections[kind] = PageSection(self, kind, marker, start, end)
+
+    def get(self, kind: str) -> Optional[PageSection]:
+        """Первый раздел указанного типа"""
+        return self._sections.get(kind)
+
+    def span(self, kind: str, until: Iterable[str] = ()) -> Optional[PageSection]:
+        """Раздел от маркера kind до первого следующего маркера из until (или до конца страницы)"""
+        section = self._sections.get(kind)
+        if section is None:
+            return None
+        until = set(until)
+        end = next((pos for other, _, pos in self.markers if other in until and pos > section.start), len(self.full_text))
+        return PageSection(self, kind, section.marker, section.start, end)
+
+    def find_anchors(self, text: str) -> List[PageAnchor]:
+        """Ссылки, в тексте которых есть указанная строка (без учета регистра)"""
+        text = text.lower()
+        return [anchor for anchor in self.anchors if text in anchor.text.lower()]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Общий снимок главной страницы letobasket.ru
+Страница скачивается и разбирается один раз за запуск, после чего
+один и тот же снимок (HTML, DOM и текст) используют все подсистемы.
+Между запусками хранятся валидаторы (ETag/Last-Modified) и хэш содержимого:
+неизмененная страница не скачивается заново, а ее разбор берется из кэша
+"""
+
+import os
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Dict, Optional
+from bs4 import BeautifulSoup
+
+from datetime_utils import get_moscow_time
+from http_client import http_client
+from json_storage import read_json, write_json
+from html_parser import make_soup
+from page_sections import PageSections
+
+# URL главной страницы
+LETOBASKET_URL = "http://letobasket.ru/"
+
+# Время жизни снимка в секундах (в пределах одного запуска)
+SNAPSHOT_TTL = int(os.getenv("SNAPSHOT_TTL", "60"))
+
+# Файл кэша страницы: валидаторы, хэш, HTML и результаты разбора
+PAGE_CACHE_FILE = os.getenv("PAGE_CACHE_FILE", "letobasket_page_cache.json")
+
+
+class PageSnapshot:
+    """Снимок страницы: исходный HTML, DOM и текстовое представление"""
+
+    def __init__(self, url: str, html: str, status: int = 200, unchanged: bool = False):
+        self.url = url
+        self.html = html
+        self.status = status
+        self.content_hash = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        self.unchanged = unchanged  # Содержимое совпадает с прошлым запуском
+        self.fetched_at = get_moscow_time()
+        self._created = time.monotonic()
+        self._soup = None
+        self._sections = None
+        self._text = None
+        self._flat_text = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+    @property
+    def age(self) -> float:
+        """Возраст снимка в секундах"""
+        return time.monotonic() - self._created
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """DOM страницы (разбирается один раз при первом обращении)"""
+        if self._soup is None:
+            self._soup = make_soup(self.html)
+        return self._soup
+
+    @property
+    def sections(self) -> PageSections:
+        """Разделы и ссылки страницы (один обход документа при первом обращении)"""
+        if self._sections is None:
+            self._sections = PageSections(self.soup)
+        return self._sections
+
+    @property
+    def text(self) -> str:
+        """Текст страницы в форме soup.get_text()"""
+        if self._text is None:
+            self._text = self.sections.full_text
+        return self._text
+
+    @property
+    def flat_text(self) -> str:
+        """Текст страницы одной строкой (separator=' ', strip=True)"""
+        if self._flat_text is None:
+            self._flat_text = ' '.join(part for part in (string.strip() for _, string in self.sections.pieces) if part)
+        return self._flat_text
+
+
+class PageSnapshotService:
+    """Сервис, выдающий один снимок страницы всем потребителям"""
+
+    def __init__(self, url: str = LETOBASKET_URL, ttl: int = SNAPSHOT_TTL, cache_file: str = PAGE_CACHE_FILE):
+        self.url = url
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self.fetch_count = 0
+        self._cache: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[PageSnapshot] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        """Возвращает блокировку, привязанную к текущему циклу событий"""
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def get_snapshot(self, force: bool = False) -> PageSnapshot:
+        """Возвращает актуальный снимок, скачивая страницу только при необходимости"""
+        async with self._get_lock():
+            snapshot = self._snapshot
+            if not force and snapshot is not None and snapshot.ok and snapshot.age < self.ttl:
+                return snapshot
+
+            self._snapshot = await self._fetch()
+            return self._snapshot
+
+    async def _fetch(self) -> PageSnapshot:
+        """Скачивает страницу условным запросом (If-None-Match / If-Modified-Since)"""
+        self.fetch_count += 1
+        cache = self._load_cache()
+
+        headers = {}
+        if cache.get('html'):
+            if cache.get('etag'):
+                headers['If-None-Match'] = cache['etag']
+            if cache.get('last_modified'):
+                headers['If-Modified-Since'] = cache['last_modified']
+
+        async with http_client.session() as session:
+            async with session.get(self.url, headers=headers) as response:
+                if response.status == 304:
+                    print(f"🌐 Снимок {self.url} не изменился (HTTP 304), используем сохраненный HTML")
+                    return PageSnapshot(self.url, cache['html'], 200, unchanged=True)
+
+                html = await response.text() if response.status == 200 else ""
+                print(f"🌐 Загружен снимок {self.url}: HTTP {response.status}, {len(html)} символов")
+                if response.status != 200:
+                    return PageSnapshot(self.url, html, response.status)
+
+                snapshot = PageSnapshot(self.url, html, response.status)
+                snapshot.unchanged = snapshot.content_hash == cache.get('content_hash')
+                if snapshot.unchanged:
+                    print("♻️ Содержимое страницы не изменилось с прошлого запуска")
+                else:
+                    # Новое содержимое - прежние результаты разбора больше не актуальны
+                    cache['content_hash'] = snapshot.content_hash
+                    cache['html'] = html
+                    cache['parse_results'] = {}
+                cache['etag'] = response.headers.get('ETag')
+                cache['last_modified'] = response.headers.get('Last-Modified')
+                self._save_cache()
+                return snapshot
+
+    def _load_cache(self) -> Dict[str, Any]:
+        """Загружает кэш страницы из файла (один раз за запуск)"""
+        cache = self._cache
+        if cache is None:
+            cache = {}
+            try:
+                cached = read_json(self.cache_file, {})
+                if cached.get('url') == self.url:
+                    cache = cached
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки кэша страницы: {e}")
+            cache['url'] = self.url
+            self._cache = cache
+        return cache
+
+    def _save_cache(self):
+        """Сохраняет кэш страницы в файл
+
+        Атомарная запись: после сбоя на диске остается прежний кэш, и ETag
+        всегда соответствует сохраненному HTML
+        """
+        try:
+            write_json(self.cache_file, self._load_cache(), indent=None)
+        except Exception as e:
+            print(f"⚠️ Ошибка сохранения кэша страницы: {e}")
+
+    def get_parse_result(self, key: str, snapshot: PageSnapshot) -> Optional[Any]:
+        """Возвращает сохраненный результат разбора, если страница не изменилась за сегодня"""
+        entry = self._load_cache().get('parse_results', {}).get(key)
+        if not entry:
+            return None
+        if entry.get('content_hash') != snapshot.content_hash:
+            return None
+        # Разбор зависит от текущей даты (сегодняшние игры), поэтому действует только в пределах дня
+        if entry.get('date') != get_moscow_time().strftime('%d.%m.%Y'):
+            return None
+        print(f"♻️ Страница не изменилась - используем прошлый результат разбора ({key})")
+        return entry.get('result')
+
+    def store_parse_result(self, key: str, snapshot: PageSnapshot, result: Any):
+        """Сохраняет результат разбора для текущего содержимого страницы"""
+        cache = self._load_cache()
+        if cache.get('content_hash') != snapshot.content_hash:
+            return
+        try:
+            json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️ Результат разбора ({key}) не сохранен в кэш: {e}")
+            return
+        cache.setdefault('parse_results', {})[key] = {
+            'content_hash': snapshot.content_hash,
+            'date': get_moscow_time().strftime('%d.%m.%Y'),
+            'result': result,
+        }
+        self._save_cache()
+
+    def invalidate(self):
+        """Сбрасывает текущий снимок"""
+        self._snapshot = None
+
+
+# Глобальный сервис снимков
+page_snapshot_service = PageSnapshotService()
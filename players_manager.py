@@ -5,10 +5,14 @@
 
 import os
 import json
+import time
+import hashlib
 import datetime
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
-import gspread
+
+from birthday_calendar import BirthdayCalendar
+from json_storage import read_json, write_json
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -17,6 +21,12 @@ load_dotenv()
 GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
 
+# Файл локального кэша листа "Игроки"
+ROSTER_CACHE_FILE = os.getenv("ROSTER_CACHE_FILE", "roster_cache.json")
+
+# Сколько секунд кэш используется без обращения к Google (после - проверка modifiedTime)
+ROSTER_CACHE_TTL = int(os.getenv("ROSTER_CACHE_TTL", "3600"))
+
 # Настройки Google Sheets
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -26,14 +36,30 @@ SCOPES = [
 class PlayersManager:
     """Менеджер данных игроков"""
     
-    def __init__(self):
+    def __init__(self, cache_file: str = ROSTER_CACHE_FILE, cache_ttl: int = ROSTER_CACHE_TTL):
         self.gc = None
         self.spreadsheet = None
-        self.players_sheet = None
-        self._init_google_sheets()
+        self._players_sheet = None
+        self._connected = False
+        self.cache_file = cache_file
+        self.cache_ttl = cache_ttl
+        self._roster_cache: Optional[Dict[str, Any]] = None
+        # Календарь дней рождения строится заново только при изменении состава
+        self._calendar: Optional[BirthdayCalendar] = None
+        self._calendar_version: Optional[str] = None
+    
+    @property
+    def players_sheet(self):
+        """Лист "Игроки" (подключение к Google Sheets - при первом обращении)"""
+        if not self._connected:
+            self._connected = True
+            self._init_google_sheets()
+        return self._players_sheet
     
     def _init_google_sheets(self):
         """Инициализация Google Sheets"""
+        import gspread
+        
         try:
             if not GOOGLE_SHEETS_CREDENTIALS:
                 print("⚠️ GOOGLE_SHEETS_CREDENTIALS не настроен")
@@ -184,13 +210,13 @@ class PlayersManager:
                 for ws in all_worksheets:
                     print(f"   - {ws.title}")
                 
-                self.players_sheet = self.spreadsheet.worksheet("Игроки")
+                self._players_sheet = self.spreadsheet.worksheet("Игроки")
                 print("✅ Лист 'Игроки' найден")
             except gspread.WorksheetNotFound:
                 print("⚠️ Лист 'Игроки' не найден, создаем новый...")
                 try:
                     # Создаем новый лист
-                    self.players_sheet = self.spreadsheet.add_worksheet(
+                    self._players_sheet = self.spreadsheet.add_worksheet(
                         title="Игроки", 
                         rows=100, 
                         cols=10
@@ -201,7 +227,7 @@ class PlayersManager:
                         "Фамилия", "Имя", "Ник", "Telegram ID", "Дата рождения", 
                         "Статус", "Команда", "Дата добавления", "Примечания"
                     ]
-                    self.players_sheet.update('A1:I1', [headers])
+                    self._players_sheet.update('A1:I1', [headers])
                     print("✅ Лист 'Игроки' создан с заголовками")
                 except Exception as e:
                     print(f"❌ Ошибка создания листа 'Игроки': {e}")
@@ -218,16 +244,91 @@ class PlayersManager:
             print(f"🔍 Подробности ошибки:")
             traceback.print_exc()
     
+    def _load_roster_cache(self) -> Dict[str, Any]:
+        """Загружает кэш листа "Игроки" из файла (один раз)"""
+        cache = self._roster_cache
+        if cache is None:
+            cache = {}
+            try:
+                cached = read_json(self.cache_file, {})
+                if cached.get('spreadsheet_id') == SPREADSHEET_ID:
+                    cache = cached
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки кэша игроков: {e}")
+            cache['spreadsheet_id'] = SPREADSHEET_ID
+            self._roster_cache = cache
+        return cache
+    
+    def _save_roster_cache(self):
+        """Сохраняет кэш листа "Игроки" в файл
+
+        Атомарная запись (json_storage): файл с персональными данными игроков не
+        остается обрезанным после сбоя и создается с правами 0600
+        """
+        try:
+            write_json(self.cache_file, self._load_roster_cache(), indent=None)
+        except Exception as e:
+            print(f"⚠️ Ошибка сохранения кэша игроков: {e}")
+    
+    def _sheet_modified_time(self) -> Optional[str]:
+        """Время последнего изменения таблицы по Drive API (None - не удалось узнать)"""
+        if self.spreadsheet is None:
+            return None
+        try:
+            return self.spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            print(f"⚠️ Не удалось получить время изменения таблицы: {e}")
+            return None
+    
+    def _get_player_records(self, revalidate: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """Записи листа "Игроки": из кэша, пока он свежий или таблица не менялась, иначе полная загрузка
+        
+        revalidate=True - проверить modifiedTime, даже если TTL кэша не истек (перед записью в лист)
+        """
+        cache = self._load_roster_cache()
+        records = cache.get('records')
+        now = time.time()
+        
+        if records is not None and not revalidate and now - cache.get('checked_at', 0) < self.cache_ttl:
+            return records
+        
+        if not self.players_sheet:
+            if records is not None:
+                print("⚠️ Лист 'Игроки' не доступен, используем кэш")
+            return records
+        
+        modified_time = self._sheet_modified_time()
+        if records is not None and modified_time and modified_time == cache.get('modified_time'):
+            print(f"♻️ Лист 'Игроки' не изменился ({modified_time}), используем кэш")
+            cache['checked_at'] = now
+            self._save_roster_cache()
+            return records
+        
+        records = self.players_sheet.get_all_records()
+        content_hash = hashlib.sha256(json.dumps(records, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+        if content_hash == cache.get('content_hash'):
+            print("♻️ Содержимое листа 'Игроки' не изменилось")
+        cache.update({
+            'records': records,
+            'content_hash': content_hash,
+            'modified_time': modified_time,
+            'checked_at': now,
+        })
+        self._save_roster_cache()
+        return records
+    
+    def invalidate_cache(self):
+        """Помечает кэш устаревшим: следующее чтение проверит таблицу"""
+        self._load_roster_cache()['checked_at'] = 0
+    
     def get_all_players(self) -> List[Dict[str, Any]]:
         """Получает всех игроков из таблицы"""
         try:
-            if not self.players_sheet:
+            all_records = self._get_player_records()
+            if all_records is None:
                 print("❌ Лист 'Игроки' не доступен")
                 return []
             
-            # Получаем все данные
-            all_records = self.players_sheet.get_all_records()
-            
             players = []
             for record in all_records:
                 # Проверяем обязательные поля
@@ -257,61 +358,53 @@ class PlayersManager:
         all_players = self.get_all_players()
         return [p for p in all_players if p.get('status', '').lower() == 'активный']
     
-    def get_players_with_birthdays_today(self) -> List[Dict[str, Any]]:
-        """Получает игроков с днями рождения сегодня"""
+    def get_birthday_calendar(self) -> BirthdayCalendar:
+        """Календарь дней рождения активных игроков (перестраивается при изменении состава)"""
+        # Проверка свежести кэша листа (в пределах TTL - без обращения к таблице);
+        # список игроков собирается, только если содержимое листа изменилось
+        self._get_player_records()
+        version = self._load_roster_cache().get('content_hash')
+        if self._calendar is not None and version is not None and self._calendar_version == version:
+            return self._calendar
+        calendar = BirthdayCalendar(self.get_active_players())
+        self._calendar = calendar
+        self._calendar_version = version
+        for player in calendar.skipped:
+            print(f"⚠️ Неверный формат даты для {player.get('surname', '')} {player.get('name', '')}: {player.get('birthday', '')}")
+        print(f"📅 Календарь дней рождения построен: {calendar.size} игроков")
+        return calendar
+    
+    def get_players_with_birthdays_on(self, date: datetime.date) -> List[Dict[str, Any]]:
+        """Получает игроков с днями рождения в указанную дату"""
         try:
-            active_players = self.get_active_players()
-            today = datetime.datetime.now()
-            today_str = today.strftime("%m-%d")
-            
-            print(f"📅 Проверяем дни рождения на {today_str}")
-            print(f"👥 Активных игроков: {len(active_players)}")
-            
-            birthday_players = []
-            for player in active_players:
-                birthday = player.get('birthday', '')
-                name = player.get('name', 'Unknown')
-                surname = player.get('surname', '')
-                
-                if birthday:
-                    try:
-                        # Парсим дату рождения
-                        if '-' in birthday:
-                            # Формат YYYY-MM-DD
-                            bd_date = datetime.datetime.strptime(birthday, "%Y-%m-%d")
-                        elif '.' in birthday:
-                            # Формат DD.MM.YYYY
-                            bd_date = datetime.datetime.strptime(birthday, "%d.%m.%Y")
-                        else:
-                            print(f"⚠️ Неизвестный формат даты для {surname} {name}: {birthday}")
-                            continue
-                        
-                        bd_str = bd_date.strftime("%m-%d")
-                        print(f"🔍 Проверяем {surname} {name}: {birthday} -> {bd_str} vs {today_str}")
-                        
-                        if bd_str == today_str:
-                            # Вычисляем возраст
-                            age = today.year - bd_date.year
-                            if today.month < bd_date.month or (today.month == bd_date.month and today.day < bd_date.day):
-                                age -= 1
-                            
-                            player['age'] = age
-                            birthday_players.append(player)
-                            print(f"🎉 Найден именинник: {surname} {name} ({age} лет)")
-                            
-                    except ValueError:
-                        print(f"⚠️ Неверный формат даты для {surname} {name}: {birthday}")
-                        continue
-                else:
-                    print(f"⚠️ Нет даты рождения для {surname} {name}")
-            
-            print(f"🎂 Всего именинников сегодня: {len(birthday_players)}")
+            birthday_players = self.get_birthday_calendar().on(date)
+            for player in birthday_players:
+                print(f"🎉 Найден именинник: {player.get('surname', '')} {player.get('name', '')} ({player['age']} лет)")
             return birthday_players
-            
         except Exception as e:
             print(f"❌ Ошибка получения дней рождения: {e}")
             return []
     
+    def get_players_with_birthdays_today(self) -> List[Dict[str, Any]]:
+        """Получает игроков с днями рождения сегодня"""
+        today = datetime.datetime.now().date()
+        print(f"📅 Проверяем дни рождения на {today.strftime('%m-%d')}")
+        birthday_players = self.get_players_with_birthdays_on(today)
+        print(f"🎂 Всего именинников сегодня: {len(birthday_players)}")
+        return birthday_players
+    
+    def get_upcoming_birthdays(self, days: int = 7, start: Optional[datetime.date] = None) -> List[Dict[str, Any]]:
+        """Получает ближайшие дни рождения (с полем birthday_date - дата празднования)"""
+        try:
+            start = start or datetime.datetime.now().date()
+            return [
+                dict(player, birthday_date=date.isoformat())
+                for date, player in self.get_birthday_calendar().upcoming(start, days)
+            ]
+        except Exception as e:
+            print(f"❌ Ошибка получения ближайших дней рождения: {e}")
+            return []
+    
     def add_player(self, name: str, birthday: str, nickname: str = "", 
                    telegram_id: str = "", team: str = "", notes: str = "", surname: str = "") -> bool:
         """Добавляет нового игрока"""
@@ -340,6 +433,7 @@ class PlayersManager:
             
             # Добавляем строку
             self.players_sheet.append_row(row_data)
+            self.invalidate_cache()
             print(f"✅ Игрок {surname} {name} добавлен")
             return True
             
@@ -353,12 +447,13 @@ class PlayersManager:
             if not self.players_sheet:
                 return False
             
-            # Ищем игрока по имени
-            all_records = self.players_sheet.get_all_records()
+            # Ищем игрока по имени (номера строк - по проверенному кэшу)
+            all_records = self._get_player_records(revalidate=True) or []
             for i, record in enumerate(all_records, start=2):  # Начинаем с 2 (после заголовков)
                 if record.get('Имя') == name:
                     # Обновляем статус
                     self.players_sheet.update(f'E{i}', status)
+                    self.invalidate_cache()
                     print(f"✅ Статус игрока {name} обновлен на '{status}'")
                     return True
             
@@ -383,7 +478,20 @@ class PlayersManager:
             return None
 
 # Глобальный экземпляр менеджера
-players_manager = PlayersManager()
+_players_manager: Optional[PlayersManager] = None
+
+def get_players_manager() -> PlayersManager:
+    """Глобальный менеджер игроков (создается при первом обращении)"""
+    global _players_manager
+    if _players_manager is None:
+        _players_manager = PlayersManager()
+    return _players_manager
+
+def __getattr__(name: str):
+    # players_manager создается при первом обращении, а не при импорте модуля
+    if name == 'players_manager':
+        return get_players_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def get_years_word(age: int) -> str:
     """Возвращает правильное склонение слова 'год'"""
@@ -399,6 +507,8 @@ def test_players_manager():
     print("🧪 ТЕСТИРОВАНИЕ МЕНЕДЖЕРА ИГРОКОВ")
     print("=" * 50)
     
+    players_manager = get_players_manager()
+    
     # Проверяем подключение
     if not players_manager.players_sheet:
         print("❌ Google Sheets не подключен")
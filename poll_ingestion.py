@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Прием ответов на опросы
+Ответы (PollAnswer) забираются из getUpdates с long polling и по одному
+записываются в журнал poll_answers.json/.journal: новый ответ заменяет
+прежний, отзыв голоса (пустой option_ids) удаляет его. Смещение getUpdates
+хранится в том же журнале после ответов, поэтому после сбоя обновления
+просто применяются повторно. Сбор данных опроса - локальный запрос к
+журналу, а не один getUpdates(limit=50) в момент сбора.
+
+Постоянный прием: python run_poll_ingestion.py; в GitHub Actions -
+ежечасный запуск python run_poll_ingestion.py --once (poll_ingestion.yml),
+чтобы обновления забирались раньше, чем Telegram их удалит (24 часа).
+TrainingPollsManager перед сбором тоже догружает накопившиеся обновления.
+Пачка применяется под блокировкой poll_answers.journal.lock после
+перечитывания журнала: обновления, которые уже применил другой процесс
+(смещение на диске дальше), пропускаются и не затирают более новые ответы.
+Для проверок вместо Telegram подключается LocalUpdateSource
+"""
+
+import os
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from journal import Journal
+from json_storage import file_lock
+
+# Снимок ответов на опросы (изменения дописываются в poll_answers.journal)
+POLL_ANSWERS_FILE = os.getenv("POLL_ANSWERS_FILE", "poll_answers.json")
+
+# Сколько дней хранить ответы
+POLL_ANSWERS_TTL_DAYS = int(os.getenv("POLL_ANSWERS_TTL_DAYS", "30"))
+
+# Таймаут long polling getUpdates (секунды)
+POLL_INGEST_TIMEOUT = int(os.getenv("POLL_INGEST_TIMEOUT", "30"))
+
+# Пауза после ошибки getUpdates (секунды)
+POLL_INGEST_RETRY_DELAY = float(os.getenv("POLL_INGEST_RETRY_DELAY", "5"))
+
+# Пространство имен журнала со смещением getUpdates
+_OFFSET_NAMESPACE = '_offset'
+
+
+def _answer_namespace(poll_id: str) -> str:
+    return f"poll:{poll_id}"
+
+
+class TelegramUpdateSource:
+    """Обновления из Telegram (getUpdates, только poll_answer)"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    async def fetch(self, offset: Optional[int], timeout: int) -> List[Any]:
+        return list(await self.bot.get_updates(
+            offset=offset, timeout=timeout, allowed_updates=['poll_answer']
+        ))
+
+
+class LocalUpdateSource:
+    """Локальная замена Telegram: обновления добавляются вручную, смещение учитывается как в getUpdates"""
+
+    def __init__(self, batch_size: int = 100):
+        self.updates: List[Any] = []
+        self.batch_size = batch_size
+        self._next_update_id = 1
+
+    def add_answer(self, poll_id: str, user_id: int, option_ids: List[int],
+                   first_name: str = '', last_name: Optional[str] = None,
+                   username: Optional[str] = None):
+        """Добавляет ответ на опрос (пустой option_ids - отзыв голоса)
+
+        Объекты повторяют поля Update/PollAnswer/User, которые читает PollIngestor
+        """
+        user = SimpleNamespace(id=user_id, first_name=first_name, last_name=last_name, username=username)
+        self.updates.append(SimpleNamespace(
+            update_id=self._next_update_id,
+            poll_answer=SimpleNamespace(poll_id=poll_id, option_ids=list(option_ids), user=user)
+        ))
+        self._next_update_id += 1
+
+    async def fetch(self, offset: Optional[int], timeout: int) -> List[Any]:
+        # Как getUpdates: смещение подтверждает все обновления до него
+        if offset is not None:
+            self.updates = [update for update in self.updates if update.update_id >= offset]
+        return self.updates[:self.batch_size]
+
+
+class PollAnswerStore:
+    """Текущие ответы на опросы: опрос → пользователь → ответ"""
+
+    def __init__(self, path: str = POLL_ANSWERS_FILE, ttl_days: int = POLL_ANSWERS_TTL_DAYS):
+        self.journal = Journal(path, ttl_seconds=ttl_days * 24 * 3600 if ttl_days > 0 else None)
+
+    @property
+    def offset(self) -> Optional[int]:
+        """Смещение для следующего getUpdates (None - с начала очереди)"""
+        return self.journal.get(_OFFSET_NAMESPACE, 'next')
+
+    def set_offset(self, offset: int):
+        self.journal.put(_OFFSET_NAMESPACE, 'next', offset)
+
+    def apply(self, poll_answer) -> bool:
+        """Записывает ответ или отзыв голоса; False - ответ без пользователя"""
+        user = poll_answer.user
+        if user is None:
+            # Голос от имени канала (voter_chat) - в таблице игроков его нет
+            return False
+        namespace = _answer_namespace(poll_answer.poll_id)
+        key = str(user.id)
+        if not poll_answer.option_ids:
+            if self.journal.contains(namespace, key):
+                self.journal.delete(namespace, key)
+            return True
+        self.journal.put(namespace, key, {
+            'option_ids': list(poll_answer.option_ids),
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+            'username': user.username,
+        })
+        return True
+
+    def answers(self, poll_id: str) -> Dict[str, Dict[str, Any]]:
+        """Действующие ответы на опрос: id пользователя → ответ"""
+        entries = self.journal.load().get(_answer_namespace(poll_id), {})
+        return {key: entry['value'] for key, entry in entries.items()}
+
+    def close(self):
+        self.journal.close()
+
+
+class PollIngestor:
+    """Перенос ответов из источника обновлений в хранилище с учетом смещения"""
+
+    def __init__(self, source, store: Optional[PollAnswerStore] = None):
+        self.source = source
+        self.store = store or PollAnswerStore()
+
+    async def ingest_once(self, timeout: int = 0) -> int:
+        """Одна пачка getUpdates; возвращает число полученных обновлений"""
+        updates = await self.source.fetch(self.store.offset, timeout)
+        if not updates:
+            return 0
+        with file_lock(self.store.journal.journal_path):
+            # Смещение и ответы другого процесса (сбор данных или второй прием)
+            self.store.journal.reload()
+            offset = self.store.offset
+            fresh = [update for update in sorted(updates, key=lambda update: update.update_id)
+                     if offset is None or update.update_id >= offset]
+            for update in fresh:
+                if update.poll_answer:
+                    self.store.apply(update.poll_answer)
+            if fresh:
+                # Смещение записывается после ответов: при сбое пачка применится повторно
+                self.store.set_offset(fresh[-1].update_id + 1)
+            self.store.journal.sync()
+        return len(updates)
+
+    async def ingest_pending(self) -> int:
+        """Забирает все накопившиеся обновления без ожидания новых"""
+        total = 0
+        while True:
+            received = await self.ingest_once(timeout=0)
+            if not received:
+                return total
+            total += received
+
+    async def run(self, timeout: int = POLL_INGEST_TIMEOUT):
+        """Постоянный прием ответов (long polling)"""
+        print("🗳️ ЗАПУСК ПРИЕМА ОТВЕТОВ НА ОПРОСЫ")
+        print(f"   Long polling: {timeout} с, смещение: {self.store.offset}")
+        try:
+            while True:
+                try:
+                    received = await self.ingest_once(timeout)
+                    if received:
+                        print(f"📥 Получено обновлений: {received}, смещение: {self.store.offset}")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"❌ Ошибка получения обновлений: {e}")
+                    await asyncio.sleep(POLL_INGEST_RETRY_DELAY)
+        finally:
+            self.store.close()
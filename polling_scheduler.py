@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Адаптивный планировщик опроса табло игр
+По периоду и игровому времени из iframe (js-period, js-timer) оценивает,
+сколько игрового времени осталось, и выбирает момент следующего запроса:
+редко до начала игры, часто в конце 4-й четверти, с отступом на зависших играх.
+Используется резидентным демоном (live_game_daemon); запуски по cron раз в
+15 минут проверяют табло при каждом запуске - интервалы планировщика короче
+периода cron и ничего бы не пропускали
+"""
+
+import os
+import re
+from typing import Dict, Optional
+
+# Длительность четверти (минуты)
+GAME_QUARTER_MINUTES = float(os.getenv("GAME_QUARTER_MINUTES", "10"))
+
+# Минимальный и максимальный интервал между запросами (секунды)
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "5"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "600"))
+
+# Максимальная задержка обнаружения окончания игры (секунды)
+POLL_MAX_LATENCY = float(os.getenv("POLL_MAX_LATENCY", "30"))
+
+# Интервал опроса до начала игры (секунды)
+POLL_PREGAME_INTERVAL = float(os.getenv("POLL_PREGAME_INTERVAL", "300"))
+
+# Множитель отступа для зависших игр и ошибок загрузки
+POLL_BACKOFF_FACTOR = float(os.getenv("POLL_BACKOFF_FACTOR", "2"))
+
+REGULAR_PERIODS = 4
+
+
+def parse_period(period: Optional[str]) -> Optional[int]:
+    """Номер периода: 1-4 основное время, 5 и далее овертаймы"""
+    if not period:
+        return None
+    period = period.strip().upper()
+    match = re.search(r'\d+', period)
+    if 'OT' in period or 'ОТ' in period:
+        # "OT", "OT1", "2OT" - номер овертайма
+        return REGULAR_PERIODS + (int(match.group()) if match else 1)
+    return int(match.group()) if match else None
+
+
+def parse_timer(timer: Optional[str]) -> Optional[float]:
+    """Игровое время в секундах ("7:45", "0:00", "45.2" в последнюю минуту)"""
+    if not timer:
+        return None
+    timer = timer.strip()
+    try:
+        if ':' in timer:
+            minutes, seconds = timer.split(':', 1)
+            return int(minutes) * 60 + float(seconds)
+        return float(timer)
+    except ValueError:
+        return None
+
+
+class PollingScheduler:
+    """Выбирает интервал до следующего запроса табло для каждой игры"""
+
+    def __init__(self,
+                 quarter_minutes: float = GAME_QUARTER_MINUTES,
+                 min_interval: float = POLL_MIN_INTERVAL,
+                 max_interval: float = POLL_MAX_INTERVAL,
+                 max_latency: float = POLL_MAX_LATENCY,
+                 pregame_interval: float = POLL_PREGAME_INTERVAL,
+                 backoff_factor: float = POLL_BACKOFF_FACTOR):
+        self.quarter_seconds = quarter_minutes * 60
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_latency = max(min_interval, max_latency)
+        self.pregame_interval = pregame_interval
+        self.backoff_factor = backoff_factor
+        # game_id → последнее состояние табло и число повторов подряд
+        self.states: Dict[str, Dict] = {}
+
+    def estimate_remaining(self, period: Optional[str], timer: Optional[str]) -> Optional[float]:
+        """Оценивает оставшееся игровое время (секунды) до конца основного времени или овертайма"""
+        period_number = parse_period(period)
+        clock = parse_timer(timer)
+        if period_number is None or clock is None:
+            return None
+        if period_number > REGULAR_PERIODS:
+            return clock
+        return (REGULAR_PERIODS - period_number) * self.quarter_seconds + clock
+
+    def is_pregame(self, period: Optional[str], timer: Optional[str]) -> bool:
+        """Игра еще не началась: нет периода или часы 1-й четверти не тронуты"""
+        period_number = parse_period(period)
+        if not period_number:
+            return True
+        clock = parse_timer(timer)
+        return period_number == 1 and clock is not None and clock >= self.quarter_seconds
+
+    def _clamp(self, interval: float) -> float:
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def next_interval(self, game_id: str, scoreboard_info: Optional[Dict]) -> float:
+        """Интервал до следующего запроса табло игры"""
+        state = self.states.setdefault(game_id, {'snapshot': None, 'repeats': 0})
+
+        if not scoreboard_info:
+            # Ошибка загрузки - отступаем, но не дальше границы задержки обнаружения
+            state['repeats'] += 1
+            return self._clamp(min(self.max_latency, self.min_interval * self.backoff_factor ** state['repeats']))
+
+        period = scoreboard_info.get('period')
+        timer = scoreboard_info.get('timer')
+        snapshot = (period, timer)
+        state['repeats'] = state['repeats'] + 1 if snapshot == state['snapshot'] else 0
+        state['snapshot'] = snapshot
+
+        if self.is_pregame(period, timer):
+            return self._clamp(self.pregame_interval)
+
+        remaining = self.estimate_remaining(period, timer)
+        if remaining is None:
+            return self.max_latency
+
+        if remaining > 0:
+            # Реальное время идет не быстрее игрового (часы останавливаются),
+            # поэтому игра не закончится раньше, чем через remaining секунд
+            return self._clamp(remaining)
+
+        # Часы на нуле в 4-й четверти или овертайме: игра может закончиться в любой момент.
+        # Если табло не меняется, постепенно отступаем в пределах границы задержки
+        backoff = self.min_interval * self.backoff_factor ** state['repeats']
+        return self._clamp(min(self.max_latency, backoff))
+
+    def forget(self, game_id: str):
+        """Удаляет состояние завершенной игры"""
+        self.states.pop(game_id, None)
+
+
+# Глобальный планировщик
+polling_scheduler = PollingScheduler()
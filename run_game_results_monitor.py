@@ -8,9 +8,11 @@ import json
 import os
 from datetime import datetime, timezone, timedelta
 from typing import Dict, Optional
-from game_results_monitor import GameResultsMonitor, load_game_monitor_history, save_game_monitor_history
+from game_results_monitor import GameResultsMonitor, load_game_monitor_history
 from datetime_utils import get_moscow_time, is_today
 from game_system_manager import GameSystemManager
+from http_client import http_client
+from team_registry import team_registry
 
 async def check_games_for_monitoring() -> list:
     """Проверяет игры от GameSystemManager, которые должны начаться в ближайшие 15 минут или уже мониторятся"""
@@ -150,14 +152,7 @@ def has_pull_up_team(game_info: dict) -> bool:
     team1 = game_info.get('team1', '')
     team2 = game_info.get('team2', '')
     
-    # Используем те же варианты команд, что и в game_results_monitor.py
-    target_teams = ['Pull Up-Фарм', 'Pull Up Фарм', 'Pull Up', 'PullUP']
-    
-    for variant in target_teams:
-        if variant in team1 or variant in team2:
-            return True
-    
-    return False
+    return team_registry.is_our_team(team1) or team_registry.is_our_team(team2)
 
 async def run_game_results_monitor():
     """Запускает мониторинг результатов игр"""
@@ -249,8 +244,8 @@ async def run_game_results_monitor():
             else:
                 print(f"   ⏳ Игра еще идет или мониторинг не требуется")
         
-        # Сохраняем обновленную историю
-        save_game_monitor_history(monitor_history)
+        # Монитор сохраняет каждую игру сам; запись устаревшей копии затерла бы его изменения
+        monitor_history = monitor.monitor_history
         
         print(f"\n📋 ИТОГИ МОНИТОРИНГА:")
         print(f"   Обработано игр: {len(games_to_monitor)}")
@@ -267,6 +262,8 @@ async def run_game_results_monitor():
     except Exception as e:
         print(f"❌ Ошибка мониторинга: {e}")
         raise
+    finally:
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(run_game_results_monitor())
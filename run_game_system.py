@@ -5,11 +5,15 @@
 """
 
 import asyncio
-from game_system_manager import game_system_manager
+from game_system_manager import get_game_system_manager
+from http_client import http_client
 
 async def main():
     """Запускает полную систему управления играми"""
-    await game_system_manager.run_full_system()
+    try:
+        await get_game_system_manager().run_full_system()
+    finally:
+        await http_client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
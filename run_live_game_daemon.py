@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Скрипт для запуска резидентного демона мониторинга игр
+Заменяет запуск run_game_results_monitor_v2.py по cron: результаты
+отправляются в течение нескольких секунд после окончания игры
+"""
+
+import asyncio
+from live_game_daemon import LiveGameDaemon
+
+async def main():
+    """Запускает демон мониторинга игр"""
+    daemon = LiveGameDaemon()
+    await daemon.run()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n🛑 Демон мониторинга остановлен")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Скрипт для запуска постоянного приема ответов на опросы
+Ответы записываются по мере поступления, поэтому сбор данных тренировок
+не теряет голоса, которые Telegram уже не отдает через getUpdates
+
+    python run_poll_ingestion.py         # постоянный прием (long polling)
+    python run_poll_ingestion.py --once  # забрать накопившееся и выйти (cron)
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+from poll_ingestion import PollIngestor, TelegramUpdateSource
+
+load_dotenv()
+
+async def main(once: bool = False):
+    """Запускает прием ответов на опросы"""
+    from telegram import Bot
+
+    bot_token = os.getenv("BOT_TOKEN")
+    if not bot_token:
+        print("❌ BOT_TOKEN не настроен")
+        sys.exit(1)
+
+    async with Bot(token=bot_token) as bot:
+        ingestor = PollIngestor(TelegramUpdateSource(bot))
+        if once:
+            received = await ingestor.ingest_pending()
+            ingestor.store.close()
+            print(f"📥 Получено обновлений: {received}, смещение: {ingestor.store.offset}")
+        else:
+            await ingestor.run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Прием ответов на опросы")
+    parser.add_argument('--once', action='store_true', help='забрать накопившиеся обновления и выйти')
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.once))
+    except KeyboardInterrupt:
+        print("\n🛑 Прием ответов на опросы остановлен")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Общая очередь исходящих сообщений Telegram
+Все отправки проходят через токен-бакеты: общий (лимит бота) и отдельный
+для каждого чата (для групп - еще и поминутный лимит). Сообщения в один чат
+уходят строго по очереди, ответ 429 (RetryAfter) выдерживается и запрос
+повторяется. Отправка сообщения не идемпотентна, поэтому с отступом
+повторяются только ошибки соединения, при которых запрос не ушел; таймаут
+ответа возвращается вызывающему без повтора (сообщение могло дойти).
+Очередь ведет счетчики глубины, повторов и задержки отправки
+"""
+
+import os
+import asyncio
+import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+    TELEGRAM_ERRORS_AVAILABLE = True
+except ImportError:
+    # Без python-telegram-bot такие ошибки не возникают: заглушка ни с чем не совпадает
+    class _TelegramErrorStub(Exception):
+        pass
+
+    BadRequest = NetworkError = RetryAfter = TimedOut = _TelegramErrorStub
+    TELEGRAM_ERRORS_AVAILABLE = False
+
+try:
+    import httpx
+    # Ошибки до отправки запроса: соединение не установлено или не получено из пула
+    NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+except ImportError:
+    NOT_SENT_ERRORS = ()
+
+# Общий лимит бота (сообщений в секунду)
+SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+
+# Лимит на один чат (сообщений в секунду) и для групп (сообщений в минуту)
+SEND_CHAT_RATE = float(os.getenv("SEND_CHAT_RATE", "1"))
+SEND_GROUP_RATE_PER_MINUTE = float(os.getenv("SEND_GROUP_RATE_PER_MINUTE", "20"))
+
+# Сколько сообщений можно отправить в чат пачкой без ожидания
+SEND_CHAT_BURST = float(os.getenv("SEND_CHAT_BURST", "3"))
+
+# Повторы при 429 и ошибках соединения до отправки запроса
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))
+
+
+class TokenBucket:
+    """Токен-бакет: rate токенов в секунду, не более capacity накопленных"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated: Optional[float] = None
+        # Пауза после RetryAfter: до этого момента (часы цикла) токены не выдаются
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько ждать до следующего токена"""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float):
+        """Не выдавать токены seconds секунд (ответ 429)"""
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = 0.0
+
+
+def is_group_chat(chat_id: int) -> bool:
+    """Группы и каналы в Telegram имеют отрицательный chat_id"""
+    return chat_id < 0
+
+
+def retry_after_seconds(error: Exception) -> float:
+    """Пауза из RetryAfter (int или timedelta в зависимости от версии библиотеки)"""
+    retry_after = getattr(error, 'retry_after', 1)
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+def request_not_sent(error: Exception) -> bool:
+    """Ошибка возникла до отправки запроса (по цепочке причин исключения), повтор безопасен"""
+    cause = error
+    while cause is not None:
+        if NOT_SENT_ERRORS and isinstance(cause, NOT_SENT_ERRORS):
+            return True
+        cause = cause.__cause__
+    return False
+
+
+class SendQueue:
+    """Очередь отправки с ограничением скорости и повторами"""
+
+    def __init__(self,
+                 global_rate: float = SEND_GLOBAL_RATE,
+                 chat_rate: float = SEND_CHAT_RATE,
+                 group_rate_per_minute: float = SEND_GROUP_RATE_PER_MINUTE,
+                 chat_burst: float = SEND_CHAT_BURST,
+                 max_retries: int = SEND_MAX_RETRIES):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.global_lock: Optional[asyncio.Lock] = None
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.chat_locks: Dict[int, asyncio.Lock] = {}
+        self.depth = 0
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'max_depth': 0,
+            'total_latency': 0.0,
+            'max_latency': 0.0,
+        }
+
+    def _ensure_loop(self) -> Tuple[asyncio.AbstractEventLoop, asyncio.Lock]:
+        """Текущий цикл событий и общая блокировка этого цикла"""
+        loop = asyncio.get_running_loop()
+        global_lock = self.global_lock
+        if self._loop is not loop or global_lock is None:
+            # Бакеты и блокировки привязаны к циклу событий (каждый asyncio.run начинает заново)
+            self._loop = loop
+            self.global_bucket = TokenBucket(self.global_rate, self.global_rate)
+            global_lock = self.global_lock = asyncio.Lock()
+            self.chat_buckets = {}
+            self.chat_locks = {}
+        return loop, global_lock
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = min(self.chat_rate, self.group_rate) if is_group_chat(chat_id) else self.chat_rate
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    async def _acquire(self, loop: asyncio.AbstractEventLoop, global_lock: asyncio.Lock, chat_bucket: TokenBucket):
+        """Ждет токен в бакете чата и в общем бакете"""
+        while True:
+            now = loop.time()
+            delay = chat_bucket.delay(now)
+            if delay <= 0:
+                # Проверка и списание без await между ними: токен не достанется двоим
+                chat_bucket.take(now)
+                break
+            await asyncio.sleep(delay)
+        async with global_lock:
+            while True:
+                now = loop.time()
+                delay = self.global_bucket.delay(now)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self.global_bucket.take(now)
+
+    async def _send_with_retries(self, loop: asyncio.AbstractEventLoop, global_lock: asyncio.Lock,
+                                 chat_id: int, request: Callable[[], Awaitable[Any]]) -> Any:
+        chat_bucket = self._chat_bucket(chat_id)
+        attempt = 0
+        while True:
+            await self._acquire(loop, global_lock, chat_bucket)
+            try:
+                return await request()
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                if isinstance(e, RetryAfter):
+                    pause = retry_after_seconds(e)
+                    self.stats['rate_limited'] += 1
+                    print(f"⏳ Telegram просит подождать {pause:.0f} с (чат {chat_id})")
+                    chat_bucket.block(loop.time(), pause)
+                elif (isinstance(e, NetworkError)
+                      and not isinstance(e, BadRequest) and request_not_sent(e)):
+                    # Соединение не установлено - Telegram запрос не получил, повтор не создаст дубль
+                    pause = float(2 ** attempt)
+                    print(f"⚠️ Ошибка соединения при отправке в чат {chat_id}: {e}, повтор через {pause:.0f} с")
+                    await asyncio.sleep(pause)
+                else:
+                    if isinstance(e, TimedOut):
+                        # Запрос мог быть принят: повтор отправил бы сообщение второй раз
+                        print(f"⚠️ Нет ответа Telegram при отправке в чат {chat_id}: {e}, без повтора")
+                    raise
+                self.stats['retries'] += 1
+
+    async def send(self, chat_id: int, request: Callable[[], Awaitable[Any]], ordered: bool = True) -> Any:
+        """Ставит запрос в очередь чата и выполняет его с учетом лимитов; возвращает ответ Telegram
+
+        ordered=False - сообщения, порядок которых не важен: они не ждут ответа на
+        предыдущие и уходят параллельно, насколько позволяют токены
+        """
+        loop, global_lock = self._ensure_loop()
+        enqueued = loop.time()
+        self.depth += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+        try:
+            if ordered:
+                # Блокировка asyncio.Lock выдается в порядке очереди: сообщения в чат не перемешиваются
+                async with self.chat_locks.setdefault(chat_id, asyncio.Lock()):
+                    result = await self._send_with_retries(loop, global_lock, chat_id, request)
+            else:
+                result = await self._send_with_retries(loop, global_lock, chat_id, request)
+            latency = loop.time() - enqueued
+            self.stats['sent'] += 1
+            self.stats['total_latency'] += latency
+            self.stats['max_latency'] = max(self.stats['max_latency'], latency)
+            return result
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self.depth -= 1
+
+    def get_stats_summary(self) -> str:
+        """Краткая сводка по отправкам"""
+        sent = self.stats['sent']
+        average = self.stats['total_latency'] / sent if sent else 0.0
+        return (f"отправлено {sent}, ошибок {self.stats['failed']}, повторов {self.stats['retries']} "
+                f"(429: {self.stats['rate_limited']}), в очереди {self.depth} (максимум {self.stats['max_depth']}), "
+                f"задержка {average:.2f} с в среднем / {self.stats['max_latency']:.2f} с максимум")
+
+
+# Глобальная очередь отправки
+send_queue = SendQueue()
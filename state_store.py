@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Единое хранилище состояния
+Истории опросов, анонсов, мониторинга, уведомлений и сборов данных - это
+таблицы "ключ → запись". По умолчанию (STATE_BACKEND=json) каждая таблица
+хранится в своем JSON-файле, как раньше. С STATE_BACKEND=sqlite все таблицы
+лежат в одной базе SQLite (режим WAL): проверка "уже отправлено" - поиск по
+первичному ключу, а запись изменяет одну строку в транзакции вместо
+перезаписи всего файла.
+
+Истории опросов, анонсов, мониторинга, проверок и результатов загружаются через
+load_active: в рабочей таблице остается активное окно, старые записи уходят
+в месячный архив (см. history_archive)
+
+Перенос существующих JSON-файлов в базу:
+    python state_store.py --migrate
+"""
+
+import os
+import json
+import sqlite3
+import argparse
+import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from history_archive import ARCHIVED_TABLES, history_archive
+from journal import Journal
+from json_storage import merge_json, read_json, write_json
+
+# Хранилище состояния: json (файлы, как раньше) или sqlite (одна база)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "json").lower()
+
+# Файл базы SQLite
+STATE_DB_FILE = os.getenv("STATE_DB_FILE", "state.db")
+
+# Таблицы и JSON-файлы, которые они заменяют
+TABLES = {
+    'polls': 'game_polls_history.json',
+    'announcements': 'game_announcements.json',
+    'monitors': 'game_monitor_history.json',
+    'daily_checks': 'daily_games_check.json',
+    'results': 'game_results_history.json',
+    'notifications': 'sent_notifications.json',
+    'collections': 'training_data_collection_log.json',
+}
+
+# Таблицы, которые в JSON-режиме хранятся журналом (снимок + <имя>.journal, см. journal)
+JOURNAL_TABLES = ('notifications',)
+
+
+def _check_table(name: str):
+    if name not in TABLES:
+        raise KeyError(f"Неизвестная таблица состояния: {name}")
+
+
+class JsonTable:
+    """Таблица в JSON-файле (атомарная запись под блокировкой, см. json_storage)"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        return read_json(self.path, {})
+
+    def save(self, data: Dict[str, Any], keys: Optional[Iterable[str]] = None):
+        """Сохраняет измененные ключи поверх актуального файла (keys=None - файл целиком)
+
+        Записи, добавленные параллельным запуском, сохраняются и попадают в data
+        """
+        if keys is None:
+            write_json(self.path, data)
+            return
+        keys = list(keys)
+        merged = merge_json(
+            self.path,
+            {key: data[key] for key in keys if key in data},
+            [key for key in keys if key not in data]
+        )
+        data.clear()
+        data.update(merged)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.load().get(key)
+
+    def contains(self, key: str) -> bool:
+        return key in self.load()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+
+class SqliteTable:
+    """Таблица SQLite: первичный ключ - ключ записи, значение - JSON"""
+
+    def __init__(self, store: 'StateStore', name: str):
+        self.store = store
+        self.name = name
+
+    def load(self) -> Dict[str, Any]:
+        rows = self.store.connection.execute(f"SELECT key, value FROM {self.name}")
+        return {key: json.loads(value) for key, value in rows}
+
+    def save(self, data: Dict[str, Any], keys: Optional[Iterable[str]] = None):
+        """Записывает измененные ключи одной транзакцией (keys=None - вся таблица)
+
+        Ключ, которого больше нет в data, удаляется
+        """
+        connection = self.store.connection
+        now = datetime.datetime.now().isoformat()
+        with connection:
+            if keys is None:
+                connection.execute(f"DELETE FROM {self.name}")
+                keys = data.keys()
+            for key in keys:
+                if key in data:
+                    connection.execute(
+                        f"INSERT OR REPLACE INTO {self.name} (key, value, updated_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(data[key], ensure_ascii=False), now)
+                    )
+                else:
+                    connection.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self.store.connection.execute(f"SELECT value FROM {self.name} WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def contains(self, key: str) -> bool:
+        return self.store.connection.execute(f"SELECT 1 FROM {self.name} WHERE key = ?", (key,)).fetchone() is not None
+
+    def exists(self) -> bool:
+        return True
+
+
+class StateStore:
+    """Доступ к таблицам состояния; база открывается при первом обращении"""
+
+    def __init__(self, backend: str = STATE_BACKEND, db_file: str = STATE_DB_FILE):
+        if backend not in ('json', 'sqlite'):
+            print(f"⚠️ Неизвестный STATE_BACKEND={backend}, используем json")
+            backend = 'json'
+        self.backend = backend
+        self.db_file = db_file
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def uses_sqlite(self) -> bool:
+        return self.backend == 'sqlite'
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.db_file)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            with connection:
+                for name in TABLES:
+                    connection.execute(
+                        f"CREATE TABLE IF NOT EXISTS {name} "
+                        f"(key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at TEXT NOT NULL)"
+                    )
+            self._connection = connection
+        return self._connection
+
+    def table(self, name: str):
+        """Таблица состояния по имени (см. TABLES)"""
+        _check_table(name)
+        if self.uses_sqlite:
+            return SqliteTable(self, name)
+        return JsonTable(TABLES[name])
+
+    def load_active(self, name: str) -> Dict[str, Any]:
+        """Записи таблицы за активное окно; более старые переносятся в архив по месяцам"""
+        table = self.table(name)
+        data = table.load()
+        if name in ARCHIVED_TABLES:
+            try:
+                history_archive.archive(name, table, data)
+                history_archive.prune(name)
+            except Exception as e:
+                print(f"⚠️ Ошибка архивации таблицы {name}: {e}")
+        return data
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def notification_key(kind: str, notification_id: str) -> str:
+    """Ключ строки таблицы notifications"""
+    return f"{kind}:{notification_id}"
+
+
+def collection_key(entry: Dict[str, Any]) -> str:
+    """Ключ строки таблицы collections (дата и день тренировки)"""
+    return f"{entry.get('date')}_{entry.get('day_name')}"
+
+
+def _legacy_rows(name: str, data: Any) -> Dict[str, Any]:
+    """Строки таблицы из JSON-файла старого формата"""
+    if name == 'notifications':
+        # {"game_end": {id: запись журнала, ...} или [id, ...], ...} → строка на каждое уведомление
+        return {
+            notification_key(kind, notification_id): {'kind': kind, 'id': notification_id}
+            for kind, ids in data.items() for notification_id in ids
+        }
+    if name == 'collections':
+        # {"collections": [{date, day_name, ...}, ...]}
+        return {collection_key(entry): entry for entry in data.get('collections', [])}
+    return data
+
+
+def migrate_json_to_sqlite(db_file: str = STATE_DB_FILE) -> Dict[str, int]:
+    """Переносит JSON-файлы состояния в базу SQLite; возвращает число строк по таблицам"""
+    store = StateStore('sqlite', db_file)
+    counts = {}
+    try:
+        for name, path in TABLES.items():
+            journal = Journal(path) if name in JOURNAL_TABLES else None
+            if not os.path.exists(path) and not (journal and os.path.exists(journal.journal_path)):
+                print(f"⏭️ {path} не найден, таблица {name} пропущена")
+                continue
+            try:
+                if journal is not None:
+                    # Снимок вместе с еще не сжатыми строками журнала
+                    data = journal.load()
+                    journal.close()
+                else:
+                    data = JsonTable(path).load()
+                rows = _legacy_rows(name, data)
+            except Exception as e:
+                print(f"❌ Ошибка чтения {path}: {e}")
+                continue
+            store.table(name).save(rows, rows.keys())
+            counts[name] = len(rows)
+            print(f"✅ {path} → {name}: {len(rows)} записей")
+    finally:
+        store.close()
+    return counts
+
+
+# Глобальное хранилище состояния
+state_store = StateStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Хранилище состояния")
+    parser.add_argument('--migrate', action='store_true', help='перенести JSON-файлы в базу SQLite')
+    parser.add_argument('--db', default=STATE_DB_FILE, help='файл базы SQLite')
+    args = parser.parse_args()
+
+    if args.migrate:
+        counts = migrate_json_to_sqlite(args.db)
+        print(f"📦 Перенесено записей: {sum(counts.values())} в {args.db}")
+        print("Для работы с базой задайте STATE_BACKEND=sqlite")
+    else:
+        parser.print_help()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Поиск наших команд в тексте одним скомпилированным выражением
+Все варианты написания (Pull Up, PullUP, PULL UP-ФАРМ, pull_up фарм ...)
+сводятся к одному регулярному выражению без учета регистра, допускающему
+пробелы, дефисы и подчеркивания между словами. Один проход по тексту
+возвращает каноническое название команды и вариант, как он записан в тексте.
+Название совпадает только целым словом: "pullupper" не считается "Pull Up".
+Список команд и их шаблоны задает team_registry
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Разделители между словами названия: пробелы, дефисы, подчеркивания (в т.ч. их отсутствие)
+SEPARATOR = r'[\s\-_]*'
+
+
+def alias_pattern(alias: str) -> str:
+    """Шаблон для написания команды: слова через любые разделители, без учета регистра"""
+    words = [re.escape(word) for word in re.split(r'[\s\-_]+', alias.strip()) if word]
+    return SEPARATOR.join(words)
+
+
+class TeamMatch:
+    """Найденная команда: каноническое название, вариант из текста и позиция"""
+
+    __slots__ = ('team', 'variant', 'start', 'end')
+
+    def __init__(self, team: str, variant: str, start: int, end: int):
+        self.team = team
+        self.variant = variant
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"TeamMatch({self.team!r}, {self.variant!r}, {self.start})"
+
+
+class TeamMatcher:
+    """Сопоставление текста с названиями наших команд за один проход"""
+
+    def __init__(self, patterns: Dict[str, str]):
+        # Каноническое название → шаблон; при совпадении в одной позиции
+        # побеждает шаблон, стоящий раньше (более специфичные идут первыми)
+        self.patterns = dict(patterns)
+        self.groups = {f'team{index}': team for index, team in enumerate(self.patterns)}
+        self.regex = re.compile(
+            r'(?<!\w)(?:' + '|'.join(f'(?P<{group}>{self.patterns[team]})' for group, team in self.groups.items()) + r')(?!\w)',
+            re.IGNORECASE
+        )
+
+    def _make_match(self, match) -> TeamMatch:
+        return TeamMatch(self.groups[match.lastgroup], match.group(), match.start(), match.end())
+
+    def search(self, text: Optional[str]) -> Optional[TeamMatch]:
+        """Первое упоминание нашей команды в тексте"""
+        if not text:
+            return None
+        match = self.regex.search(text)
+        return self._make_match(match) if match else None
+
+    def find_all(self, text: Optional[str]) -> List[TeamMatch]:
+        """Все упоминания наших команд в тексте (в порядке появления)"""
+        if not text:
+            return []
+        return [self._make_match(match) for match in self.regex.finditer(text)]
+
+    def find_teams(self, text: Optional[str]) -> List[str]:
+        """Канонические названия найденных команд без повторов"""
+        teams = []
+        for match in self.find_all(text):
+            if match.team not in teams:
+                teams.append(match.team)
+        return teams
+
+    def is_our_team(self, text: Optional[str]) -> bool:
+        """Проверяет, упоминается ли в тексте наша команда"""
+        return self.search(text) is not None
+
+    def canonical(self, text: Optional[str]) -> Optional[str]:
+        """Каноническое название первой найденной команды"""
+        match = self.search(text)
+        return match.team if match else None
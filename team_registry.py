@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Реестр отслеживаемых команд
+Для каждой команды хранит варианты написания, категорию с падежами,
+цвет формы и чат/топик для уведомлений. Реестр загружается один раз,
+все команды сводятся в одно выражение team_matcher, поэтому один разбор
+страницы letobasket обслуживает сразу все команды
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+from team_matcher import SEPARATOR, TeamMatch, TeamMatcher, alias_pattern
+
+# Файл с дополнительными командами (список объектов, см. Team.from_dict)
+TEAMS_CONFIG_FILE = os.getenv("TEAMS_CONFIG_FILE", "teams.json")
+
+# Дополнительные команды через запятую (только названия, остальное по умолчанию)
+TARGET_TEAMS = [name.strip() for name in os.getenv("TARGET_TEAMS", "PullUP,Pull Up-Фарм").split(",") if name.strip()]
+
+
+class Team:
+    """Отслеживаемая команда"""
+
+    def __init__(self, name: str, aliases: Optional[List[str]] = None, pattern: Optional[str] = None,
+                 category: str = "Первый состав", category_genitive: str = "первого состава",
+                 development: bool = False, club: Optional[str] = None,
+                 home_color: str = "светлая", away_color: str = "темная",
+                 development_opponents: Optional[List[str]] = None,
+                 chat_id: Optional[str] = None, topic_id: Optional[str] = None):
+        self.name = name
+        self.aliases = aliases or [name]
+        self.pattern = pattern or '|'.join(alias_pattern(alias) for alias in self.aliases)
+        self.category = category
+        self.category_genitive = category_genitive
+        self.development = development
+        self.club = club or name
+        self.home_color = home_color
+        self.away_color = away_color
+        # Соперники, игры с которыми всегда относятся к составу развития
+        self.development_opponents = development_opponents or []
+        self.chat_id = chat_id
+        self.topic_id = topic_id
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Team':
+        return cls(
+            name=data['name'],
+            aliases=data.get('aliases'),
+            pattern=data.get('pattern'),
+            category=data.get('category', "Первый состав"),
+            category_genitive=data.get('category_genitive', "первого состава"),
+            development=data.get('development', False),
+            club=data.get('club'),
+            home_color=data.get('home_color', "светлая"),
+            away_color=data.get('away_color', "темная"),
+            development_opponents=data.get('development_opponents'),
+            chat_id=str(data['chat_id']) if data.get('chat_id') else None,
+            topic_id=str(data['topic_id']) if data.get('topic_id') else None,
+        )
+
+    def form_color(self, is_home: bool) -> str:
+        """Цвет формы: первая команда в паре играет в домашней форме"""
+        return self.home_color if is_home else self.away_color
+
+    def destination(self, chat_id: Optional[str], topic_id: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """Чат и топик для уведомлений команды (по умолчанию - общие настройки)"""
+        return self.chat_id or chat_id, self.topic_id or topic_id
+
+    def __repr__(self) -> str:
+        return f"Team({self.name!r})"
+
+
+# Встроенные составы Pull Up (есть всегда, teams.json может переопределить поля)
+BUILTIN_TEAMS = [
+    Team(
+        "Pull Up-Фарм",
+        pattern=rf'pull{SEPARATOR}up{SEPARATOR}фарм',
+        category="Состав Развития",
+        category_genitive="состава развития",
+        development=True,
+        club="Pull Up",
+    ),
+    Team(
+        "Pull Up",
+        pattern=rf'pull{SEPARATOR}up',
+        development_opponents=['Кудрово', 'Тосно', 'QUASAR', 'TAURUS'],
+    ),
+]
+
+
+class TeamRegistry:
+    """Команды по каноническому названию и общий сопоставитель для всех команд"""
+
+    def __init__(self, teams: List[Team]):
+        self.teams: Dict[str, Team] = {}
+        for team in teams:
+            self.teams[team.name] = team
+        # Длинные шаблоны первыми: "Pull Up-Фарм" должен побеждать "Pull Up" в той же позиции
+        ordered = sorted(self.teams.values(), key=lambda team: len(team.pattern), reverse=True)
+        self.matcher = TeamMatcher({team.name: team.pattern for team in ordered})
+
+    @classmethod
+    def load(cls, path: str = TEAMS_CONFIG_FILE, target_teams: Optional[List[str]] = None) -> 'TeamRegistry':
+        """Встроенные команды + teams.json + TARGET_TEAMS"""
+        teams = {team.name: team for team in BUILTIN_TEAMS}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for data in json.load(f):
+                        teams[data['name']] = Team.from_dict(data)
+            except Exception as e:
+                print(f"⚠️ Ошибка загрузки {path}: {e}")
+
+        # Названия из TARGET_TEAMS, которые не совпадают с уже известными командами
+        known = TeamMatcher({team.name: team.pattern for team in teams.values()})
+        for name in TARGET_TEAMS if target_teams is None else target_teams:
+            if not known.search(name):
+                teams[name] = Team(name)
+
+        return cls(list(teams.values()))
+
+    def get(self, name: Optional[str]) -> Optional[Team]:
+        """Команда по каноническому названию"""
+        return self.teams.get(name) if name else None
+
+    def names(self) -> List[str]:
+        return list(self.teams)
+
+    def team_of(self, match: TeamMatch) -> Team:
+        return self.teams[match.team]
+
+    def search(self, text: Optional[str]) -> Optional[TeamMatch]:
+        """Первое упоминание отслеживаемой команды"""
+        return self.matcher.search(text)
+
+    def find_all(self, text: Optional[str]) -> List[TeamMatch]:
+        """Все упоминания отслеживаемых команд за один проход"""
+        return self.matcher.find_all(text)
+
+    def find_teams(self, text: Optional[str]) -> List[str]:
+        """Канонические названия найденных команд без повторов"""
+        return self.matcher.find_teams(text)
+
+    def is_our_team(self, text: Optional[str]) -> bool:
+        """Проверяет, упоминается ли в тексте отслеживаемая команда"""
+        return self.matcher.is_our_team(text)
+
+    def team_for(self, text: Optional[str]) -> Optional[Team]:
+        """Команда, первой упомянутая в тексте"""
+        match = self.matcher.search(text)
+        return self.team_of(match) if match else None
+
+    def is_development(self, text: Optional[str]) -> bool:
+        """Проверяет, упоминается ли в тексте состав развития"""
+        return any(self.team_of(match).development for match in self.matcher.find_all(text))
+
+    def development_squad(self, team: Team) -> Optional[Team]:
+        """Состав развития того же клуба"""
+        if team.development:
+            return team
+        return next((other for other in self.teams.values() if other.development and other.club == team.club), None)
+
+    def match_game(self, team1: str, team2: str) -> Tuple[Optional[Team], Optional[str], Optional[str]]:
+        """Находит нашу команду в паре: (команда, ее название в паре, соперник)"""
+        team = self.team_for(team1)
+        if team:
+            return team, team1, team2
+        team = self.team_for(team2)
+        if team:
+            return team, team2, team1
+        return None, None, None
+
+
+# Глобальный реестр команд
+team_registry = TeamRegistry.load()
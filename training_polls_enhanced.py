@@ -8,12 +8,16 @@ import os
 import asyncio
 import datetime
 import json
+import re
 from typing import Dict, List, Optional, Any, Tuple
 from dotenv import load_dotenv
 from telegram import Bot
 from telegram.ext import Application, MessageHandler, filters
 import gspread
 from datetime_utils import get_moscow_time, log_current_time
+from state_store import collection_key, state_store
+from json_storage import update_json
+from poll_ingestion import PollAnswerStore, PollIngestor, TelegramUpdateSource
 from google.oauth2.service_account import Credentials
 
 # Загружаем переменные окружения
@@ -98,6 +102,12 @@ def get_training_locations(week_start_date):
             'friday': {'time': '20:30', 'location': 'СШОР ВО'}
         }
 
+def appended_start_row(response: Dict) -> Optional[int]:
+    """Номер первой добавленной строки из ответа values.append ('Лист'!A12:D42 → 12)"""
+    updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
+    match = re.search(r'![A-Z]+(\d+)', updated_range)
+    return int(match.group(1)) if match else None
+
 class TrainingPollsManager:
     """Управление опросами тренировок"""
     
@@ -107,6 +117,10 @@ class TrainingPollsManager:
         self.spreadsheet = None
         self.current_poll_info = {}
         self.poll_results = {}
+        # Индекс Telegram ID → игрок (строится один раз за сбор данных)
+        self._player_index: Optional[Dict[str, Dict]] = None
+        # Ответы на опросы, накопленные приемом обновлений (poll_ingestion)
+        self.poll_answers = PollAnswerStore()
         self._init_bot()
         self._init_google_sheets()
     
@@ -307,6 +321,16 @@ class TrainingPollsManager:
     def _was_data_collected_today(self, day_name: str) -> bool:
         """Проверяет, были ли уже собраны данные за указанный день сегодня"""
         try:
+            today = get_moscow_time().date().isoformat()
+            
+            if state_store.uses_sqlite:
+                # Поиск по первичному ключу (дата + день тренировки)
+                entry = state_store.table('collections').get(collection_key({'date': today, 'day_name': day_name}))
+                if entry:
+                    print(f"📊 Данные за {day_name} уже собраны сегодня: {entry.get('time', '')}")
+                    return True
+                return False
+            
             # Проверяем файл с результатами сбора данных
             if not os.path.exists('training_data_collection_log.json'):
                 print(f"📄 Файл training_data_collection_log.json не найден")
@@ -321,8 +345,6 @@ class TrainingPollsManager:
             with open('training_data_collection_log.json', 'r', encoding='utf-8') as f:
                 collection_log = json.load(f)
             
-            today = get_moscow_time().date().isoformat()
-            
             # Проверяем, есть ли запись о сборе данных за сегодня
             for entry in collection_log.get('collections', []):
                 if (entry.get('date') == today and 
@@ -339,14 +361,7 @@ class TrainingPollsManager:
     def _log_data_collection(self, day_name: str):
         """Логирует сбор данных"""
         try:
-            # Загружаем существующий лог или создаем новый
-            if os.path.exists('training_data_collection_log.json'):
-                with open('training_data_collection_log.json', 'r', encoding='utf-8') as f:
-                    collection_log = json.load(f)
-            else:
-                collection_log = {'collections': []}
-            
-            # Добавляем новую запись
+            # Новая запись
             now = get_moscow_time()
             new_entry = {
                 'date': now.date().isoformat(),
@@ -355,28 +370,41 @@ class TrainingPollsManager:
                 'timestamp': now.isoformat()
             }
             
-            collection_log['collections'].append(new_entry)
+            if state_store.uses_sqlite:
+                key = collection_key(new_entry)
+                state_store.table('collections').save({key: new_entry}, [key])
+                print(f"📝 Сбор данных за {day_name} залогирован")
+                return
             
-            # Сохраняем лог
-            with open('training_data_collection_log.json', 'w', encoding='utf-8') as f:
-                json.dump(collection_log, f, ensure_ascii=False, indent=2)
+            # Дописываем запись к актуальному логу (атомарно, под блокировкой)
+            update_json(
+                'training_data_collection_log.json',
+                lambda collection_log: collection_log.setdefault('collections', []).append(new_entry),
+                default={'collections': []}
+            )
             
             print(f"📝 Сбор данных за {day_name} залогирован")
             
         except Exception as e:
             print(f"⚠️ Ошибка логирования сбора данных: {e}")
     
-    def find_player_by_telegram_id(self, telegram_id: str) -> Optional[Dict]:
-        """Ищет игрока по Telegram ID в листе 'Игроки'"""
+    @staticmethod
+    def normalize_telegram_id(telegram_id: str) -> str:
+        """Ключ индекса игроков: без @, пробелов и регистра"""
+        return telegram_id.strip().lstrip('@').lower()
+    
+    def build_player_index(self) -> Dict[str, Dict]:
+        """Читает лист 'Игроки' один раз и строит индекс Telegram ID → игрок"""
+        self._player_index = {}
         if not self.spreadsheet:
-            return None
+            return self._player_index
         
         try:
             worksheet = self.spreadsheet.worksheet("Игроки")
             all_values = worksheet.get_all_values()
             
             if len(all_values) <= 1:
-                return None
+                return self._player_index
             
             headers = all_values[0]
             
@@ -388,28 +416,27 @@ class TrainingPollsManager:
                     break
             
             if telegram_id_col is None:
-                return None
+                return self._player_index
             
-            # Ищем игрока
             for row in all_values[1:]:
                 if len(row) > telegram_id_col:
-                    cell_value = row[telegram_id_col].strip()
-                    
-                    if (cell_value == telegram_id or 
-                        cell_value == f"@{telegram_id}" or 
-                        cell_value == f"@{telegram_id.replace('@', '')}" or
-                        cell_value == telegram_id.replace('@', '')):
-                        
-                        return {
-                            'data': row,
-                            'headers': headers
-                        }
+                    key = self.normalize_telegram_id(row[telegram_id_col])
+                    if key:
+                        # При повторах побеждает первая строка, как и при поиске по листу
+                        self._player_index.setdefault(key, {'data': row, 'headers': headers})
             
-            return None
+            print(f"📇 Индекс игроков построен: {len(self._player_index)} Telegram ID")
             
         except Exception as e:
-            print(f"❌ Ошибка поиска игрока: {e}")
-            return None
+            print(f"❌ Ошибка построения индекса игроков: {e}")
+        
+        return self._player_index
+    
+    def find_player_by_telegram_id(self, telegram_id: str) -> Optional[Dict]:
+        """Ищет игрока по Telegram ID в листе 'Игроки'"""
+        if self._player_index is None:
+            self.build_player_index()
+        return self._player_index.get(self.normalize_telegram_id(telegram_id))
     
     def get_player_full_name(self, player_data: Dict) -> str:
         """Получает полное имя игрока"""
@@ -464,6 +491,17 @@ class TrainingPollsManager:
         # Если не найден, возвращаем имя и telegram_id
         return f"{user_name} ({telegram_id})"
     
+    async def _ingest_pending_answers(self):
+        """Забирает накопившиеся обновления getUpdates в журнал ответов"""
+        if not self.bot:
+            return
+        try:
+            received = await PollIngestor(TelegramUpdateSource(self.bot), self.poll_answers).ingest_pending()
+            print(f"📥 Получено новых обновлений: {received}")
+        except Exception as e:
+            # Например, Conflict: getUpdates уже занят постоянным приемом ответов
+            print(f"⚠️ Обновления не получены, используем сохраненные ответы: {e}")
+    
     async def collect_poll_data(self, target_day: str):
         """Собирает данные опроса для указанного дня"""
         print(f"🔍 Начинаем сбор данных за {target_day}")
@@ -494,8 +532,15 @@ class TrainingPollsManager:
             print(f"📊 Сбор данных за {target_day}")
             print(f"📊 ID опроса: {poll_info['poll_id']}")
             
-            # Получаем обновления от бота
-            updates = await self.bot.get_updates(limit=50)
+            # Догружаем ответы, которые еще не принял run_poll_ingestion.py
+            await self._ingest_pending_answers()
+            
+            # Действующие ответы (с учетом отозванных голосов) - из локального журнала
+            answers = self.poll_answers.answers(poll_info['poll_id'])
+            print(f"🗳️ Ответов на опрос: {len(answers)}")
+            
+            # Лист 'Игроки' читается один раз за сбор, дальше поиск голосующих по индексу
+            self.build_player_index()
             
             # Анализируем голоса
             tuesday_voters = []
@@ -503,30 +548,26 @@ class TrainingPollsManager:
             trainer_voters = []
             no_voters = []
             
-            for update in updates:
-                if update.poll_answer:
-                    poll_answer = update.poll_answer
-                    if poll_answer.poll_id == poll_info['poll_id']:
-                        user = poll_answer.user
-                        option_ids = poll_answer.option_ids
-                        
-                        user_name = f"{user.first_name} {user.last_name or ''}".strip()
-                        telegram_id = user.username or "без_username"
-                        if telegram_id != "без_username":
-                            telegram_id = f"@{telegram_id}"
-                        
-                        # Форматируем имя игрока
-                        formatted_name = self.format_player_name(user_name, telegram_id)
-                        
-                        # Распределяем по дням
-                        if 0 in option_ids:  # Вторник
-                            tuesday_voters.append(formatted_name)
-                        if 1 in option_ids:  # Пятница
-                            friday_voters.append(formatted_name)
-                        if 2 in option_ids:  # Тренер
-                            trainer_voters.append(formatted_name)
-                        if 3 in option_ids:  # Нет
-                            no_voters.append(formatted_name)
+            for answer in answers.values():
+                option_ids = answer['option_ids']
+                
+                user_name = f"{answer.get('first_name') or ''} {answer.get('last_name') or ''}".strip()
+                telegram_id = answer.get('username') or "без_username"
+                if telegram_id != "без_username":
+                    telegram_id = f"@{telegram_id}"
+                
+                # Форматируем имя игрока
+                formatted_name = self.format_player_name(user_name, telegram_id)
+                
+                # Распределяем по дням
+                if 0 in option_ids:  # Вторник
+                    tuesday_voters.append(formatted_name)
+                if 1 in option_ids:  # Пятница
+                    friday_voters.append(formatted_name)
+                if 2 in option_ids:  # Тренер
+                    trainer_voters.append(formatted_name)
+                if 3 in option_ids:  # Нет
+                    no_voters.append(formatted_name)
             
             # Сохраняем результаты
             self.poll_results = {
@@ -630,40 +671,34 @@ class TrainingPollsManager:
                 print(f"❌ Неизвестный день: {target_day}")
                 return False
             
-            # Получаем все данные для определения следующей строки
-            all_values = worksheet.get_all_values()
-            next_row = len(all_values) + 1
-            
-            # Добавляем основную строку с группировкой
-            main_row_data = [
-                training_date,
-                target_day,
-                len(voters),
-                ""  # Пустая колонка для участников
-            ]
-            worksheet.append_row(main_row_data)
-            
-            # Добавляем строки с участниками
-            for voter in voters:
-                participant_row = ["", "", "", voter]
-                worksheet.append_row(participant_row)
+            # Блок целиком: основная строка и строки участников (один запрос append)
+            rows = [[training_date, target_day, len(voters), ""]]
+            rows.extend(["", "", "", voter] for voter in voters)
+            response = worksheet.append_rows(rows)
             
-            # Настраиваем группировку
+            # Настраиваем группировку (второй и последний запрос)
             if len(voters) > 0:
-                # Группируем строки с участниками
-                start_row = next_row + 1
-                end_row = next_row + len(voters)
-                
-                # Применяем группировку (если поддерживается API)
-                try:
-                    worksheet.batch_update([{
-                        'range': f'A{start_row}:D{end_row}',
-                        'properties': {
-                            'hiddenByUser': True
-                        }
-                    }])
-                except:
-                    print("⚠️ Группировка не поддерживается в текущей версии API")
+                main_row = appended_start_row(response)
+                if main_row is None:
+                    print("⚠️ Не удалось определить строки участников, группировка пропущена")
+                else:
+                    # Строки участников идут сразу за основной (индексы с нуля, конец не включается)
+                    group_range = {
+                        'sheetId': worksheet.id,
+                        'dimension': 'ROWS',
+                        'startIndex': main_row,
+                        'endIndex': main_row + len(voters)
+                    }
+                    try:
+                        self.spreadsheet.batch_update({'requests': [
+                            {'addDimensionGroup': {'range': group_range}},
+                            {'updateDimensionGroup': {
+                                'dimensionGroup': {'range': group_range, 'depth': 1, 'collapsed': True},
+                                'fields': 'collapsed'
+                            }}
+                        ]})
+                    except Exception as e:
+                        print(f"⚠️ Ошибка группировки строк участников: {e}")
             
             print(f"✅ Данные за {target_day} сохранены:")
             print(f"   Дата тренировки: {training_date}")
@@ -677,7 +712,20 @@ class TrainingPollsManager:
             return False
 
 # Глобальный экземпляр
-training_manager = TrainingPollsManager()
+_training_manager: Optional[TrainingPollsManager] = None
+
+def get_training_manager() -> TrainingPollsManager:
+    """Глобальный менеджер опросов тренировок (создается при первом обращении)"""
+    global _training_manager
+    if _training_manager is None:
+        _training_manager = TrainingPollsManager()
+    return _training_manager
+
+def __getattr__(name: str):
+    # training_manager создается при первом обращении, а не при импорте модуля
+    if name == 'training_manager':
+        return get_training_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 async def main():
     """Основная функция"""
@@ -707,6 +755,8 @@ async def main():
     
     print(f"✅ SPREADSHEET_ID: {spreadsheet_id}")
     
+    training_manager = get_training_manager()
+    
     # Проверяем условия выполнения
     print("\n🔍 ПРОВЕРКА УСЛОВИЙ ВЫПОЛНЕНИЯ:")
     print(f"   Создание опроса (воскресенье 10:00): {'✅' if training_manager.should_create_weekly_poll() else '❌'}")